@@ -0,0 +1,114 @@
+# arrow_export.py
+# City Congestion Tracker – columnar (Arrow / Parquet) export of readings
+# Pairs with fastapi_app.py and db.py
+#
+# JSON readings cost a Pydantic object per row on the server and a dict per row
+# on the client. Apache Arrow sends each column as one typed block instead:
+# the dashboard can turn it into a pandas DataFrame without parsing rows.
+# Record batches are encoded as they come off the DB cursor, so the API never
+# holds the whole result in memory.
+#
+# Students learn how to:
+# - Build Arrow record batches from database rows
+# - Stream the Arrow IPC format and Parquet over HTTP
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+## 0.2 Column schema ###############################
+
+# Must match the column order of queries.READINGS_EXPORT_SELECT
+READINGS_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("location_id", pa.string()),
+        ("location_name", pa.string()),
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("congestion_level", pa.int16()),
+        ("delay_minutes", pa.float64()),
+    ]
+)
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+
+# 1. Helpers #################################
+
+
+class _ChunkSink:
+    """
+    Minimal write-only file object. Writers append bytes here and the HTTP
+    generator takes them out after each batch. tell() keeps counting across
+    take() calls, because the Parquet footer records absolute byte offsets.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def rows_to_batch(rows: list) -> pa.RecordBatch:
+    """Turn a list of row tuples (in READINGS_SCHEMA column order) into one Arrow record batch."""
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, READINGS_SCHEMA)],
+        schema=READINGS_SCHEMA,
+    )
+
+
+# 2. Streaming encoders #################################
+
+
+def arrow_stream(row_batches):
+    """
+    Encode batches of row tuples as an Arrow IPC stream, yielding bytes per batch.
+    Batches are zstd-compressed; pyarrow clients decompress transparently.
+    """
+    sink = _ChunkSink()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), READINGS_SCHEMA, options=options) as writer:
+        for rows in row_batches:
+            writer.write_batch(rows_to_batch(rows))
+            yield sink.take()
+    # Closing the writer adds the end-of-stream marker
+    yield sink.take()
+
+
+def parquet_stream(row_batches):
+    """Encode batches of row tuples as a Parquet file, one row group per batch."""
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), READINGS_SCHEMA, compression="zstd") as writer:
+        for rows in row_batches:
+            writer.write_batch(rows_to_batch(rows))
+            yield sink.take()
+    # Closing the writer adds the Parquet footer (row group offsets and schema)
+    yield sink.take()
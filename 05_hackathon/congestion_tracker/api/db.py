@@ -0,0 +1,438 @@
+# db.py
+# City Congestion Tracker – PostgreSQL connection pool
+# Pairs with fastapi_app.py
+#
+# Opening a new SSL connection to Supabase costs a TCP + TLS handshake and an
+# auth round trip. This module keeps a small pool of open connections that the
+# API endpoints borrow and return, so each request only pays for its queries.
+#
+# Students learn how to:
+# - Reuse database connections with psycopg2's ThreadedConnectionPool
+# - Health-check a pooled connection before handing it out
+# - Open and close shared resources in FastAPI startup/shutdown hooks
+# - Run blocking psycopg2 calls in worker threads so async endpoints stay responsive
+# - Reuse server-side prepared statements to skip parse and plan time
+# - Time pool checkout, query and fetch separately (metrics.py, /metrics and Server-Timing)
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import anyio
+import anyio.to_thread
+import psycopg2
+import psycopg2.extras
+import psycopg2.extensions
+import psycopg2.pool
+from fastapi import HTTPException
+
+from metrics import DB_IN_FLIGHT, record_db, timed_db
+
+
+## 0.2 Settings ###############################
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer env var, falling back to default when unset or invalid."""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float env var, falling back to default when unset or invalid."""
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def connect_kwargs() -> dict:
+    """
+    Build psycopg2.connect() arguments for Supabase connection pooling.
+    Uses env vars: SUPABASE_DB_HOST, SUPABASE_DB_PORT, SUPABASE_DB_NAME,
+    SUPABASE_DB_USER, SUPABASE_DB_PASSWORD and optional SUPABASE_DB_SSLMODE.
+    """
+    host = os.getenv("SUPABASE_DB_HOST")
+    user = os.getenv("SUPABASE_DB_USER")
+    password = os.getenv("SUPABASE_DB_PASSWORD")
+    if not host or not user or not password:
+        raise HTTPException(
+            status_code=500,
+            detail="Database environment variables are not set. "
+            "Set SUPABASE_DB_HOST, SUPABASE_DB_USER, and SUPABASE_DB_PASSWORD in .env.",
+        )
+
+    return {
+        "host": host,
+        "port": int(os.getenv("SUPABASE_DB_PORT", "5432")),
+        "dbname": os.getenv("SUPABASE_DB_NAME", "postgres"),
+        "user": user,
+        "password": password,
+        # Supabase requires SSL; override (e.g. "disable") only for a local Postgres
+        "sslmode": os.getenv("SUPABASE_DB_SSLMODE", "require"),
+    }
+
+
+# 1. Connection pool #################################
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+    Callers wait up to `timeout` seconds for a free connection, and connections
+    that sat idle longer than `ping_after` seconds are checked with SELECT 1.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float, ping_after: float, **kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **kwargs)
+        # The semaphore makes callers wait for a free slot instead of failing
+        # immediately with PoolError when every connection is in use.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self._counters = {"checkouts": 0, "pings": 0, "discarded": 0, "timeouts": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def _is_healthy(self, conn) -> bool:
+        """Return True if conn is open and (when idle for a while) answers SELECT 1."""
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle_for < self.ping_after:
+            return True
+        self._count("pings")
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        # Try a few times: stale connections are closed and replaced by fresh ones
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                self._count("checkouts")
+                return conn
+            self._count("discarded")
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+        raise HTTPException(status_code=503, detail="Could not get a healthy database connection.")
+
+    def _checkin(self, conn) -> None:
+        if conn.closed:
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            return
+        # Never hand the next caller a connection stuck in a transaction
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                return
+        self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a `with` block."""
+        # "connect" time: waiting for a slot, health pings and any new connection
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            record_db("connect", time.perf_counter() - start)
+            raise HTTPException(status_code=503, detail="Database pool exhausted; try again shortly.")
+        conn = None
+        try:
+            try:
+                conn = self._checkout()
+            finally:
+                record_db("connect", time.perf_counter() - start)
+            DB_IN_FLIGHT.inc()
+            try:
+                yield conn
+            finally:
+                DB_IN_FLIGHT.dec()
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Pool size and usage counters (for the /pool-stats endpoint)."""
+        # ThreadedConnectionPool keeps idle connections in _pool and borrowed ones in _used
+        idle = len(self._pool._pool)
+        in_use = len(self._pool._used)
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "min_size": self.minconn,
+            "max_size": self.maxconn,
+            "open": idle + in_use,
+            "idle": idle,
+            "in_use": in_use,
+            **counters,
+        }
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+# 2. App-wide pool (opened/closed by the FastAPI lifespan) ####
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def open_pool() -> None:
+    """
+    Create the shared pool. Called once on app startup.
+    Settings: DB_POOL_MIN (default 1), DB_POOL_MAX (default 10),
+    DB_POOL_TIMEOUT seconds to wait for a free connection (default 10),
+    DB_POOL_PING_AFTER idle seconds before a health check (default 30).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return
+        minconn = max(0, _env_int("DB_POOL_MIN", 1))
+        maxconn = max(1, minconn, _env_int("DB_POOL_MAX", 10))
+        _pool = ConnectionPool(
+            minconn,
+            maxconn,
+            timeout=_env_float("DB_POOL_TIMEOUT", 10.0),
+            ping_after=_env_float("DB_POOL_PING_AFTER", 30.0),
+            **connect_kwargs(),
+        )
+
+
+def close_pool() -> None:
+    """Close every pooled connection. Called once on app shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared pool, opening it on first use if startup could not."""
+    if _pool is None:
+        try:
+            open_pool()
+        except psycopg2.OperationalError as exc:
+            raise HTTPException(status_code=503, detail=f"Database unavailable: {exc}") from exc
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection: `with db_connection() as conn: ...`"""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def pool_stats() -> dict:
+    """Stats for the shared pool, or {"open": 0} if it has not been created yet."""
+    if _pool is None:
+        return {"status": "not_started", "open": 0}
+    return {"status": "ok", **_pool.stats(), "prepared": prepared_stats()}
+
+
+# 3. Async data access #################################
+
+# psycopg2 calls block the calling thread. Running them directly inside an
+# `async def` endpoint freezes the whole event loop (and every other request,
+# including /health) until the query returns. Instead, each query runs in a
+# worker thread; the limiter caps DB threads at the pool size so extra requests
+# wait cheaply on the event loop rather than each holding a blocked thread.
+
+_db_limiter = None
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(get_pool().maxconn)
+    return _db_limiter
+
+
+async def run_db(fn, *args):
+    """
+    Run fn(conn, *args) with a pooled connection in a worker thread and return its result.
+    Use this for multi-statement work that must share one connection.
+    """
+
+    def _work():
+        with db_connection() as conn:
+            return fn(conn, *args)
+
+    return await anyio.to_thread.run_sync(_work, limiter=_get_limiter())
+
+
+def _fetch_all(conn, sql: str, params) -> list:
+    with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with timed_db("query"):
+            cur.execute(sql, params)
+        with timed_db("fetch"):
+            return cur.fetchall()
+
+
+async def fetch_all(sql: str, params=None) -> list:
+    """Run one SELECT off the event loop and return its rows as dicts."""
+    return await run_db(_fetch_all, sql, params)
+
+
+# 4. Streaming (server-side cursors) #################################
+
+
+def iter_batches(sql: str, params=None, batch_size: int = 2000, as_dicts: bool = True):
+    """
+    Yield lists of rows (dicts, or plain tuples with as_dicts=False) from a
+    server-side (named) cursor. Postgres keeps the result set and sends
+    batch_size rows at a time, so only one batch is ever held in memory here.
+    This is a blocking generator: hand it to StreamingResponse, which iterates
+    sync generators in a worker thread.
+    """
+    cursor_factory = psycopg2.extras.RealDictCursor if as_dicts else None
+    with db_connection() as conn:
+        # Named cursors must run inside a transaction; `with conn` closes it at the end
+        with conn, conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=cursor_factory) as cur:
+            cur.itersize = batch_size
+            with timed_db("query"):
+                cur.execute(sql, params)
+            while True:
+                with timed_db("fetch"):
+                    rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+
+# 5. Prepared statements #################################
+
+# The API builds a handful of SQL shapes: the text depends only on which
+# filters a request uses (and, for rollup level filters, which levels), never
+# on the filter values. A dashboard refresh repeats the same shapes, so each
+# pooled connection PREPAREs a shape once and then only EXECUTEs it, skipping
+# parse/analyze (and, once Postgres settles on a generic plan, planning).
+# Statements live per session: each connection remembers its own, capped at
+# DB_PREPARED_MAX with the least recently used DEALLOCATEd.
+# A pooler in transaction mode (Supabase port 6543) does not keep sessions and
+# so cannot keep prepared statements: by default they are on only for direct
+# connections, off for a Supabase pooler host or port 6543. DB_PREPARE=1 or 0
+# overrides that (e.g. 1 for a pooler in session mode).
+
+
+def _direct_connection() -> bool:
+    """False when SUPABASE_DB_HOST / SUPABASE_DB_PORT point at a connection pooler."""
+    host = os.getenv("SUPABASE_DB_HOST") or ""
+    return os.getenv("SUPABASE_DB_PORT", "5432") != "6543" and "pooler." not in host
+
+
+PREPARE_ENABLED = os.getenv("DB_PREPARE", "1" if _direct_connection() else "0") != "0"
+PREPARED_MAX = max(1, _env_int("DB_PREPARED_MAX", 64))
+
+_prepared = weakref.WeakKeyDictionary()  # connection -> OrderedDict(name -> None), LRU order
+_prepared_lock = threading.Lock()
+_prepared_counters = {"prepares": 0, "executes": 0, "deallocates": 0}
+_PLACEHOLDER = re.compile(r"%s")
+
+
+def statement_name(sql: str) -> str:
+    """Stable name for a SQL shape (same text -> same name on every connection)."""
+    return "stmt_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+
+def _count_prepared(key: str) -> None:
+    with _prepared_lock:
+        _prepared_counters[key] += 1
+
+
+def _numbered(sql: str) -> str:
+    """Turn psycopg2's %s placeholders into PREPARE's $1, $2, ..."""
+    counter = iter(range(1, sql.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql)
+
+
+def _fetch_prepared(conn, sql: str, params) -> list:
+    params = list(params or [])
+    name = statement_name(sql)
+    with _prepared_lock:
+        names = _prepared.setdefault(conn, OrderedDict())
+    with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with timed_db("query"):
+            if name in names:
+                names.move_to_end(name)
+            else:
+                if len(names) >= PREPARED_MAX:
+                    oldest, _ = names.popitem(last=False)
+                    cur.execute(f"DEALLOCATE {oldest}")
+                    _count_prepared("deallocates")
+                cur.execute(f"PREPARE {name} AS {_numbered(sql)}")
+                names[name] = None
+                _count_prepared("prepares")
+            args = "(" + ", ".join(["%s"] * len(params)) + ")" if params else ""
+            cur.execute(f"EXECUTE {name}{args}", params)
+        _count_prepared("executes")
+        with timed_db("fetch"):
+            return cur.fetchall()
+
+
+def _fetch_prepared_or_forget(conn, sql: str, params) -> list:
+    try:
+        return _fetch_prepared(conn, sql, params)
+    except psycopg2.Error:
+        # A failed PREPARE/EXECUTE (bad input, dropped session, ...) leaves this
+        # connection's bookkeeping uncertain; start over on it next time
+        with _prepared_lock:
+            _prepared.pop(conn, None)
+        try:
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("DEALLOCATE ALL")
+            conn.commit()
+        except psycopg2.Error:
+            pass  # the pool discards closed connections on check-in
+        raise
+
+
+async def fetch_prepared(sql: str, params=None) -> list:
+    """
+    Like fetch_all, but runs sql as a prepared statement on the borrowed
+    connection (prepared on first use there). Falls back to fetch_all when
+    DB_PREPARE=0.
+    """
+    if not PREPARE_ENABLED:
+        return await fetch_all(sql, params)
+    return await run_db(_fetch_prepared_or_forget, sql, params)
+
+
+def prepared_stats() -> dict:
+    """Prepared statement counters across all pooled connections."""
+    with _prepared_lock:
+        cached = sum(len(names) for names in _prepared.values())
+        return {"enabled": PREPARE_ENABLED, "max_per_connection": PREPARED_MAX, "cached": cached, **_prepared_counters}
@@ -0,0 +1,63 @@
+# downsample.py
+# City Congestion Tracker – Largest-Triangle-Three-Buckets (LTTB) downsampling
+# Pairs with fastapi_app.py (GET /timeseries?method=lttb)
+#
+# Averaging readings into time buckets smooths a series: a short spike inside
+# a wide bucket disappears into its mean. LTTB instead keeps a subset of the
+# actual points, chosen so that the line through them looks like the full
+# series: the first and last points always stay, the rest is split into
+# equal-count buckets, and from each bucket it keeps the point that forms the
+# largest triangle with the point kept before it and the mean of the next
+# bucket. See Steinarsson, "Downsampling Time Series for Visual
+# Representation" (2013).
+#
+# Students learn how to:
+# - Reduce a long series to one point per pixel without hiding its peaks
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+from typing import List, Sequence
+
+
+# 1. LTTB #################################
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Indices of the points LTTB keeps from (xs, ys), in order. xs must be
+    sorted ascending. Returns every index when there are no more than
+    `threshold` points (or threshold < 3, where LTTB is undefined).
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    kept = [0]
+    # The first and last points are fixed; the n - 2 in between fill threshold - 2 buckets
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Mean of the next bucket (the last point for the last bucket)
+        next_lo = int((i + 1) * every) + 1
+        next_hi = min(int((i + 2) * every) + 1, n)
+        if next_lo >= next_hi:
+            next_lo, next_hi = n - 1, n
+        count = next_hi - next_lo
+        avg_x = sum(xs[next_lo:next_hi]) / count
+        avg_y = sum(ys[next_lo:next_hi]) / count
+
+        # Point of this bucket with the largest triangle (a, point, next mean)
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
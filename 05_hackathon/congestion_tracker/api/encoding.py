@@ -0,0 +1,201 @@
+# encoding.py
+# City Congestion Tracker – compressed responses (brotli / gzip) and orjson JSON rendering
+# Pairs with fastapi_app.py and benchmarks/bench_encoding.py
+#
+# A 1000-row /readings page is ~150 KB of JSON in which location names,
+# timestamps and keys repeat on every row, so it compresses 10x or more.
+# CompressionMiddleware picks brotli or gzip from the client's Accept-Encoding
+# and compresses any response above a size threshold, including streamed
+# ones (/readings.ndjson) chunk by chunk. ORJSONResponse renders JSON with
+# orjson instead of the standard library encoder.
+#
+# Students learn how to:
+# - Negotiate a content encoding from Accept-Encoding (with q-values)
+# - Write a small ASGI middleware that rewrites response headers and bodies
+# - Keep CPU-heavy compression of large bodies off the event loop
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import zlib
+from typing import Optional
+
+import anyio.to_thread
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+
+## 0.2 Settings ###############################
+
+# Already compressed (Arrow/Parquet use zstd internally) or must not be buffered (SSE)
+DEFAULT_EXCLUDED_MEDIA_TYPES = (
+    "application/vnd.apache.arrow.stream",
+    "application/vnd.apache.parquet",
+    "text/event-stream",
+    "image/png",
+    "image/jpeg",
+)
+
+# Bodies (or stream chunks) at least this large are compressed in a worker thread
+THREAD_MIN_SIZE = 128 * 1024
+
+
+# 1. Fast JSON #################################
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (serializes datetimes and dataclasses natively)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# 2. Compressors #################################
+
+
+class GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Z_SYNC_FLUSH pushes each stream chunk to the client without ending the gzip stream
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Best supported encoding for an Accept-Encoding header: "br" (if the
+    brotli package is installed), then "gzip"; None for identity.
+    """
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.strip().lower()] = q
+    wildcard = offered.get("*", 0.0)
+    for encoding in (["br"] if brotli is not None else []) + ["gzip"]:
+        if offered.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+# 3. Middleware #################################
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: compress responses of at least `minimum_size` bytes with
+    brotli or gzip, as negotiated per request. Streamed responses are
+    compressed chunk by chunk (a first chunk below the threshold still counts
+    when more chunks follow). Responses that already have a Content-Encoding,
+    carry no body (204/304), or have an excluded media type pass through.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        exclude_media_types: tuple = DEFAULT_EXCLUDED_MEDIA_TYPES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_media_types = exclude_media_types
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def compress(body: bytes, final: bool) -> bytes:
+            if len(body) >= THREAD_MIN_SIZE:
+                return await anyio.to_thread.run_sync(compressor.compress, body, final)
+            return compressor.compress(body, final)
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or media_type in self.exclude_media_types
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers until the first body chunk decides the encoding
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if len(body) < self.minimum_size and not more_body:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers["Content-Encoding"] = compressor.encoding
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                body = await compress(body, final=not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+            else:
+                body = await compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -4,9 +4,23 @@
 # Converts the R Plumber API into a Python FastAPI service.
 #
 # This API:
-# - Connects to Supabase PostgreSQL using psycopg2
+# - Connects to Supabase PostgreSQL using psycopg2 (pooled connections, see db.py)
+# - Runs every query in a worker thread (db.run_db) so the event loop never blocks
+# - Keeps the small locations table in an in-memory TTL cache (locations_cache.py)
 # - Exposes congestion data via /locations, /readings, /summary
-# - Calls Ollama Cloud via /ai-summary to generate an AI summary
+# - Pages /readings with a keyset cursor and streams large windows via /readings.ndjson
+# - Exports readings as Arrow / Parquet record batches (/readings.arrow, /readings.parquet)
+# - Formats readings in SQL and encodes them with orjson (no per-row Pydantic models)
+# - Answers /summary and /ai-summary from hourly/daily rollup tables (supabase/rollups.sql)
+#   in one query joined to locations, run as a per-connection prepared statement (db.fetch_prepared)
+# - Calls Ollama Cloud via /ai-summary to generate an AI summary (one shared HTTP client, llm_client.py)
+# - Streams /ai-summary/stream token by token as Server-Sent Events
+# - Tags read responses with ETags per dataset version and answers 304 when unchanged (http_cache.py)
+# - Caches AI summaries by a hash of model, temperature and prompt (llm_cache.py)
+# - Compresses responses with brotli/gzip per Accept-Encoding and renders JSON with orjson (encoding.py)
+# - Exposes Prometheus metrics at /metrics and per-stage Server-Timing headers (metrics.py)
+# - Pushes new readings per dataset to /live subscribers as Server-Sent Events (live.py)
+# - Serves /timeseries already bucketed (or LTTB-downsampled, downsample.py) to the plot's pixel width
 #
 # Students learn how to:
 # - Read env vars from a shared .env
@@ -17,18 +31,46 @@
 
 ## 0.1 Load packages ############################
 
+import asyncio
+import hmac
 import os
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 import httpx
+import orjson
 import psycopg2
-import psycopg2.extras
+import psycopg2.errors
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from arrow_export import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE, arrow_stream, parquet_stream
+from db import close_pool, fetch_prepared, iter_batches, open_pool, pool_stats
+from downsample import lttb_indices
+from encoding import CompressionMiddleware, ORJSONResponse
+from http_cache import conditional_get
+from llm_cache import LLMCache, cache_key
+from live import LiveHub, simulate_ingest
+from llm_client import close_llm_client, llm_post, llm_stats, llm_stream, open_llm_client
+from locations_cache import LocationsCache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import MetricsMiddleware, record_llm_usage, render, sample_family
+from queries import (
+    READINGS_EXPORT_SELECT,
+    READINGS_SELECT,
+    decode_cursor,
+    encode_cursor,
+    parse_ts,
+    readings_page_query,
+    readings_where,
+    summary_query,
+    timeseries_query,
+)
+
 
 ## 0.2 Environment ###############################
 
@@ -42,66 +84,40 @@ else:
     print(f"Warning: .env not found at {env_file}. Make sure it exists in the repo root.")
 
 
-def get_db_conn():
-    """
-    Create a new PostgreSQL connection using Supabase connection pooling.
-    Uses env vars: SUPABASE_DB_HOST, SUPABASE_DB_PORT, SUPABASE_DB_NAME,
-    SUPABASE_DB_USER, SUPABASE_DB_PASSWORD.
-    """
-    host = os.getenv("SUPABASE_DB_HOST")
-    user = os.getenv("SUPABASE_DB_USER")
-    password = os.getenv("SUPABASE_DB_PASSWORD")
-    if not host or not user or not password:
-        raise HTTPException(
-            status_code=500,
-            detail="Database environment variables are not set. "
-            "Set SUPABASE_DB_HOST, SUPABASE_DB_USER, and SUPABASE_DB_PASSWORD in .env.",
-        )
-
-    port = int(os.getenv("SUPABASE_DB_PORT", "5432"))
-    dbname = os.getenv("SUPABASE_DB_NAME", "postgres")
-
-    # Supabase requires SSL
-    conn = psycopg2.connect(
-        host=host,
-        port=port,
-        dbname=dbname,
-        user=user,
-        password=password,
-        sslmode="require",
-    )
-    return conn
+# Sampling temperature for /ai-summary (part of the LLM cache key)
+AI_SUMMARY_TEMPERATURE = 0.2
 
 
-async def call_openai_summary(prompt_text: str) -> str:
+async def call_openai_summary(prompt_text: str, model: str, temperature: float = AI_SUMMARY_TEMPERATURE) -> str:
     """
     Call OpenAI's chat completions API and return the assistant's message content.
-    Uses env vars: OPENAI_API_KEY and optional OPENAI_MODEL (default: gpt-4o-mini).
+    Uses env vars: OPENAI_API_KEY and optional OPENAI_BASE_URL (default:
+    https://api.openai.com/v1; point it at a local stub for testing).
     """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not set in .env.")
 
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
 
     payload = {
         "model": model,
         "messages": [{"role": "user", "content": prompt_text}],
-        "temperature": 0.2,
+        "temperature": temperature,
     }
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-        resp.raise_for_status()
+        # Shared keep-alive client with retries (llm_client.py)
+        resp = await llm_post(
+            f"{base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+        )
         data = resp.json()
+        record_llm_usage(data.get("usage"))
         # Expected shape: { choices: [ { message: { role, content } } ] }
         choices = data.get("choices", [])
         if not choices:
@@ -115,6 +131,48 @@ async def call_openai_summary(prompt_text: str) -> str:
         raise HTTPException(status_code=502, detail=f"OpenAI API error: {exc}") from exc
 
 
+async def stream_openai_summary(prompt_text: str, model: str, temperature: float = AI_SUMMARY_TEMPERATURE):
+    """
+    Streamed variant of call_openai_summary: yields pieces of the assistant's
+    message as the API sends them ("stream": true, Server-Sent Events upstream).
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not set in .env.")
+
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt_text}],
+        "temperature": temperature,
+        "stream": True,
+        # Ask for a final chunk with token counts (for /metrics)
+        "stream_options": {"include_usage": True},
+    }
+
+    try:
+        async for line in llm_stream(
+            f"{base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            json=payload,
+        ):
+            # Each event line looks like: data: { choices: [ { delta: { content } } ] }
+            if not line.startswith("data:"):
+                continue
+            chunk = line[len("data:"):].strip()
+            if chunk == "[DONE]":
+                continue  # read on to the end so the connection can be reused
+            event = orjson.loads(chunk)
+            record_llm_usage(event.get("usage"))
+            choices = event.get("choices") or [{}]
+            text = (choices[0].get("delta") or {}).get("content")
+            if text:
+                yield text
+    except (httpx.HTTPError, orjson.JSONDecodeError) as exc:
+        raise HTTPException(status_code=502, detail=f"OpenAI API error: {exc}") from exc
+
+
 # 1. Pydantic models #################################
 
 
@@ -150,11 +208,91 @@ class AISummaryResponse(BaseModel):
 
 # 2. FastAPI app #################################
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown hooks: open the DB connection pool and the shared LLM HTTP
+    client once, close both on exit. If the database is not configured or
+    reachable, the app still starts and the first DB request retries (and
+    reports a clear error if it still fails).
+    """
+    try:
+        open_pool()
+    except (HTTPException, psycopg2.Error) as exc:
+        detail = getattr(exc, "detail", exc)
+        print(f"Warning: database pool not opened at startup: {detail}")
+    open_llm_client()
+    ingest_task = None
+    if live_simulate_seconds > 0:
+        ingest_task = asyncio.create_task(simulate_ingest(live_hub, live_simulate_datasets, live_simulate_seconds))
+    yield
+    if ingest_task is not None:
+        ingest_task.cancel()
+        # Let it finish its current insert before the pool it uses is closed
+        with suppress(asyncio.CancelledError):
+            await ingest_task
+    await close_llm_client()
+    close_pool()
+
+
+# State-changing /cache/* endpoints need `Authorization: Bearer <API_ADMIN_TOKEN>`; unset disables them
+admin_token = os.getenv("API_ADMIN_TOKEN") or None
+
+# Shared copy of the locations table (LOCATIONS_CACHE_TTL seconds, default 300)
+locations_cache = LocationsCache(ttl_seconds=float(os.getenv("LOCATIONS_CACHE_TTL", "300")))
+
+# AI summaries keyed by (model, temperature, prompt): in-memory LRU, plus SQLite if LLM_CACHE_DB is set
+llm_cache = LLMCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL", "86400")),
+    sqlite_path=os.getenv("LLM_CACHE_DB") or None,
+)
+
+# New readings pushed to GET /live subscribers, with rolling per-location aggregates
+live_hub = LiveHub(
+    queue_size=int(os.getenv("API_LIVE_QUEUE_SIZE", "256")),
+    window_seconds=float(os.getenv("API_LIVE_WINDOW_SECONDS", "3600")),
+)
+# Seconds between /live keep-alive comments on an idle stream
+LIVE_HEARTBEAT_SECONDS = 15.0
+# API_LIVE_SIMULATE_SECONDS > 0 inserts and publishes a reading per location at that interval (local DB only)
+live_simulate_seconds = float(os.getenv("API_LIVE_SIMULATE_SECONDS", "0"))
+live_simulate_datasets = [d.strip() for d in os.getenv("API_LIVE_SIMULATE_DATASETS", "dataset_a").split(",") if d.strip()]
+
+# API_DEBUG_VALIDATION=1 validates /readings rows through the Reading model (slower; for debugging)
+DEBUG_VALIDATION = os.getenv("API_DEBUG_VALIDATION", "0") == "1"
+
+# Answer summaries from the hourly/daily rollup tables (set SUMMARY_USE_ROLLUPS=0 to scan raw readings)
+summary_use_rollups = os.getenv("SUMMARY_USE_ROLLUPS", "1") != "0"
+
+# /timeseries: widest plot served (pixels), and buckets per pixel fed to LTTB
+TIMESERIES_MAX_WIDTH = 4000
+LTTB_OVERSAMPLE = 8
+
+# API_FAST_JSON=0 falls back to FastAPI's standard-library JSONResponse for dict/list returns
+fast_json = os.getenv("API_FAST_JSON", "1") != "0"
+
 app = FastAPI(
     title="City Congestion Tracker API",
     description="REST API for congestion readings and AI summaries (FastAPI + Supabase + Ollama Cloud).",
+    lifespan=lifespan,
+    **({"default_response_class": ORJSONResponse} if fast_json else {}),
 )
 
+# brotli/gzip for bodies of API_COMPRESS_MIN_BYTES or more (0 disables); Arrow, Parquet and SSE pass through
+compress_min_bytes = int(os.getenv("API_COMPRESS_MIN_BYTES", "1024"))
+if compress_min_bytes > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=compress_min_bytes,
+        gzip_level=int(os.getenv("API_GZIP_LEVEL", "6")),
+        brotli_quality=int(os.getenv("API_BROTLI_QUALITY", "5")),
+    )
+
+# Outermost, so request latency includes compression; route labels come from the app's own routes
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
 
 # 3. Endpoints #################################
 
@@ -181,25 +319,125 @@ async def health():
     }
 
 
+@app.get("/pool-stats")
+async def get_pool_stats():
+    """Connection pool size and usage counters (open, idle, in_use, checkouts, ...)."""
+    return pool_stats()
+
+
 @app.get("/locations", response_model=List[Location])
 async def get_locations():
-    """List all locations from the locations table."""
-    conn = get_db_conn()
-    try:
-        with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                "SELECT location_id, name, zone "
-                "FROM locations "
-                "ORDER BY location_id"
-            )
-            rows = cur.fetchall()
-        return [Location(**row) for row in rows]
-    finally:
-        conn.close()
+    """List all locations (served from the in-memory locations cache)."""
+    rows = await locations_cache.rows()
+    return [Location(**row) for row in rows]
 
 
-@app.get("/readings", response_model=List[Reading])
-async def get_readings(
+@app.get("/llm-stats")
+async def get_llm_stats():
+    """Outbound LLM call counts, retries, errors, and latency percentiles (ms)."""
+    return llm_stats()
+
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters for the locations cache and the AI summary cache."""
+    return {"locations": locations_cache.stats(), "ai_summary": llm_cache.stats()}
+
+
+@app.get("/live-stats")
+async def get_live_stats():
+    """Open /live streams, events published and delivered, and resyncs sent to slow subscribers."""
+    return live_hub.stats()
+
+
+def scrape_families() -> list:
+    """/metrics families read at scrape time from the pool, cache and /live counters."""
+    pool = pool_stats()
+    prepared = pool.get("prepared", {})
+    live = live_hub.stats()
+    caches = {"locations": locations_cache.stats(), "ai_summary": llm_cache.stats()}
+    hits = {
+        "locations": caches["locations"]["hits"],
+        "ai_summary": caches["ai_summary"]["memory_hits"] + caches["ai_summary"]["sqlite_hits"],
+    }
+    ratios = []
+    for name, n_hits in hits.items():
+        lookups = n_hits + caches[name]["misses"]
+        ratios.append(({"cache": name}, n_hits / lookups if lookups else None))
+    return [
+        sample_family(
+            "congestion_db_pool_connections",
+            "gauge",
+            "Open pooled database connections by state.",
+            [({"state": state}, pool.get(state)) for state in ("idle", "in_use")],
+        ),
+        sample_family("congestion_db_pool_max_connections", "gauge", "Pool size limit.", [({}, pool.get("max_size"))]),
+        sample_family(
+            "congestion_db_pool_events_total",
+            "counter",
+            "Pool checkouts, health pings, discarded connections and checkout timeouts.",
+            [({"event": event}, pool.get(event)) for event in ("checkouts", "pings", "discarded", "timeouts")],
+        ),
+        sample_family(
+            "congestion_db_prepared_statements_total",
+            "counter",
+            "Prepared statement PREPAREs, EXECUTEs and DEALLOCATEs.",
+            [({"event": event}, prepared.get(event)) for event in ("prepares", "executes", "deallocates")],
+        ),
+        sample_family(
+            "congestion_cache_events_total",
+            "counter",
+            "Cache lookups and maintenance events by cache and result.",
+            [
+                ({"cache": name, "result": key}, value)
+                for name, stats in caches.items()
+                for key, value in stats.items()
+                if key in ("hits", "memory_hits", "sqlite_hits", "misses", "coalesced", "stores", "loads", "invalidations")
+            ],
+        ),
+        sample_family("congestion_cache_hit_ratio", "gauge", "Hits / (hits + misses) since start.", ratios),
+        sample_family("congestion_live_subscribers", "gauge", "Open /live streams.", [({}, live["subscribers"])]),
+        sample_family(
+            "congestion_live_events_total",
+            "counter",
+            "/live events: published batches, deliveries to subscribers and resyncs sent to slow ones.",
+            [({"event": event}, live[event]) for event in ("published", "delivered", "resyncs")],
+        ),
+    ]
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text format: per-route request latency and in-flight gauges,
+    DB connect/query/fetch times, LLM call times and tokens, pool and cache counters.
+    """
+    return Response(content=render(*scrape_families()), media_type=METRICS_CONTENT_TYPE)
+
+
+def require_admin(authorization: Optional[str] = Header(default=None)):
+    """Dependency for admin endpoints: 403 unless API_ADMIN_TOKEN is set and sent as a Bearer token."""
+    if admin_token is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (API_ADMIN_TOKEN is not set).")
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {admin_token}".encode()):
+        raise HTTPException(status_code=401, detail="Missing or wrong admin token.", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.post("/cache/locations/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_locations_cache():
+    """Drop the cached locations table. Called by the data loader after it rewrites locations."""
+    version = locations_cache.invalidate()
+    return {"status": "ok", "version": version}
+
+
+@app.post("/cache/ai-summary/clear", dependencies=[Depends(require_admin)])
+async def clear_ai_summary_cache():
+    """Drop every cached AI summary (memory and SQLite), e.g. after changing the prompt wording."""
+    cleared = llm_cache.clear()
+    return {"status": "ok", "cleared": cleared}
+
+
+def readings_filters(
     location_id: Optional[List[str]] = Query(
         default=None, description="Filter by location_id (can pass multiple)"
     ),
@@ -218,67 +456,171 @@ async def get_readings(
     dataset: Optional[str] = Query(
         default=None, description="Test dataset label (e.g. default, dataset_a, dataset_b, dataset_c)"
     ),
+    after_id: Optional[int] = Query(
+        default=None, description="Only readings with a larger id (incremental refresh: the highest id already loaded)"
+    ),
+    after_ts: Optional[str] = Query(
+        default=None, description="Only readings strictly after this time (ISO8601; narrows the scan for after_id)"
+    ),
 ):
     """
-    Get congestion readings with optional filters.
-    Returns at most 1000 most recent rows for performance.
+    Query filters shared by /readings, /readings.ndjson, /readings.arrow and /readings.parquet.
+    Returns (where_sql, params) for queries.READINGS_SELECT.
     """
-    conn = get_db_conn()
-    try:
-        clauses = ["1=1"]
-        params = []
-
-        if location_id:
-            clauses.append("r.location_id = ANY(%s)")
-            params.append(location_id)
-        if from_ts:
-            clauses.append("r.ts >= %s")
-            params.append(from_ts)
-        if to_ts:
-            clauses.append("r.ts <= %s")
-            params.append(to_ts)
-        if min_level is not None:
-            try:
-                min_int = int(min_level)
-            except (TypeError, ValueError):
-                min_int = None
-            if min_int is not None:
-                clauses.append("r.congestion_level >= %s")
-                params.append(min_int)
-        if level:
-            clauses.append("r.congestion_level = ANY(%s)")
-            params.append(level)
-        if dataset:
-            clauses.append("r.dataset_label = %s")
-            params.append(dataset)
-
-        where_sql = " AND ".join(clauses)
-        sql = (
-            "SELECT r.id, r.location_id, l.name AS location_name, "
-            "r.ts, r.congestion_level, r.delay_minutes "
-            "FROM congestion_readings r "
-            "JOIN locations l ON l.location_id = r.location_id "
-            f"WHERE {where_sql} "
-            "ORDER BY r.ts DESC "
-            "LIMIT 1000"
-        )
+    return readings_where(location_id, from_ts, to_ts, min_level, level, dataset, after_id, after_ts)
 
-        with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
-            rows = cur.fetchall()
 
-        # Format timestamps as ISO8601 strings
-        for row in rows:
-            ts_val = row.get("ts")
-            if isinstance(ts_val, datetime):
-                row["ts"] = ts_val.replace(tzinfo=timezone.utc).isoformat()
+@app.get("/readings", response_model=List[Reading])
+async def get_readings(
+    response: Response,
+    filters: tuple = Depends(readings_filters),
+    validators: tuple = Depends(conditional_get),
+    limit: int = Query(
+        default=1000, ge=1, le=10000, description="Page size (max 10000)"
+    ),
+    cursor: Optional[str] = Query(
+        default=None, description="Opaque cursor from a previous page's X-Next-Cursor header"
+    ),
+):
+    """
+    Get congestion readings with optional filters, newest first.
+    Returns one page of at most `limit` rows. When more rows match, the
+    X-Next-Cursor response header holds a cursor for the next page.
+    Rows arrive from SQL already JSON-ready and are encoded with orjson;
+    set API_DEBUG_VALIDATION=1 to validate them through the Reading model instead.
+    Sends an ETag; a request with a matching If-None-Match gets 304 Not Modified.
+    """
+    cache_headers, not_modified = validators
+    if not_modified is not None:
+        return not_modified
+    where_sql, params = filters
+
+    # Keyset pagination on (ts, id): continue strictly after the previous page's last row
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    # Ask for one extra row to learn whether another page exists
+    sql, params = readings_page_query(where_sql, params, limit + 1, after)
+    rows = await fetch_prepared(sql, params)
+
+    headers = dict(cache_headers)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["ts"], rows[-1]["id"])
+
+    if DEBUG_VALIDATION:
+        # Slow path: FastAPI validates and serializes every row through response_model
+        response.headers.update(headers)
         return [Reading(**row) for row in rows]
-    finally:
-        conn.close()
+    # Fast path: returning a Response skips response_model validation entirely
+    return Response(content=orjson.dumps(rows), media_type="application/json", headers=headers)
+
+
+def _export_sql(select_sql: str, filters: tuple, limit: Optional[int]):
+    """Full SQL + params for a streamed export: newest first, optional row limit."""
+    where_sql, params = filters
+    sql = select_sql + f"WHERE {where_sql} ORDER BY r.ts DESC, r.id DESC"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params = params + [limit]
+    return sql, params
+
+
+# Rows fetched from the server-side cursor per streamed chunk (and per Parquet row group)
+EXPORT_BATCH_SIZE = 20000
+
+
+@app.get("/readings.ndjson")
+async def stream_readings(
+    filters: tuple = Depends(readings_filters),
+    validators: tuple = Depends(conditional_get),
+    limit: Optional[int] = Query(default=None, ge=1, description="Optional maximum number of rows"),
+):
+    """
+    Stream every matching reading as newline-delimited JSON (one object per line), newest first.
+    Rows come from a server-side cursor in batches, so the API's memory use stays
+    flat no matter how wide the time window is.
+    """
+    cache_headers, not_modified = validators
+    if not_modified is not None:
+        return not_modified
+    sql, params = _export_sql(READINGS_SELECT, filters, limit)
+
+    def ndjson_lines():
+        for batch in iter_batches(sql, params):
+            yield b"".join(orjson.dumps(row) + b"\n" for row in batch)
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers=cache_headers)
+
+
+@app.get("/readings.arrow")
+async def export_readings_arrow(
+    filters: tuple = Depends(readings_filters),
+    validators: tuple = Depends(conditional_get),
+    limit: Optional[int] = Query(default=None, ge=1, description="Optional maximum number of rows"),
+):
+    """
+    Stream matching readings as an Apache Arrow IPC stream (zstd-compressed record batches).
+    Read it with pyarrow.ipc.open_stream(...).read_all().to_pandas().
+    """
+    cache_headers, not_modified = validators
+    if not_modified is not None:
+        return not_modified
+    sql, params = _export_sql(READINGS_EXPORT_SELECT, filters, limit)
+    batches = iter_batches(sql, params, batch_size=EXPORT_BATCH_SIZE, as_dicts=False)
+    return StreamingResponse(arrow_stream(batches), media_type=ARROW_MEDIA_TYPE, headers=cache_headers)
+
+
+@app.get("/readings.parquet")
+async def export_readings_parquet(
+    filters: tuple = Depends(readings_filters),
+    validators: tuple = Depends(conditional_get),
+    limit: Optional[int] = Query(default=None, ge=1, description="Optional maximum number of rows"),
+):
+    """Stream matching readings as a Parquet file (one row group per batch of rows)."""
+    cache_headers, not_modified = validators
+    if not_modified is not None:
+        return not_modified
+    sql, params = _export_sql(READINGS_EXPORT_SELECT, filters, limit)
+    batches = iter_batches(sql, params, batch_size=EXPORT_BATCH_SIZE, as_dicts=False)
+    return StreamingResponse(
+        parquet_stream(batches),
+        media_type=PARQUET_MEDIA_TYPE,
+        headers={**cache_headers, "Content-Disposition": 'attachment; filename="congestion_readings.parquet"'},
+    )
+
+
+async def fetch_summary_rows(from_ts, to_ts, location_id, level, dataset) -> list:
+    """
+    Per-location rows (location_id, name, zone, n, avg_level, max_level) for
+    /summary and /ai-summary, aggregated and joined to locations in one
+    prepared query. Reads the hourly/daily rollup tables plus raw readings at
+    the window edges; falls back to raw readings only if the rollup tables have
+    not been created. Raises 422 for timestamps that are not ISO8601.
+    """
+    global summary_use_rollups
+    try:
+        parse_ts(from_ts), parse_ts(to_ts)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=f"from_ts / to_ts must be ISO8601 timestamps ({exc}).") from exc
+    if summary_use_rollups:
+        sql, params = summary_query(from_ts, to_ts, location_id, level, dataset, use_rollups=True)
+        try:
+            return await fetch_prepared(sql, params)
+        except psycopg2.errors.UndefinedTable:
+            print("Warning: rollup tables not found (run supabase/rollups.sql); summarizing raw readings.")
+            summary_use_rollups = False
+    sql, params = summary_query(from_ts, to_ts, location_id, level, dataset, use_rollups=False)
+    return await fetch_prepared(sql, params)
 
 
 @app.get("/summary", response_model=List[SummaryItem])
 async def get_summary(
+    response: Response,
     from_ts: Optional[str] = Query(
         default=None, description="Start time (ISO8601). Optional."
     ),
@@ -294,70 +636,117 @@ async def get_summary(
     dataset: Optional[str] = Query(
         default=None, description="Test dataset label (e.g. default, dataset_a, dataset_b, dataset_c)"
     ),
+    validators: tuple = Depends(conditional_get),
 ):
     """
     Per-location summary stats (count, average, max congestion_level) for an optional time window.
+    Rows come from SQL already joined to locations and typed, and are encoded with orjson;
+    set API_DEBUG_VALIDATION=1 to validate them through the SummaryItem model instead.
+    Sends an ETag; a request with a matching If-None-Match gets 304 Not Modified.
     """
-    conn = get_db_conn()
-    try:
-        clauses = ["1=1"]
-        params = []
-
-        if from_ts:
-            clauses.append("ts >= %s")
-            params.append(from_ts)
-        if to_ts:
-            clauses.append("ts <= %s")
-            params.append(to_ts)
-        if location_id:
-            clauses.append("location_id = ANY(%s)")
-            params.append(location_id)
-        if level:
-            clauses.append("congestion_level = ANY(%s)")
-            params.append(level)
-        if dataset:
-            clauses.append("dataset_label = %s")
-            params.append(dataset)
-
-        where_sql = " AND ".join(clauses)
-        sql = (
-            "SELECT location_id, "
-            "COUNT(*) AS n, "
-            "AVG(congestion_level) AS avg_level, "
-            "MAX(congestion_level) AS max_level "
-            "FROM congestion_readings "
-            f"WHERE {where_sql} "
-            "GROUP BY location_id "
-            "ORDER BY avg_level DESC"
-        )
-
-        with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
-            summary_rows = cur.fetchall()
+    cache_headers, not_modified = validators
+    if not_modified is not None:
+        return not_modified
+    summary_rows = await fetch_summary_rows(from_ts, to_ts, location_id, level, dataset)
+    if DEBUG_VALIDATION:
+        response.headers.update(cache_headers)
+        return [SummaryItem(**row) for row in summary_rows]
+    return Response(content=orjson.dumps(summary_rows), media_type="application/json", headers=cache_headers)
 
-        # Join with locations to get name and zone
-        with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT location_id, name, zone FROM locations")
-            loc_rows = cur.fetchall()
 
-        loc_lookup = {row["location_id"]: row for row in loc_rows}
+async def fetch_timeseries_rows(from_ts, to_ts, max_buckets, location_id, level, dataset, oversample):
+    """
+    (rows, step) for /timeseries: per-location buckets of at most max_buckets
+    (times oversample, see queries.timeseries_query) over the window, from
+    the rollup tables where the step allows, like fetch_summary_rows() (and
+    with the same fallback to raw readings).
+    """
+    global summary_use_rollups
+    if summary_use_rollups:
+        sql, params, step = timeseries_query(
+            from_ts, to_ts, max_buckets, location_id, level, dataset, oversample, use_rollups=True
+        )
+        try:
+            return await fetch_prepared(sql, params), step
+        except psycopg2.errors.UndefinedTable:
+            print("Warning: rollup tables not found (run supabase/rollups.sql); summarizing raw readings.")
+            summary_use_rollups = False
+    sql, params, step = timeseries_query(
+        from_ts, to_ts, max_buckets, location_id, level, dataset, oversample, use_rollups=False
+    )
+    return await fetch_prepared(sql, params), step
 
-        result = []
-        for row in summary_rows:
-            loc = loc_lookup.get(row["location_id"])
-            row["name"] = loc.get("name") if loc else None
-            row["zone"] = loc.get("zone") if loc else None
-            # psycopg2 returns Decimal for avg_level; cast to float
-            row["avg_level"] = float(row["avg_level"]) if row["avg_level"] is not None else 0.0
-            result.append(SummaryItem(**row))
 
-        return result
-    finally:
-        conn.close()
+@app.get("/timeseries")
+async def get_timeseries(
+    from_ts: str = Query(description="Start time (ISO8601)"),
+    to_ts: str = Query(description="End time (ISO8601)"),
+    width: int = Query(
+        default=800, ge=10, le=TIMESERIES_MAX_WIDTH, description="Plot width in pixels: at most this many points per location"
+    ),
+    method: Literal["buckets", "lttb"] = Query(
+        default="buckets", description="buckets: mean per time bucket; lttb: the most telling buckets (LTTB)"
+    ),
+    location_id: Optional[List[str]] = Query(
+        default=None, description="Filter by location_id (can pass multiple)"
+    ),
+    level: Optional[List[int]] = Query(
+        default=None, description="Filter to these congestion levels only (1–4)"
+    ),
+    dataset: Optional[str] = Query(
+        default=None, description="Test dataset label (e.g. default, dataset_a, dataset_b, dataset_c)"
+    ),
+    validators: tuple = Depends(conditional_get),
+):
+    """
+    Congestion over time per location, ready to plot: at most `width` points
+    per location, so the response size follows the plot and not the window.
+    With method=buckets each point is one time bucket (n, mean and max level);
+    the step is the finest of 15 min .. 28 days that fits the window into
+    `width` buckets. With method=lttb the window is bucketed up to
+    LTTB_OVERSAMPLE times finer (hourly at the finest for long windows, so
+    the rollups still answer) and LTTB keeps the `width` buckets that best preserve the
+    shape of each line (spikes survive). Series are columnar:
+    {"location_id", "name", "ts", "avg_level", "n", "max_level"}, ts being
+    each bucket's start. Sends an ETag like /readings.
+    """
+    cache_headers, not_modified = validators
+    if not_modified is not None:
+        return not_modified
+    oversample = LTTB_OVERSAMPLE if method == "lttb" else 1
+    try:
+        rows, step = await fetch_timeseries_rows(from_ts, to_ts, width, location_id, level, dataset, oversample)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    by_location = {}
+    for row in rows:
+        by_location.setdefault(row["location_id"], []).append(row)
+    series = []
+    for lid, points in by_location.items():
+        if method == "lttb":
+            keep = lttb_indices([p["bucket_epoch"] for p in points], [p["avg_level"] for p in points], width)
+            points = [points[i] for i in keep]
+        series.append(
+            {
+                "location_id": lid,
+                "name": points[0]["name"],
+                "ts": [datetime.fromtimestamp(p["bucket_epoch"], timezone.utc) for p in points],
+                "avg_level": [round(p["avg_level"], 3) for p in points],
+                "n": [p["n"] for p in points],
+                "max_level": [p["max_level"] for p in points],
+            }
+        )
+    body = {
+        "method": method,
+        "step_seconds": int(step.total_seconds()),
+        "width": width,
+        "series": series,
+    }
+    return Response(content=orjson.dumps(body), media_type="application/json", headers=cache_headers)
 
 
-@app.post("/ai-summary", response_model=AISummaryResponse)
-async def ai_summary(
+async def ai_summary_inputs(
     from_ts: Optional[str] = Query(
         default=None, description="Start time (ISO8601). Use with to_ts for query-based summary."
     ),
@@ -377,87 +766,145 @@ async def ai_summary(
         default=None, description="Test dataset label (e.g. default, dataset_a, dataset_b, dataset_c)"
     ),
 ):
+    """
+    Shared by /ai-summary and /ai-summary/stream: aggregate the window and
+    render the LLM prompt. Returns (summary_items, prompt); prompt is None when
+    no readings match.
+    """
+    if from_ts and to_ts:
+        window_from, window_to = from_ts, to_ts
+        time_desc = f"from {from_ts} to {to_ts}"
+    else:
+        now = datetime.now(timezone.utc)
+        start = now - timedelta(days=days)
+        window_from, window_to = start.isoformat(), now.isoformat()
+        time_desc = f"for the last {days} days"
+
+    summary_rows = await fetch_summary_rows(window_from, window_to, location_id, level, dataset)
+    if not summary_rows:
+        return [], None
+    summary_items = [SummaryItem(**row) for row in summary_rows]
+
+    # Build compact text for the model
+    lines = [
+        f"location_id={item.location_id}, name={item.name}, zone={item.zone}, "
+        f"n={item.n}, avg_level={item.avg_level:.2f}, max_level={item.max_level}"
+        for item in summary_items
+    ]
+    table_text = "\n".join(lines)
+    prompt = (
+        "You are a transportation analyst. Based on this congestion data, write a short "
+        "(3–5 sentence) actionable summary: which areas are worst, how it compares to "
+        "typical patterns, and what to watch or which roads to avoid. Be concise.\n\n"
+        f"Time window: {time_desc}\n\n"
+        f"{table_text}"
+    )
+    return summary_items, prompt
+
+
+NO_DATA_ERROR = "No data found for the requested time window."
+
+
+@app.post("/ai-summary", response_model=AISummaryResponse)
+async def ai_summary(response: Response, inputs=Depends(ai_summary_inputs)):
     """
     AI-generated narrative summary of congestion for the given filters (or last N days).
+    Identical prompts are answered from the LLM cache; the X-Cache header says hit or miss.
     """
-    conn = get_db_conn()
-    try:
-        if from_ts and to_ts:
-            clauses = ["ts >= %s", "ts <= %s"]
-            params = [from_ts, to_ts]
-            time_desc = f"from {from_ts} to {to_ts}"
-        else:
-            now = datetime.now(timezone.utc)
-            start = now - timedelta(days=days)
-            clauses = ["ts >= %s", "ts <= %s"]
-            params = [start.isoformat(), now.isoformat()]
-            time_desc = f"for the last {days} days"
-
-        if location_id:
-            clauses.append("location_id = ANY(%s)")
-            params.append(location_id)
-        if level:
-            clauses.append("congestion_level = ANY(%s)")
-            params.append(level)
-        if dataset:
-            clauses.append("dataset_label = %s")
-            params.append(dataset)
-
-        where_sql = " AND ".join(clauses)
-        sql = (
-            "SELECT location_id, "
-            "COUNT(*) AS n, "
-            "AVG(congestion_level) AS avg_level, "
-            "MAX(congestion_level) AS max_level "
-            "FROM congestion_readings "
-            f"WHERE {where_sql} "
-            "GROUP BY location_id "
-            "ORDER BY avg_level DESC"
-        )
+    summary_items, prompt = inputs
+    if prompt is None:
+        return AISummaryResponse(summary=None, data=[], error=NO_DATA_ERROR)
+
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    summary_text, cache_status = await llm_cache.get_or_call(
+        cache_key(model, AI_SUMMARY_TEMPERATURE, prompt),
+        lambda: call_openai_summary(prompt, model),
+    )
+    response.headers["X-Cache"] = cache_status
+    return AISummaryResponse(summary=summary_text, data=summary_items, error=None)
+
+
+def _sse(event: str, data) -> bytes:
+    """One Server-Sent Event; data is JSON so newlines in the text are safe."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
 
-        with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
-            summary_rows = cur.fetchall()
-
-        if not summary_rows:
-            return AISummaryResponse(
-                summary=None,
-                data=[],
-                error="No data found for the requested time window.",
-            )
-
-        # Join with locations to add names/zones
-        with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT location_id, name, zone FROM locations")
-            loc_rows = cur.fetchall()
-
-        loc_lookup = {row["location_id"]: row for row in loc_rows}
-        summary_items = []
-        for row in summary_rows:
-            loc = loc_lookup.get(row["location_id"])
-            row["name"] = loc.get("name") if loc else None
-            row["zone"] = loc.get("zone") if loc else None
-            row["avg_level"] = float(row["avg_level"]) if row["avg_level"] is not None else 0.0
-            summary_items.append(SummaryItem(**row))
-
-        # Build compact text for the model
-        lines = [
-            f"location_id={item.location_id}, name={item.name}, zone={item.zone}, "
-            f"n={item.n}, avg_level={item.avg_level:.2f}, max_level={item.max_level}"
-            for item in summary_items
-        ]
-        table_text = "\n".join(lines)
-        prompt = (
-            "You are a transportation analyst. Based on this congestion data, write a short "
-            "(3–5 sentence) actionable summary: which areas are worst, how it compares to "
-            "typical patterns, and what to watch or which roads to avoid. Be concise.\n\n"
-            f"Time window: {time_desc}\n\n"
-            f"{table_text}"
-        )
 
-        summary_text = await call_openai_summary(prompt)
-        return AISummaryResponse(summary=summary_text, data=summary_items, error=None)
-    finally:
-        conn.close()
+@app.post("/ai-summary/stream")
+async def ai_summary_stream(inputs=Depends(ai_summary_inputs)):
+    """
+    Same as /ai-summary, streamed as Server-Sent Events so text shows up as the model writes it:
+    - `data`:  the SummaryItem list (sent first, before the model is called)
+    - `token`: {"text": ...} for each piece of the summary
+    - `done`:  {"summary": full text}, or `error`: {"error": ...}
+    Cached answers arrive as a single token event (X-Cache: hit).
+    """
+    summary_items, prompt = inputs
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = cached = None
+    if prompt is not None:
+        key = cache_key(model, AI_SUMMARY_TEMPERATURE, prompt)
+        cached, _ = await llm_cache.get(key)
+
+    async def events():
+        yield _sse("data", [item.model_dump() for item in summary_items])
+        if prompt is None:
+            yield _sse("error", {"error": NO_DATA_ERROR})
+            return
+        if cached is not None:
+            yield _sse("token", {"text": cached})
+            yield _sse("done", {"summary": cached})
+            return
+        parts = []
+        try:
+            async for text in stream_openai_summary(prompt, model):
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except HTTPException as exc:
+            yield _sse("error", {"error": exc.detail})
+            return
+        summary_text = "".join(parts)
+        await llm_cache.put(key, summary_text)
+        yield _sse("done", {"summary": summary_text})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Tell proxies (nginx, etc.) not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Cache": "miss" if cached is None else "hit"},
+    )
 
 
+@app.get("/live")
+async def live_readings(
+    dataset: Optional[List[str]] = Query(
+        default=None, description="dataset_label(s) to follow (repeatable); every dataset when omitted"
+    ),
+):
+    """
+    Server-Sent Events stream of new readings as they are added:
+    - `readings`: {"dataset", "readings": rows shaped like /readings, "locations":
+      per-location n / avg_level / max_level over the last API_LIVE_WINDOW_SECONDS}
+    - `resync`:   this client fell behind and missed events of `datasets` (null:
+                  every dataset); reload them with after_id
+    A `: keep-alive` comment goes out every 15 seconds while nothing happens.
+    """
+    queue = live_hub.subscribe(dataset)
+
+    async def events():
+        try:
+            yield _sse("subscribed", {"datasets": dataset, "window_seconds": live_hub.window_seconds})
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield _sse(event, data)
+        finally:
+            live_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
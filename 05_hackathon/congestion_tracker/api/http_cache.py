@@ -0,0 +1,110 @@
+# http_cache.py
+# City Congestion Tracker – conditional GET (ETag / If-None-Match) for read endpoints
+# Pairs with fastapi_app.py and supabase/data_versions.sql
+#
+# A dashboard refresh asks for the same /readings and /summary windows again
+# and again, usually with no new readings in between. Each response carries a
+# weak ETag derived from the request (path + query) and the data version of the
+# dataset it reads; a client that sends it back in If-None-Match gets an empty
+# 304 Not Modified instead of the same rows, after one primary-key lookup.
+# Responses also carry X-Data-Generation, which changes only when readings were
+# deleted or rewritten (not when rows were appended): a client holding rows
+# and fetching only newer ones (after_id) reloads when it changes.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import hashlib
+from typing import Optional
+
+import psycopg2
+from fastapi import Request, Response
+
+from db import fetch_all
+
+# Clients may keep responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+# 1. Data version tokens #################################
+
+# congestion_data_versions (loader-bumped counter per dataset_label) when it
+# exists and has a row for the dataset, otherwise max(id) per dataset_label
+_use_version_table = True
+
+
+async def data_version(dataset: Optional[str]):
+    """
+    (token, generation) for the readings of `dataset` (every dataset when None).
+    token changes whenever the readings change; generation only when rows were
+    deleted or rewritten. One indexed lookup, no scan of the readings.
+    """
+    global _use_version_table
+    if _use_version_table:
+        try:
+            if dataset:
+                rows = await fetch_all(
+                    "SELECT dataset_label, version, replaced_version FROM congestion_data_versions "
+                    "WHERE dataset_label = %s",
+                    [dataset],
+                )
+            else:
+                rows = await fetch_all(
+                    "SELECT dataset_label, version, replaced_version FROM congestion_data_versions "
+                    "ORDER BY dataset_label"
+                )
+            if rows:
+                token = "v:" + ",".join(f"{row['dataset_label']}={row['version']}" for row in rows)
+                generation = "v:" + ",".join(f"{row['dataset_label']}={row['replaced_version']}" for row in rows)
+                return token, generation
+            # Not registered yet: a constant "v:" would answer 304 forever
+        except psycopg2.errors.UndefinedTable:
+            print("Warning: congestion_data_versions not found (run supabase/data_versions.sql); using max(id) for ETags.")
+            _use_version_table = False
+    # A reload (TRUNCATE + COPY) gives every row a new, larger id, so min(id) moves
+    if dataset:
+        rows = await fetch_all(
+            "SELECT min(id) AS min_id, max(id) AS max_id FROM congestion_readings WHERE dataset_label = %s", [dataset]
+        )
+    else:
+        rows = await fetch_all("SELECT min(id) AS min_id, max(id) AS max_id FROM congestion_readings")
+    return f"id:{rows[0]['max_id']}", f"id:{rows[0]['min_id']}"
+
+
+# 2. ETags #################################
+
+
+def make_etag(request: Request, token: str) -> str:
+    """Weak ETag for this path + query string at this data version."""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}|{token}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (a list of tags, or *)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: str, generation: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL, "X-Data-Generation": generation}
+
+
+async def conditional_get(request: Request):
+    """
+    Validator for one read request: returns (headers, not_modified_response).
+    not_modified_response is a ready 304 when the client's copy is current,
+    else None and the endpoint attaches `headers` to its full response.
+    """
+    token, generation = await data_version(request.query_params.get("dataset"))
+    etag = make_etag(request, token)
+    headers = cache_headers(etag, generation)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return headers, Response(status_code=304, headers=headers)
+    return headers, None
@@ -0,0 +1,222 @@
+# live.py
+# City Congestion Tracker – live push of new readings per dataset (Server-Sent Events)
+# Pairs with fastapi_app.py and dashboard/live_feed.py
+#
+# Clients used to learn about new readings only by asking again. GET /live
+# keeps one Server-Sent Events stream open per client, and LiveHub sends a
+# `readings` event to every subscriber of a dataset_label as soon as readings
+# are added to it: the new rows (shaped like /readings rows) plus rolling
+# per-location aggregates over the last API_LIVE_WINDOW_SECONDS of readings.
+# Each subscriber has a bounded queue; one that falls behind has its backlog
+# replaced by a single `resync` event (reload from /readings with after_id).
+#
+# The ingest side is simulated here: with API_LIVE_SIMULATE_SECONDS > 0 the
+# API inserts one reading per location into each dataset in
+# API_LIVE_SIMULATE_DATASETS at that interval, refreshes the rollups and data
+# versions like the loader does, and publishes the new rows. Point it at the
+# local Postgres stand-in, never at a shared database.
+#
+# Students learn how to:
+# - Fan one event out to many streaming clients with asyncio queues
+# - Keep rolling aggregates without re-reading the database
+# - Protect a publisher from slow subscribers (bounded queues + resync)
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import random
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import psycopg2.extras
+
+from db import run_db
+from queries import READINGS_TS_SQL
+
+
+# 1. Rolling aggregates #################################
+
+
+class RollingAggregates:
+    """
+    Count, mean and max congestion_level per (dataset, location) over the last
+    window_seconds of published readings (by reading time, not arrival time).
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window = timedelta(seconds=window_seconds)
+        self._readings = {}  # (dataset, location_id) -> deque of (ts, level), oldest first
+        self._sums = {}  # (dataset, location_id) -> [level_sum, n]
+        self._newest = {}  # (dataset, location_id) -> latest ts seen
+
+    def add(self, dataset: str, rows: list) -> list:
+        """Add published rows; return the updated aggregates of the locations they touched."""
+        touched = {}
+        for row in rows:
+            key = (dataset, row["location_id"])
+            readings = self._readings.setdefault(key, deque())
+            sums = self._sums.setdefault(key, [0, 0])
+            ts = datetime.fromisoformat(row["ts"])
+            readings.append((ts, row["congestion_level"]))
+            self._newest[key] = max(ts, self._newest.get(key, ts))
+            sums[0] += row["congestion_level"]
+            sums[1] += 1
+            touched[key] = row.get("location_name")
+        out = []
+        for key, name in touched.items():
+            readings, sums = self._readings[key], self._sums[key]
+            newest = self._newest[key]
+            while readings and readings[0][0] < newest - self.window:
+                _, level = readings.popleft()
+                sums[0] -= level
+                sums[1] -= 1
+            out.append(
+                {
+                    "location_id": key[1],
+                    "name": name,
+                    "n": sums[1],
+                    "avg_level": round(sums[0] / sums[1], 3),
+                    "max_level": max(level for _, level in readings),
+                    "last_ts": newest.isoformat(),
+                }
+            )
+        return out
+
+
+# 2. Hub #################################
+
+
+class LiveHub:
+    """
+    Fans published readings out to /live subscribers, per dataset_label.
+    Use from the event loop only (asyncio.Queue is not thread-safe).
+    """
+
+    def __init__(self, queue_size: int = 256, window_seconds: float = 3600):
+        self.queue_size = queue_size
+        self.window_seconds = window_seconds
+        self._subscribers = {}  # queue -> set of dataset labels, or None for every dataset
+        self._rolling = RollingAggregates(window_seconds)
+        self._counters = {"published": 0, "delivered": 0, "resyncs": 0}
+
+    def subscribe(self, datasets: Optional[List[str]] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = set(datasets) if datasets else None
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.pop(queue, None)
+
+    def publish(self, dataset: str, rows: list) -> int:
+        """Send new readings of one dataset to its subscribers. Returns how many were reached."""
+        if not rows:
+            return 0
+        event = {
+            "dataset": dataset,
+            "readings": rows,
+            "locations": self._rolling.add(dataset, rows),
+            "window_seconds": self.window_seconds,
+        }
+        self._counters["published"] += 1
+        reached = 0
+        for queue, datasets in self._subscribers.items():
+            if datasets is not None and dataset not in datasets:
+                continue
+            try:
+                queue.put_nowait(("readings", event))
+            except asyncio.QueueFull:
+                # Too far behind to catch up event by event: drop the backlog, ask for a reload
+                while not queue.empty():
+                    queue.get_nowait()
+                # Only for the datasets this subscriber asked for (None: every dataset)
+                queue.put_nowait(("resync", {"datasets": sorted(datasets) if datasets is not None else None}))
+                self._counters["resyncs"] += 1
+            reached += 1
+        self._counters["delivered"] += reached
+        return reached
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "queued": sum(queue.qsize() for queue in self._subscribers),
+            **self._counters,
+        }
+
+
+# 3. Simulated ingest #################################
+
+# One reading per location, stamped now, inserted and returned in /readings row shape
+SIMULATED_INSERT_SQL = (
+    "WITH r AS ("
+    " INSERT INTO congestion_readings (location_id, ts, congestion_level, delay_minutes, dataset_label)"
+    " SELECT loc, %s, lvl, delay, %s FROM unnest(%s::text[], %s::int[], %s::numeric[]) AS t(loc, lvl, delay)"
+    " RETURNING id, location_id, ts, congestion_level, delay_minutes"
+    ") "
+    "SELECT r.id, r.location_id, l.name AS location_name, "
+    f"{READINGS_TS_SQL} AS ts, r.congestion_level, r.delay_minutes::float8 AS delay_minutes "
+    "FROM r JOIN locations l ON l.location_id = r.location_id ORDER BY r.id"
+)
+
+
+def _latest_levels(conn, dataset: str) -> dict:
+    """Last congestion_level per location of a dataset (where each random walk starts)."""
+    with conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT DISTINCT ON (location_id) location_id, congestion_level FROM congestion_readings "
+            "WHERE dataset_label = %s ORDER BY location_id, ts DESC",
+            [dataset],
+        )
+        return dict(cur.fetchall())
+
+
+def _insert_simulated(conn, dataset: str, levels: dict, ts: datetime) -> list:
+    """Insert one reading per location in one transaction, with partitions, rollups and data version kept current."""
+    location_ids = list(levels)
+    delays = [round(max(0.0, (levels[lid] - 1) * 4 + random.uniform(-1.5, 1.5)), 2) for lid in location_ids]
+    with conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            "SELECT to_regclass('congestion_rollup_hourly') IS NOT NULL AS rollups, "
+            "to_regclass('congestion_data_versions') IS NOT NULL AS versions, "
+            "to_regprocedure('ensure_congestion_partitions(timestamptz, timestamptz)') IS NOT NULL AS partitions"
+        )
+        installed = cur.fetchone()
+        if installed["partitions"]:
+            # The schema only creates partitions a few months ahead and has no DEFAULT partition
+            cur.execute("SELECT ensure_congestion_partitions(%s, %s)", [ts, ts])
+        cur.execute(SIMULATED_INSERT_SQL, [ts, dataset, location_ids, [levels[lid] for lid in location_ids], delays])
+        rows = cur.fetchall()
+        if installed["rollups"]:
+            cur.execute("SELECT refresh_congestion_rollups(%s, %s)", [ts, ts])
+        if installed["versions"]:
+            cur.execute("SELECT bump_congestion_data_versions(%s)", [[dataset]])
+    return [dict(row) for row in rows]
+
+
+async def simulate_ingest(hub: LiveHub, datasets: List[str], interval_seconds: float) -> None:
+    """
+    Every interval_seconds, add one reading per location to each dataset and
+    publish it. Levels follow a random walk (1-4) from each location's last
+    stored reading. Stops with a warning if the database refuses the insert.
+    """
+    try:
+        levels = {dataset: await run_db(_latest_levels, dataset) for dataset in datasets}
+    except Exception as exc:
+        print(f"Warning: simulated ingest not started: {exc}")
+        return
+    while True:
+        await asyncio.sleep(interval_seconds)
+        ts = datetime.now(timezone.utc)
+        for dataset, dataset_levels in levels.items():
+            if not dataset_levels:
+                continue
+            for lid, level in dataset_levels.items():
+                dataset_levels[lid] = min(4, max(1, level + random.choice((-1, 0, 0, 1))))
+            try:
+                rows = await run_db(_insert_simulated, dataset, dataset_levels, ts)
+            except Exception as exc:
+                print(f"Warning: simulated ingest stopped: {exc}")
+                return
+            hub.publish(dataset, rows)
@@ -0,0 +1,175 @@
+# llm_cache.py
+# City Congestion Tracker – content-addressed cache of /ai-summary LLM answers
+# Pairs with fastapi_app.py
+#
+# An /ai-summary call takes seconds and costs money, yet the dashboard often
+# asks again for exactly the same prompt (same filters, same data). Answers are
+# stored under a SHA-256 of (model, temperature, rendered prompt), so any change
+# to the data or the wording is a different key and never returns a stale answer.
+#
+# Two tiers:
+# - memory: an LRU of the most recent answers (per API process)
+# - sqlite: optional file (LLM_CACHE_DB) shared by workers and kept across restarts
+# Both expire entries after ttl_seconds.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import anyio
+
+
+# 1. Cache key #################################
+
+
+def cache_key(model: str, temperature: float, prompt: str) -> str:
+    """SHA-256 hex digest of everything that determines the model's answer."""
+    h = hashlib.sha256()
+    for part in (model, repr(float(temperature)), prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")  # separator, so ("ab", "c") and ("a", "bc") differ
+    return h.hexdigest()
+
+
+# 2. Cache class #################################
+
+
+class LLMCache:
+    """
+    LRU (max_entries, in memory) in front of an optional SQLite table.
+    get() returns (text, tier) with tier "memory" or "sqlite", or (None, None).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path or None
+        self._memory = OrderedDict()  # key -> (text, stored_at)
+        # Concurrent misses for one key share a single LLM call ("coalesced"):
+        # key -> [lock, requests holding or waiting for it], dropped by the last one
+        self._key_locks = {}
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "sqlite_hits": 0, "misses": 0, "coalesced": 0, "stores": 0}
+
+    ## 2.1 SQLite tier (runs in a worker thread) ###############################
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _db_get(self, key: str):
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT response, stored_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def _db_put(self, key: str, text: str, stored_at: float) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, stored_at) VALUES (?, ?, ?)",
+                (key, text, stored_at),
+            )
+            # Expired rows are removed on write, so the file does not grow forever
+            db.execute("DELETE FROM llm_cache WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            db.commit()
+
+    ## 2.2 Public API ###############################
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl_seconds
+
+    def _remember(self, key: str, text: str, stored_at: float) -> None:
+        self._memory[key] = (text, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str):
+        entry = self._memory.get(key)
+        if entry is not None:
+            if self._is_fresh(entry[1]):
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry[0], "memory"
+            del self._memory[key]
+
+        if self.sqlite_path:
+            row = await anyio.to_thread.run_sync(self._db_get, key)
+            if row is not None and self._is_fresh(row[1]):
+                self._remember(key, row[0], row[1])
+                self._counters["sqlite_hits"] += 1
+                return row[0], "sqlite"
+
+        self._counters["misses"] += 1
+        return None, None
+
+    async def put(self, key: str, text: str) -> None:
+        stored_at = time.time()
+        self._remember(key, text, stored_at)
+        self._counters["stores"] += 1
+        if self.sqlite_path:
+            await anyio.to_thread.run_sync(self._db_put, key, text, stored_at)
+
+    async def get_or_call(self, key: str, call):
+        """
+        Return (text, status) where status is "hit" or "miss".
+        On a miss, awaits call() and stores its result. Errors are not cached.
+        """
+        text, _ = await self.get(key)
+        if text is not None:
+            return text, "hit"
+
+        slot = self._key_locks.setdefault(key, [asyncio.Lock(), 0])
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                # A concurrent request for the same prompt may have filled it meanwhile
+                entry = self._memory.get(key)
+                if entry is not None and self._is_fresh(entry[1]):
+                    self._counters["coalesced"] += 1
+                    return entry[0], "hit"
+                text = await call()
+                await self.put(key, text)
+                return text, "miss"
+        finally:
+            # Not lock.locked(): a woken waiter may not have taken the lock yet,
+            # and a new request must still queue behind it on the same lock
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._key_locks[key]
+
+    def clear(self) -> int:
+        """Drop every cached answer (both tiers). Returns how many were in memory."""
+        n = len(self._memory)
+        self._memory.clear()
+        if self.sqlite_path:
+            with self._db_lock:
+                self._connect().execute("DELETE FROM llm_cache")
+                self._db.commit()
+        return n
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "sqlite_path": self.sqlite_path,
+            **self._counters,
+        }
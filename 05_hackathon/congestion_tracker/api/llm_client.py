@@ -0,0 +1,227 @@
+# llm_client.py
+# City Congestion Tracker – shared HTTP client for outbound LLM calls
+# Pairs with fastapi_app.py
+#
+# A new httpx.AsyncClient per AI summary pays a DNS lookup, TCP connect and
+# TLS handshake to the LLM host every time. This module keeps one client for
+# the whole app (opened and closed in the FastAPI lifespan hook) so calls reuse
+# warm HTTP/2 / keep-alive connections. Transient failures (connection errors,
+# timeouts, 429 and 5xx) are retried with jittered exponential backoff, and
+# every outbound call is timed for /llm-stats and /metrics. llm_stream() does
+# the same for streamed completions and also times the first byte.
+#
+# Students learn how to:
+# - Share one async HTTP client across requests
+# - Retry flaky upstream calls without synchronised retry storms
+# - Measure the latency of calls to an external API
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+
+from db import _env_float, _env_int
+from metrics import LLM_DURATION, LLM_FIRST_BYTE, record_stage
+
+
+## 0.2 Settings ###############################
+
+# Status codes worth retrying: rate limited or a temporary upstream failure
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# 1. Outbound latency #################################
+
+
+class OutboundStats:
+    """Counters and recent latencies (seconds) for outbound LLM calls."""
+
+    def __init__(self, window: int = 500):
+        self._latencies = deque(maxlen=window)
+        self._first_byte = deque(maxlen=window)
+        self._counters = {"requests": 0, "attempts": 0, "retries": 0, "errors": 0}
+        self._total_seconds = 0.0
+
+    def record(self, seconds: float, attempts: int, ok: bool, first_byte: float = None, mode: str = "complete") -> None:
+        # Also to the /metrics histograms and the current request's Server-Timing
+        LLM_DURATION.observe(seconds, mode, "ok" if ok else "error")
+        record_stage("llm", seconds)
+        self._latencies.append(seconds)
+        if first_byte is not None:
+            self._first_byte.append(first_byte)
+            LLM_FIRST_BYTE.observe(first_byte)
+        self._total_seconds += seconds
+        self._counters["requests"] += 1
+        self._counters["attempts"] += attempts
+        self._counters["retries"] += attempts - 1
+        if not ok:
+            self._counters["errors"] += 1
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._latencies)
+        first_byte = sorted(self._first_byte)
+
+        def pct(q, values=recent):
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1) if values else None
+
+        n = self._counters["requests"]
+        return {
+            **self._counters,
+            "avg_ms": round(self._total_seconds / n * 1000, 1) if n else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(recent[-1] * 1000, 1) if recent else None,
+            "stream_first_byte_p50_ms": pct(0.50, first_byte),
+            "stream_first_byte_p95_ms": pct(0.95, first_byte),
+            "window": len(recent),
+        }
+
+
+# 2. Shared client #################################
+
+_client = None
+_settings = {}
+stats = OutboundStats()
+
+
+def open_llm_client() -> None:
+    """
+    Create the shared client. Called once on app startup.
+    Settings: LLM_TIMEOUT read/write seconds (default 30), LLM_CONNECT_TIMEOUT
+    (default 5), LLM_MAX_CONNECTIONS (default 10), LLM_MAX_KEEPALIVE (default 5),
+    LLM_KEEPALIVE_EXPIRY seconds (default 60), LLM_HTTP2 (default 1),
+    LLM_MAX_RETRIES (default 2), LLM_RETRY_BACKOFF base seconds (default 0.5).
+    """
+    global _client
+    if _client is not None:
+        return
+    _settings.update(
+        max_retries=max(0, _env_int("LLM_MAX_RETRIES", 2)),
+        backoff=max(0.0, _env_float("LLM_RETRY_BACKOFF", 0.5)),
+    )
+    timeout = httpx.Timeout(
+        _env_float("LLM_TIMEOUT", 30.0),
+        connect=_env_float("LLM_CONNECT_TIMEOUT", 5.0),
+    )
+    limits = httpx.Limits(
+        max_connections=_env_int("LLM_MAX_CONNECTIONS", 10),
+        max_keepalive_connections=_env_int("LLM_MAX_KEEPALIVE", 5),
+        keepalive_expiry=_env_float("LLM_KEEPALIVE_EXPIRY", 60.0),
+    )
+    _settings["http2"] = _env_int("LLM_HTTP2", 1) == 1
+    try:
+        _client = httpx.AsyncClient(timeout=timeout, limits=limits, http2=_settings["http2"])
+    except ImportError:
+        # HTTP/2 needs the h2 package (pip install "httpx[http2]")
+        print("Warning: h2 is not installed; LLM client falls back to HTTP/1.1 keep-alive.")
+        _settings["http2"] = False
+        _client = httpx.AsyncClient(timeout=timeout, limits=limits)
+
+
+async def close_llm_client() -> None:
+    """Close the shared client and its connections. Called once on app shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    """Return the shared client, opening it on first use if startup did not."""
+    if _client is None:
+        open_llm_client()
+    return _client
+
+
+# 3. POST with retries (whole response or streamed lines) #################################
+
+
+def _backoff_delay(attempt: int, resp=None) -> float:
+    """Full jitter: a random wait up to backoff * 2^attempt, or the server's Retry-After."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+    return random.uniform(0, _settings["backoff"] * (2**attempt))
+
+
+async def llm_post(url: str, **kwargs) -> httpx.Response:
+    """
+    POST to the LLM host through the shared client, retrying transient failures
+    up to LLM_MAX_RETRIES times. Returns the final response (raise_for_status
+    already applied) or raises the last httpx error.
+    """
+    client = get_llm_client()
+    max_retries = _settings["max_retries"]
+    start = time.perf_counter()
+    attempt = 0
+    ok = False
+    try:
+        while True:
+            resp = None
+            try:
+                resp = await client.post(url, **kwargs)
+                if resp.status_code not in RETRY_STATUS or attempt >= max_retries:
+                    resp.raise_for_status()
+                    ok = True
+                    return resp
+            except httpx.TransportError:  # includes connect/read timeouts
+                if attempt >= max_retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(_backoff_delay(attempt - 1, resp))
+    finally:
+        stats.record(time.perf_counter() - start, attempt + 1, ok)
+
+
+async def llm_stream(url: str, **kwargs):
+    """
+    POST to the LLM host and yield the response body line by line as it arrives
+    (for streamed completions). Failures before the first line are retried like
+    llm_post(); once lines have been yielded the stream cannot be replayed, so a
+    later failure is raised to the caller.
+    """
+    client = get_llm_client()
+    max_retries = _settings["max_retries"]
+    start = time.perf_counter()
+    first_byte = None
+    attempt = 0
+    ok = False
+    try:
+        while True:
+            resp = None
+            try:
+                async with client.stream("POST", url, **kwargs) as resp:
+                    if resp.status_code not in RETRY_STATUS or attempt >= max_retries:
+                        resp.raise_for_status()
+                        async for line in resp.aiter_lines():
+                            if first_byte is None:
+                                first_byte = time.perf_counter() - start
+                            yield line
+                        ok = True
+                        return
+            except httpx.TransportError:
+                if first_byte is not None or attempt >= max_retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(_backoff_delay(attempt - 1, resp))
+    finally:
+        stats.record(time.perf_counter() - start, attempt + 1, ok, first_byte, mode="stream")
+
+
+def llm_stats() -> dict:
+    """Outbound call counters and latency percentiles, plus the client settings."""
+    return {
+        "open": _client is not None,
+        **_settings,
+        **stats.snapshot(),
+    }
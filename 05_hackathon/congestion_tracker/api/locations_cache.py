@@ -0,0 +1,84 @@
+# locations_cache.py
+# City Congestion Tracker – in-process cache of the locations table
+# Pairs with fastapi_app.py and db.py
+#
+# The locations table (7 rows) almost never changes, but /locations used to
+# query it on every request. This module keeps one shared copy in memory,
+# reloads it after a TTL, and lets the data loader force a reload (through
+# POST /cache/locations/invalidate) after it rewrites the table. /summary and
+# /ai-summary join locations in SQL instead (queries.summary_query).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import time
+
+from db import fetch_all
+
+
+# 1. Cache class #################################
+
+
+class LocationsCache:
+    """
+    Versioned TTL cache of `SELECT location_id, name, zone FROM locations`.
+    `version` goes up on every reload or invalidation, so callers can tell
+    whether the copy they hold is still current.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._rows = None
+        self._loaded_at = 0.0
+        # Only one request reloads at a time; the rest wait and reuse its result
+        self._lock = asyncio.Lock()
+        self._counters = {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0}
+
+    def _is_fresh(self) -> bool:
+        return self._rows is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def _load(self) -> list:
+        version = self.version
+        rows = await fetch_all("SELECT location_id, name, zone FROM locations ORDER BY location_id")
+        rows = [dict(row) for row in rows]
+        self._counters["loads"] += 1
+        # An invalidation while the query ran may mean these rows predate the
+        # loader's rewrite: answer this request with them, but do not keep them
+        if self.version == version:
+            self._rows = rows
+            self._loaded_at = time.monotonic()
+            self.version += 1
+        return rows
+
+    async def rows(self) -> list:
+        """All locations, ordered by location_id."""
+        if self._is_fresh():
+            self._counters["hits"] += 1
+            return self._rows
+        self._counters["misses"] += 1
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self._is_fresh():
+                return self._rows
+            return await self._load()
+
+    def invalidate(self) -> int:
+        """Drop the cached copy so the next request reloads it. Returns the new version."""
+        self._rows = None
+        self.version += 1
+        self._counters["invalidations"] += 1
+        return self.version
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._loaded_at if self._rows is not None else None
+        return {
+            "version": self.version,
+            "ttl_seconds": self.ttl_seconds,
+            "cached_rows": len(self._rows) if self._rows is not None else 0,
+            "age_seconds": round(age, 1) if age is not None else None,
+            **self._counters,
+        }
+
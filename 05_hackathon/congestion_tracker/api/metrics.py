@@ -0,0 +1,309 @@
+# metrics.py
+# City Congestion Tracker – in-process Prometheus metrics and Server-Timing
+# Pairs with fastapi_app.py, db.py and llm_client.py
+#
+# /pool-stats, /llm-stats and /cache-stats answer "how much", but not "where
+# did this /ai-summary's 3 seconds go". This module keeps Prometheus-style
+# counters, gauges and histograms in memory (no collector or extra package
+# needed) and renders them as text for GET /metrics. MetricsMiddleware times
+# every request per route, and db.py / llm_client.py report their stages
+# (pool checkout, query, fetch, LLM call) both to the histograms and to the
+# current request, which lists them in its Server-Timing response header.
+#
+# Students learn how to:
+# - Expose counters, gauges and histograms in the Prometheus text format
+# - Attribute latency to stages of a request with a context variable
+# - Read per-request timings in the browser's network panel (Server-Timing)
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds in seconds
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# API_SERVER_TIMING=0 leaves the Server-Timing header off (the /metrics histograms are kept)
+SERVER_TIMING = os.getenv("API_SERVER_TIMING", "1") != "0"
+
+
+# 1. Metric types #################################
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """One metric family: a value per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = HTTP_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, seconds: float, *labels) -> None:
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # per-bucket counts (not cumulative), sum, count
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += seconds
+            state[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = self._header()
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + str(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+def sample_family(name: str, kind: str, help_text: str, samples: list) -> list:
+    """
+    Lines for a family whose values are read at scrape time (pool size, cache
+    counters, ...). samples: [(labels dict, value), ...]
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        names, values = tuple(labels), tuple(labels.values())
+        lines.append(f"{name}{_labels(names, values)} {_number(value)}")
+    return lines
+
+
+# 2. App metrics #################################
+
+HTTP_REQUESTS = Counter(
+    "congestion_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_DURATION = Histogram(
+    "congestion_http_request_duration_seconds",
+    "Time from request start to the last body byte, by route.",
+    ("method", "route"),
+    HTTP_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("congestion_http_requests_in_flight", "Requests currently being served, by route.", ("route",))
+DB_DURATION = Histogram(
+    "congestion_db_duration_seconds",
+    "Database time by stage: connect (pool checkout, including waits and pings), query (execute) and fetch.",
+    ("route", "stage"),
+    DB_BUCKETS,
+)
+DB_IN_FLIGHT = Gauge("congestion_db_operations_in_flight", "Pooled connections currently borrowed by a request.")
+LLM_DURATION = Histogram(
+    "congestion_llm_request_duration_seconds",
+    "Outbound LLM calls, including retries, by mode (complete or stream) and outcome.",
+    ("mode", "outcome"),
+    LLM_BUCKETS,
+)
+LLM_FIRST_BYTE = Histogram(
+    "congestion_llm_first_byte_seconds", "Time to the first streamed line of an LLM response.", (), LLM_BUCKETS
+)
+LLM_TOKENS = Counter("congestion_llm_tokens_total", "LLM tokens reported by the API's usage field.", ("kind",))
+
+_registry = [HTTP_REQUESTS, HTTP_DURATION, HTTP_IN_FLIGHT, DB_DURATION, DB_IN_FLIGHT, LLM_DURATION, LLM_FIRST_BYTE, LLM_TOKENS]
+
+
+def record_llm_usage(usage: Optional[dict]) -> None:
+    """Count prompt/completion tokens from an OpenAI-style `usage` object (if the API sent one)."""
+    if not usage:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if isinstance(tokens, int):
+            LLM_TOKENS.inc(kind, amount=tokens)
+
+
+def render(*extra_families: list) -> str:
+    """The whole registry (plus scrape-time families) in Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for family in extra_families:
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
+
+
+# 3. Per-request stages (Server-Timing) #################################
+
+
+class RequestTimings:
+    """Stage durations of one request. Worker threads append to it; list.append is atomic."""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.stages = []  # (stage, seconds)
+
+    def server_timing(self, total: float) -> str:
+        totals = {}
+        for stage, seconds in list(self.stages):
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items()]
+        parts.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# anyio worker threads and Starlette's threadpool run with a copy of the
+# request's context, so they see (and add to) the same RequestTimings object
+_current = ContextVar("congestion_request_timings", default=None)
+
+
+def current_route() -> str:
+    timings = _current.get()
+    return timings.route if timings is not None else "none"
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add one stage duration to the current request (if any)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.stages.append((stage, seconds))
+
+
+def record_db(stage: str, seconds: float) -> None:
+    """One database stage ("connect", "query" or "fetch"): histogram + Server-Timing."""
+    DB_DURATION.observe(seconds, current_route(), stage)
+    record_stage(f"db-{stage}", seconds)
+
+
+@contextmanager
+def timed_db(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_db(stage, time.perf_counter() - start)
+
+
+# 4. Middleware #################################
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: per-route request counts, latency and in-flight gauges,
+    plus a Server-Timing header listing the stages recorded before the
+    response headers went out (for streamed responses, later stages only
+    reach the histograms).
+    """
+
+    def __init__(self, app, routes=None):
+        self.app = app
+        self.routes = routes
+
+    def _route(self, scope) -> str:
+        # The route template, not the raw path, so unknown URLs cannot explode the label set
+        for route in self.routes or ():
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self._route(scope)
+        method = scope["method"]
+        timings = RequestTimings(route)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(route)
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            HTTP_IN_FLIGHT.dec(route)
+            HTTP_DURATION.observe(time.perf_counter() - start, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            _current.reset(token)
@@ -0,0 +1,419 @@
+# queries.py
+# City Congestion Tracker – SQL helpers shared by the API endpoints
+# Pairs with fastapi_app.py
+#
+# /readings and its streaming/export variants accept the same filters, so the
+# WHERE clause is built in one place. This module also builds one /readings
+# page, encodes the opaque keyset cursor used to page through it, and builds
+# the /summary aggregate query on top of the hourly/daily rollup tables
+# (supabase/rollups.sql), and the bucketed /timeseries query that reuses the
+# same rollup plan.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+
+# 1. Readings query #################################
+
+# ts and delay_minutes are formatted by Postgres, so rows can go straight to a
+# JSON encoder. ts matches Python's datetime.isoformat() in UTC: microseconds
+# only when non-zero, then +00:00 (e.g. 2026-03-01T08:15:00+00:00).
+READINGS_TS_SQL = (
+    "to_char(r.ts AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS') "
+    "|| CASE WHEN mod(date_part('microseconds', r.ts)::bigint, 1000000) <> 0 "
+    "THEN to_char(r.ts AT TIME ZONE 'UTC', '.US') ELSE '' END "
+    "|| '+00:00'"
+)
+
+READINGS_SELECT = (
+    "SELECT r.id, r.location_id, l.name AS location_name, "
+    f"{READINGS_TS_SQL} AS ts, r.congestion_level, r.delay_minutes::float8 AS delay_minutes "
+    "FROM congestion_readings r "
+    "JOIN locations l ON l.location_id = r.location_id "
+)
+
+# Same rows for the Arrow/Parquet export, typed for columnar encoding (NUMERIC -> float8)
+READINGS_EXPORT_SELECT = (
+    "SELECT r.id, r.location_id, l.name AS location_name, "
+    "r.ts, r.congestion_level, r.delay_minutes::float8 AS delay_minutes "
+    "FROM congestion_readings r "
+    "JOIN locations l ON l.location_id = r.location_id "
+)
+
+
+def readings_where(
+    location_id: Optional[List[str]] = None,
+    from_ts: Optional[str] = None,
+    to_ts: Optional[str] = None,
+    min_level: Optional[str] = None,
+    level: Optional[List[int]] = None,
+    dataset: Optional[str] = None,
+    after_id: Optional[int] = None,
+    after_ts: Optional[str] = None,
+) -> Tuple[str, list]:
+    """
+    Build the WHERE clause (without the keyword) and its params for a readings query.
+    after_id / after_ts keep only rows added since a client's last load: ids
+    above after_id, and (to let Postgres prune partitions and range-scan the
+    ts indexes) timestamps after after_ts.
+    """
+    clauses = ["1=1"]
+    params = []
+
+    if location_id:
+        clauses.append("r.location_id = ANY(%s)")
+        params.append(location_id)
+    if from_ts:
+        clauses.append("r.ts >= %s")
+        params.append(from_ts)
+    if to_ts:
+        clauses.append("r.ts <= %s")
+        params.append(to_ts)
+    if min_level is not None:
+        try:
+            min_int = int(min_level)
+        except (TypeError, ValueError):
+            min_int = None
+        if min_int is not None:
+            clauses.append("r.congestion_level >= %s")
+            params.append(min_int)
+    if level:
+        clauses.append("r.congestion_level = ANY(%s)")
+        params.append(level)
+    if dataset:
+        clauses.append("r.dataset_label = %s")
+        params.append(dataset)
+    if after_id is not None:
+        clauses.append("r.id > %s")
+        params.append(after_id)
+    if after_ts:
+        clauses.append("r.ts > %s")
+        params.append(after_ts)
+
+    return " AND ".join(clauses), params
+
+
+def readings_page_query(where_sql: str, params: list, limit: int, after: Optional[Tuple[str, int]] = None) -> Tuple[str, list]:
+    """
+    SQL + params for one /readings page: newest first, at most `limit` rows,
+    continuing strictly after the decoded cursor `after` = (ts, id) if given.
+    """
+    if after is not None:
+        where_sql += " AND (r.ts, r.id) < (%s, %s)"
+        params = params + list(after)
+    sql = READINGS_SELECT + f"WHERE {where_sql} ORDER BY r.ts DESC, r.id DESC LIMIT %s"
+    return sql, params + [limit]
+
+
+# 2. Keyset cursor #################################
+
+# Readings are ordered newest first by (ts, id). A cursor remembers the last
+# row of a page; the next page is every row that sorts strictly after it:
+#   WHERE (r.ts, r.id) < (cursor_ts, cursor_id)
+# Unlike OFFSET, this stays fast on deep pages and never skips or repeats rows
+# when new readings arrive between requests.
+
+
+def encode_cursor(ts, row_id: int) -> str:
+    """Pack the last row's (ts as datetime or ISO string, id) into an opaque, URL-safe token."""
+    ts_text = ts.isoformat() if isinstance(ts, datetime) else str(ts)
+    raw = json.dumps({"ts": ts_text, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Unpack a cursor into (ts ISO string, id). Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ts = datetime.fromisoformat(data["ts"])
+        return ts.isoformat(), int(data["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor.") from exc
+
+
+# 3. Summary query (rollups + raw edges) #################################
+
+# Coarsest first. Each rollup row holds n, level_sum, max_level and a
+# histogram n_level_1..4 for one location, dataset and UTC hour/day.
+ROLLUP_TABLES = [
+    ("congestion_rollup_daily", timedelta(days=1)),
+    ("congestion_rollup_hourly", timedelta(hours=1)),
+]
+LEVELS = [1, 2, 3, 4]
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_ts(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO8601 query parameter into an aware UTC datetime (naive = UTC)."""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _floor(dt: datetime, step: timedelta) -> datetime:
+    return _EPOCH + ((dt - _EPOCH) // step) * step
+
+
+def _ceil(dt: datetime, step: timedelta) -> datetime:
+    floored = _floor(dt, step)
+    return floored if floored == dt else floored + step
+
+
+def plan_summary_segments(start: Optional[datetime], end: Optional[datetime], tables: list = ROLLUP_TABLES) -> list:
+    """
+    Split the window [start, end] into pieces answered by different sources.
+    Whole days come from the daily rollup, whole hours at the edges from the
+    hourly rollup, and the leftover minutes at each end from raw readings.
+    Returns (source, lo, hi, hi_inclusive) tuples; None means unbounded.
+    tables (coarsest first, default ROLLUP_TABLES) limits the rollups used.
+
+    Example for 2026-03-01T10:20 .. 2026-03-04T08:00:
+      raw     10:20 .. 11:00 on Mar 1
+      hourly  11:00 .. Mar 2 00:00
+      daily   Mar 2 .. Mar 4
+      hourly  Mar 4 00:00 .. 08:00
+      raw     08:00 .. 08:00 inclusive (readings exactly at to_ts)
+    """
+    segments = []
+    covered = None  # (lo, hi) already answered by a coarser rollup
+    for table, step in tables:
+        lo = _ceil(start, step) if start is not None else None
+        hi = _floor(end, step) if end is not None else None
+        if lo is not None and hi is not None and lo >= hi:
+            continue
+        if covered is None:
+            segments.append((table, lo, hi, False))
+        else:
+            # Finer buckets fill the gaps on either side of the coarser span
+            if lo != covered[0]:
+                segments.append((table, lo, covered[0], False))
+            if hi != covered[1]:
+                segments.append((table, covered[1], hi, False))
+        covered = (lo, hi)
+
+    if covered is None:
+        return [("raw", start, end, True)]
+    if start is not None and start != covered[0]:
+        segments.append(("raw", start, covered[0], False))
+    if end is not None:
+        # The window is inclusive of to_ts, which a half-open bucket never covers
+        segments.append(("raw", covered[1], end, True))
+    return segments
+
+
+def _group_keys(col: str, step: Optional[timedelta]) -> Tuple[str, str]:
+    """(SELECT keys, GROUP BY keys): per location, or per location and time bucket of `step`."""
+    if step is None:
+        return "location_id", "location_id"
+    return f"location_id, {_bucket_sql(col, step)} AS bucket", "location_id, bucket"
+
+
+def _raw_summary_select(where_sql: str, step: Optional[timedelta] = None) -> str:
+    keys, group_by = _group_keys("ts", step)
+    return (
+        f"SELECT {keys}, COUNT(*) AS n, SUM(congestion_level) AS level_sum, "
+        "MAX(congestion_level) AS max_level "
+        "FROM congestion_readings "
+        f"WHERE {where_sql} "
+        f"GROUP BY {group_by}"
+    )
+
+
+def _rollup_summary_select(
+    table: str, where_sql: str, levels: Optional[List[int]], step: Optional[timedelta] = None
+) -> str:
+    # Without a level filter the stored totals answer directly. With one, the
+    # histogram gives the count, sum and max of just the requested levels.
+    if not levels:
+        n_expr, sum_expr, max_expr = "n", "level_sum", "max_level"
+    else:
+        wanted = sorted({lvl for lvl in levels if lvl in LEVELS})
+        n_expr = " + ".join(f"n_level_{lvl}" for lvl in wanted) or "0"
+        sum_expr = " + ".join(f"{lvl} * n_level_{lvl}" for lvl in wanted) or "0"
+        max_expr = (
+            "GREATEST(" + ", ".join(f"CASE WHEN n_level_{lvl} > 0 THEN {lvl} END" for lvl in wanted) + ")"
+            if wanted
+            else "NULL::integer"
+        )
+    keys, group_by = _group_keys("bucket_start", step)
+    return (
+        f"SELECT {keys}, SUM({n_expr}) AS n, SUM({sum_expr}) AS level_sum, "
+        f"MAX({max_expr}) AS max_level "
+        f"FROM {table} "
+        f"WHERE {where_sql} "
+        f"GROUP BY {group_by}"
+    )
+
+
+def _dataset_clause(dataset: str) -> Tuple[str, list]:
+    """
+    dataset_label filter that matches the rollups, which group readings by
+    COALESCE(dataset_label, 'default'): "default" also takes unlabelled
+    readings. Written without COALESCE so the raw edges keep their index.
+    """
+    if dataset == "default":
+        return "(dataset_label = %s OR dataset_label IS NULL)", [dataset]
+    return "dataset_label = %s", [dataset]
+
+
+def _segments_union(
+    segments: list,
+    location_id: Optional[List[str]],
+    level: Optional[List[int]],
+    dataset: Optional[str],
+    step: Optional[timedelta] = None,
+) -> Tuple[str, list]:
+    """
+    One aggregate SELECT per segment (raw readings or a rollup table) joined
+    with UNION ALL. Rows are (location_id, [bucket,] n, level_sum, max_level).
+    """
+    parts = []
+    params = []
+    for source, lo, hi, hi_inclusive in segments:
+        col = "ts" if source == "raw" else "bucket_start"
+        clauses = ["1=1"]
+        if lo is not None:
+            clauses.append(f"{col} >= %s")
+            params.append(lo)
+        if hi is not None:
+            clauses.append(f"{col} <= %s" if hi_inclusive else f"{col} < %s")
+            params.append(hi)
+        if location_id:
+            clauses.append("location_id = ANY(%s)")
+            params.append(location_id)
+        if dataset:
+            clause, clause_params = _dataset_clause(dataset)
+            clauses.append(clause)
+            params.extend(clause_params)
+        if source == "raw":
+            if level:
+                clauses.append("congestion_level = ANY(%s)")
+                params.append(level)
+            parts.append(_raw_summary_select(" AND ".join(clauses), step))
+        else:
+            parts.append(_rollup_summary_select(source, " AND ".join(clauses), level, step))
+    return " UNION ALL ".join(f"({part})" for part in parts), params
+
+
+def summary_query(
+    from_ts: Optional[str] = None,
+    to_ts: Optional[str] = None,
+    location_id: Optional[List[str]] = None,
+    level: Optional[List[int]] = None,
+    dataset: Optional[str] = None,
+    use_rollups: bool = True,
+) -> Tuple[str, list]:
+    """
+    Build the per-location summary query, joined to locations server-side:
+    rows of (location_id, name, zone, n, avg_level, max_level), already typed
+    (bigint, float8, integer) and ordered by avg_level, highest first.
+    With use_rollups, each piece of the window from plan_summary_segments() is
+    aggregated from its source and the pieces are merged in one UNION ALL query.
+    Empty from_ts / to_ts mean unbounded. Raises ValueError for unparseable timestamps.
+    """
+    start, end = parse_ts(from_ts), parse_ts(to_ts)
+    segments = plan_summary_segments(start, end) if use_rollups else [("raw", start, end, True)]
+
+    union_sql, params = _segments_union(segments, location_id, level, dataset)
+    sql = (
+        "SELECT s.location_id, l.name, l.zone, s.n, s.avg_level, s.max_level "
+        "FROM ("
+        "SELECT location_id, "
+        "SUM(n)::bigint AS n, "
+        "SUM(level_sum)::float8 / SUM(n) AS avg_level, "
+        "MAX(max_level)::integer AS max_level "
+        f"FROM ({union_sql}) AS pieces "
+        "GROUP BY location_id "
+        "HAVING SUM(n) > 0"
+        ") AS s "
+        "LEFT JOIN locations l ON l.location_id = s.location_id "
+        "ORDER BY s.avg_level DESC"
+    )
+    return sql, params
+
+
+# 4. Time-series query (buckets sized to the plot) #################################
+
+# Bucket widths, finest first. 15 minutes is the readings' own cadence; every
+# step of an hour or more is a whole number of hourly (or daily) rollup buckets.
+TIMESERIES_STEPS = (
+    [timedelta(minutes=m) for m in (15, 30)]
+    + [timedelta(hours=h) for h in (1, 2, 3, 6, 12)]
+    + [timedelta(days=d) for d in (1, 2, 7, 14, 28)]
+)
+# Buckets are aligned to a Monday midnight (UTC), so weekly buckets start on Mondays
+_BUCKET_ORIGIN = "2000-01-03 00:00:00+00"
+
+
+def _bucket_sql(col: str, step: timedelta) -> str:
+    # step is always one of TIMESERIES_STEPS (whole seconds), so it is safe to inline
+    return f"date_bin(interval '{int(step.total_seconds())} seconds', {col}, timestamptz '{_BUCKET_ORIGIN}')"
+
+
+def timeseries_step(start: datetime, end: datetime, max_buckets: int) -> timedelta:
+    """Finest step in TIMESERIES_STEPS giving at most max_buckets buckets over [start, end]."""
+    for step in TIMESERIES_STEPS:
+        if (end - start) / step <= max_buckets:
+            return step
+    return TIMESERIES_STEPS[-1]
+
+
+def timeseries_query(
+    from_ts: str,
+    to_ts: str,
+    max_buckets: int,
+    location_id: Optional[List[str]] = None,
+    level: Optional[List[int]] = None,
+    dataset: Optional[str] = None,
+    oversample: int = 1,
+    use_rollups: bool = True,
+) -> Tuple[str, list, timedelta]:
+    """
+    Build the per-location time-series query: rows of (location_id, name,
+    bucket_epoch, n, avg_level, max_level) ordered by location and bucket
+    (bucket start as Unix seconds, cheaper to fetch than timestamptz), with the
+    step chosen so the window has at most max_buckets buckets. oversample > 1
+    asks for up to that many times more buckets (input for LTTB), but never
+    finer than the hourly rollup when max_buckets alone needs an hour or more:
+    scanning raw readings over a long window costs more than the plot gains.
+    With use_rollups, the window is split like summary_query() but only into
+    rollups whose buckets fit whole inside one step; raw readings fill the rest.
+    Returns (sql, params, step). Raises ValueError for unparseable timestamps.
+    """
+    start, end = parse_ts(from_ts), parse_ts(to_ts)
+    if start is None or end is None or end < start:
+        raise ValueError("from_ts and to_ts are required, with from_ts <= to_ts")
+    step = timeseries_step(start, end, max_buckets)
+    if oversample > 1:
+        finest_rollup = ROLLUP_TABLES[-1][1]
+        step = max(min(step, finest_rollup), timeseries_step(start, end, max_buckets * oversample))
+    tables = [(table, size) for table, size in ROLLUP_TABLES if step % size == timedelta(0)]
+    segments = plan_summary_segments(start, end, tables) if use_rollups else [("raw", start, end, True)]
+
+    union_sql, params = _segments_union(segments, location_id, level, dataset, step)
+    sql = (
+        "SELECT s.location_id, l.name, extract(epoch FROM s.bucket)::float8 AS bucket_epoch, "
+        "s.n, s.avg_level, s.max_level "
+        "FROM ("
+        "SELECT location_id, bucket, "
+        "SUM(n)::bigint AS n, "
+        "SUM(level_sum)::float8 / SUM(n) AS avg_level, "
+        "MAX(max_level)::integer AS max_level "
+        f"FROM ({union_sql}) AS pieces "
+        "GROUP BY location_id, bucket "
+        "HAVING SUM(n) > 0"
+        ") AS s "
+        "LEFT JOIN locations l ON l.location_id = s.location_id "
+        "ORDER BY s.location_id, s.bucket"
+    )
+    return sql, params, step
@@ -0,0 +1,97 @@
+# bench_ai_stream.py
+# Time to first byte / first text for /ai-summary vs. /ai-summary/stream
+# Pairs with api/fastapi_app.py, benchmarks/fake_llm.py and benchmarks/README.md
+#
+# The blocking endpoint returns nothing until the model has finished; the
+# streaming endpoint sends the summary table at once and text as it arrives.
+# For each endpoint this script reports:
+# - first byte: any response bytes (the SSE `data` event for the stream)
+# - first text: the first piece of summary text
+# - total:      the complete response
+# The LLM cache is cleared before every run so each one calls the model.
+#
+# Needs a running API (streaming does not show through an in-process client)
+# that points at the fake LLM server, e.g.:
+#   python fake_llm.py &
+#   cd ../api && OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:8099/v1 API_ADMIN_TOKEN=bench uvicorn fastapi_app:app --port 8001
+# and the same API_ADMIN_TOKEN in this script's environment (clearing the cache is an admin call).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import os
+import statistics
+import time
+
+import httpx
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TTFB and time to first text of the AI summary endpoints.")
+    parser.add_argument("--url", default="http://127.0.0.1:8001", help="Base URL of the running API")
+    parser.add_argument("--dataset", default="dataset_a", help="dataset query parameter (default: dataset_a)")
+    parser.add_argument("--days", type=int, default=30, help="Summarize the last N days (default: 30)")
+    parser.add_argument("--from-ts", default=None, help="Window start (ISO8601); use with --to-ts instead of --days")
+    parser.add_argument("--to-ts", default=None, help="Window end (ISO8601)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per endpoint; the median is reported")
+    return parser.parse_args()
+
+
+# 1. One run per endpoint #################################
+# Each function returns (first byte s, first text s, total s).
+
+
+def run_blocking(client, params):
+    start = time.perf_counter()
+    with client.stream("POST", "/ai-summary", params=params) as resp:
+        resp.raise_for_status()
+        first_byte = None
+        for _ in resp.iter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+    total = time.perf_counter() - start
+    # The summary text is inside the one JSON body, so it arrives with the first byte
+    return first_byte, first_byte, total
+
+
+def run_stream(client, params):
+    start = time.perf_counter()
+    first_byte = first_text = None
+    with client.stream("POST", "/ai-summary/stream", params=params) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            if first_text is None and line == "event: token":
+                first_text = time.perf_counter() - start
+    return first_byte, first_text, time.perf_counter() - start
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    params = {"dataset": args.dataset, "days": args.days}
+    if args.from_ts and args.to_ts:
+        params.update(from_ts=args.from_ts, to_ts=args.to_ts)
+    admin = {"Authorization": f"Bearer {os.getenv('API_ADMIN_TOKEN', '')}"}
+    with httpx.Client(base_url=args.url.rstrip("/"), timeout=120.0) as client:
+        print(f"params: {params}  runs per endpoint: {args.repeat}  (median seconds)")
+        print(f"{'endpoint':<20} {'first byte':>11} {'first text':>11} {'total':>8}")
+        for name, run in [("/ai-summary", run_blocking), ("/ai-summary/stream", run_stream)]:
+            results = []
+            for _ in range(args.repeat):
+                client.post("/cache/ai-summary/clear", headers=admin).raise_for_status()
+                results.append(run(client, params))
+            first_byte, first_text, total = (statistics.median(col) for col in zip(*results))
+            print(f"{name:<20} {first_byte:>11.3f} {first_text:>11.3f} {total:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
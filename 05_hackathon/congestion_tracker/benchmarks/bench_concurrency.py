@@ -0,0 +1,143 @@
+# bench_concurrency.py
+# Concurrency benchmark for the Congestion API
+# Pairs with api/db.py and benchmarks/README.md
+#
+# This script:
+# - Fires an endpoint (default /summary) from 1, 2, 4, ... concurrent clients
+# - Reports throughput (requests/sec) and p50/p95 latency at each level
+# - Probes /health in the background to show the event loop stays responsive
+#
+# Run it against a local Postgres stand-in (see README.md), not Supabase.
+# By default the app runs in-process; pass --url to hit a running uvicorn server.
+# A local Postgres answers in well under a millisecond of network time, so
+# --rtt-ms adds a simulated Supabase round trip to every query (in-process only).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+sys.path.insert(0, str(API_DIR))
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Throughput vs. concurrent clients for the Congestion API.")
+    parser.add_argument("--url", default=None, help="Base URL of a running API (default: run the app in-process)")
+    parser.add_argument("--endpoint", default="/summary", help="Endpoint to load (default: /summary)")
+    parser.add_argument("--dataset", default="dataset_a", help="dataset query parameter (default: dataset_a)")
+    parser.add_argument("--clients", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client at each level")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated DB network round trip per query")
+    return parser.parse_args()
+
+
+# 1. Load generator #################################
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+async def client_worker(client, endpoint, params, n_requests, latencies):
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        resp = await client.get(endpoint, params=params)
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def health_probe(client, stop, latencies):
+    # /health never touches the DB, so its latency only grows if the loop is blocked
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def run_level(client, endpoint, params, n_clients, n_requests):
+    latencies = []
+    health_latencies = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(health_probe(client, stop, health_latencies))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client_worker(client, endpoint, params, n_requests, latencies) for _ in range(n_clients))
+    )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {
+        "clients": n_clients,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "health_max_ms": max(health_latencies, default=0.0) * 1000,
+    }
+
+
+# 2. Main #################################
+
+
+async def main():
+    args = parse_args()
+    levels = [int(x) for x in args.clients.split(",") if x.strip()]
+    params = {"dataset": args.dataset}
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=60.0)
+    else:
+        # In-process: import the app and open its DB pool (ASGITransport skips lifespan hooks)
+        import db
+        import fastapi_app
+        from db import close_pool, open_pool
+
+        if args.rtt_ms > 0:
+            # Wrap the per-query helper so each query also waits one simulated round trip
+            real_fetch_all = db._fetch_all
+
+            def slow_fetch_all(conn, sql, params):
+                time.sleep(args.rtt_ms / 1000)
+                return real_fetch_all(conn, sql, params)
+
+            db._fetch_all = slow_fetch_all
+
+        open_pool()
+        transport = httpx.ASGITransport(app=fastapi_app.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0)
+
+    async with client:
+        # Warm up the pool and any caches before measuring
+        await client.get(args.endpoint, params=params)
+
+        print(f"Endpoint: {args.endpoint}  params: {params}  requests/client: {args.requests}  rtt: {args.rtt_ms} ms")
+        print(f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'/health max ms':>15}")
+        for n_clients in levels:
+            row = await run_level(client, args.endpoint, params, n_clients, args.requests)
+            print(
+                f"{row['clients']:>8} {row['requests']:>9} {row['rps']:>9.1f} "
+                f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['health_max_ms']:>15.1f}"
+            )
+
+    if not args.url:
+        close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
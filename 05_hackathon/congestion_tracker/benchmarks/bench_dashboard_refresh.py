@@ -0,0 +1,125 @@
+# bench_dashboard_refresh.py
+# Dashboard refresh latency: sequential per-call client vs. concurrent shared client
+# Pairs with dashboard/server.py, benchmarks/mock_api.py and benchmarks/README.md
+#
+# A dashboard refresh needs /readings.arrow and /summary for the same filters.
+# This script times one refresh (both downloaded and turned into DataFrames)
+# against the mock API, three ways:
+# - "sequential": a fresh httpx.Client per refresh, readings then summary
+#   (the dashboard before the shared client)
+# - "concurrent": dashboard/server.py's load_readings + load_summary run
+#   together on the process-wide keep-alive client
+# - "cached": the same, with the dashboard's result cache switched on (a TTL
+#   hit, or a 304 revalidation with --etag)
+# The first two run with the result cache off. It also reports how many TCP
+# connections each way opened. Use --connect-ms to charge a handshake per new
+# connection, as a hosted API over TLS would.
+# No database needed.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+DASHBOARD_DIR = Path(__file__).resolve().parents[1] / "dashboard"
+sys.path.insert(0, str(DASHBOARD_DIR))
+
+import server as dashboard  # noqa: E402
+from mock_api import start_mock_api  # noqa: E402
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh latency: sequential vs. concurrent vs. cached readings + summary.")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--rows", type=int, default=20_000, help="Readings per refresh")
+    parser.add_argument("--readings-ms", type=float, default=150.0, help="Mock /readings.arrow latency")
+    parser.add_argument("--summary-ms", type=float, default=100.0, help="Mock /summary latency")
+    parser.add_argument("--connect-ms", type=float, default=30.0, help="Mock cost of each new connection")
+    parser.add_argument("--repeat", type=int, default=10, help="Refreshes per mode")
+    parser.add_argument("--etag", action="store_true", help="Mock API sends ETags (cached mode revalidates)")
+    return parser.parse_args()
+
+
+PARAMS = {"from_ts": "2026-02-01T00:00:00Z", "to_ts": "2026-02-28T23:59:59Z", "dataset": "dataset_a"}
+
+
+# 1. One refresh per mode #################################
+
+
+def refresh_sequential(base: str):
+    with httpx.Client(timeout=20.0) as client:
+        readings, _ = dashboard.fetch_readings_frame(client, base, PARAMS)
+        summary, _ = dashboard.fetch_summary_frame(client, base, PARAMS)
+    return readings, summary
+
+
+async def refresh_concurrent(base: str):
+    (readings, _), (summary, _) = await asyncio.gather(
+        dashboard.load_readings(base, PARAMS), dashboard.load_summary(base, PARAMS)
+    )
+    return readings, summary
+
+
+def time_mode(fn, repeat: int, stats: dict):
+    connections_before = stats["connections"]
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        readings, summary = fn()
+        times.append((time.perf_counter() - start) * 1000)
+        assert len(readings) and len(summary)
+    return times, stats["connections"] - connections_before
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    server, stats = start_mock_api(args.port, args.rows, args.readings_ms, args.summary_ms, args.connect_ms, args.etag)
+    base = f"http://127.0.0.1:{args.port}"
+    print(
+        f"Mock API: {args.rows:,} rows, /readings.arrow {args.readings_ms:.0f} ms, /summary {args.summary_ms:.0f} ms, "
+        f"{args.connect_ms:.0f} ms per new connection; {args.repeat} refreshes per mode"
+    )
+    print(f"{'mode':<12} {'mean ms':>10} {'p50 ms':>10} {'max ms':>10} {'connections':>12}")
+    # One long-lived event loop, as in the Shiny process
+    loop = asyncio.new_event_loop()
+    modes = [
+        ("sequential", lambda: refresh_sequential(base), False),
+        ("concurrent", lambda: loop.run_until_complete(refresh_concurrent(base)), False),
+        ("cached", lambda: loop.run_until_complete(refresh_concurrent(base)), True),
+    ]
+    try:
+        for name, fn, use_cache in modes:
+            dashboard.frame_cache.clear()
+            if not use_cache:
+                # Drop every result right after it is stored, so each refresh downloads
+                dashboard.frame_cache.max_entries = 0
+            else:
+                dashboard.frame_cache.max_entries = 32
+                fn()  # first load fills the cache
+            times, connections = time_mode(fn, args.repeat, stats)
+            print(
+                f"{name:<12} {statistics.mean(times):>10.1f} {statistics.median(times):>10.1f} "
+                f"{max(times):>10.1f} {connections:>12}"
+            )
+    finally:
+        loop.close()
+        dashboard.close_api_client()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# bench_encoding.py
+# Bytes on the wire and encoding cost per endpoint
+# Pairs with api/encoding.py and benchmarks/README.md
+#
+# For each endpoint this script requests the same response three times, with
+# Accept-Encoding identity, gzip and br, and reports the raw bytes the server
+# sent and the in-process request time. It then times the two steps that make
+# those bytes on the same payload: JSON serialization (standard library json
+# vs. orjson) and compression (gzip vs. brotli at the API's levels).
+# Needs the local Postgres stand-in (see README.md).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+import brotli
+import orjson
+from fastapi.testclient import TestClient
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+sys.path.insert(0, str(API_DIR))
+
+import fastapi_app  # noqa: E402
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Wire bytes and serialization/compression time per endpoint.")
+    parser.add_argument("--dataset", default=None, help="dataset_label to filter on (default: all readings)")
+    parser.add_argument("--repeat", type=int, default=10, help="Iterations per measurement")
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=5)
+    return parser.parse_args()
+
+
+def endpoints(dataset):
+    base = {"dataset": dataset} if dataset else {}
+    return [
+        ("/readings (1k)", "/readings", {**base, "limit": 1000}),
+        ("/readings (10k)", "/readings", {**base, "limit": 10000}),
+        ("/readings.ndjson", "/readings.ndjson", base),
+        ("/summary", "/summary", base),
+        ("/locations", "/locations", {}),
+    ]
+
+
+# 1. Measurements #################################
+
+
+def wire_bytes(client, path, params, encoding, repeat):
+    """(bytes on the wire, ms per request) for one Accept-Encoding."""
+    headers = {"Accept-Encoding": encoding}
+    n_bytes = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        with client.stream("GET", path, params=params, headers=headers) as response:
+            response.raise_for_status()
+            n_bytes = sum(len(chunk) for chunk in response.iter_raw())
+    return n_bytes, (time.perf_counter() - start) / repeat * 1000
+
+
+def payload(client, path, params):
+    """Decoded response body as Python objects (ndjson becomes a list)."""
+    response = client.get(path, params=params, headers={"Accept-Encoding": "identity"})
+    response.raise_for_status()
+    if path.endswith(".ndjson"):
+        return [orjson.loads(line) for line in response.content.splitlines() if line]
+    return orjson.loads(response.content)
+
+
+def ms_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    with TestClient(fastapi_app.app) as client:
+        print("Part 1: bytes on the wire and in-process ms per request")
+        print(f"{'endpoint':<18} " + " ".join(f"{e + ' B':>12} {e + ' ms':>10}" for e in ENCODINGS))
+        for label, path, params in endpoints(args.dataset):
+            client.get(path, params=params)  # warm up (pool, prepared statements, caches)
+            cells = []
+            for encoding in ENCODINGS:
+                n_bytes, ms = wire_bytes(client, path, params, encoding, args.repeat)
+                cells.append(f"{n_bytes:>12,} {ms:>10.2f}")
+            print(f"{label:<18} " + " ".join(cells))
+
+        print()
+        print("Part 2: serialization and compression of the same payload (ms per call)")
+        print(f"{'endpoint':<18} {'json':>8} {'orjson':>8} {'gzip':>8} {'br':>8} {'raw B':>12} {'gzip B':>10} {'br B':>10}")
+        for label, path, params in endpoints(args.dataset):
+            data = payload(client, path, params)
+            body = orjson.dumps(data)
+            json_ms = ms_per_call(lambda: json.dumps(data).encode(), args.repeat)
+            orjson_ms = ms_per_call(lambda: orjson.dumps(data), args.repeat)
+            gzip_ms = ms_per_call(lambda: gzip.compress(body, args.gzip_level), args.repeat)
+            br_ms = ms_per_call(lambda: brotli.compress(body, quality=args.brotli_quality), args.repeat)
+            print(
+                f"{label:<18} {json_ms:>8.2f} {orjson_ms:>8.2f} {gzip_ms:>8.2f} {br_ms:>8.2f} "
+                f"{len(body):>12,} {len(gzip.compress(body, args.gzip_level)):>10,} "
+                f"{len(brotli.compress(body, quality=args.brotli_quality)):>10,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
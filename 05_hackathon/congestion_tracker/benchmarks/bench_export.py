@@ -0,0 +1,129 @@
+# bench_export.py
+# JSON vs. NDJSON vs. Arrow vs. Parquet readings export
+# Pairs with api/arrow_export.py and benchmarks/README.md
+#
+# This script downloads the same N readings (default 100k) through each export
+# path and builds a pandas DataFrame from it, the way the dashboard does.
+# It reports payload bytes and end-to-end time (request + decode) per format.
+#
+# Needs at least N rows in the local Postgres stand-in (see README.md).
+# By default the app runs in-process; pass --url to hit a running uvicorn server.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+sys.path.insert(0, str(API_DIR))
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Payload size and latency of each readings export format.")
+    parser.add_argument("--url", default=None, help="Base URL of a running API (default: run the app in-process)")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows to export (default: 100000)")
+    parser.add_argument("--dataset", default=None, help="Optional dataset filter")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per format; the median is reported")
+    return parser.parse_args()
+
+
+# 1. One fetch per format #################################
+# Each function returns (DataFrame, payload bytes).
+
+
+def fetch_json(client, params, n_rows):
+    # The JSON endpoint is paged (max 10000 rows per page), so follow the cursor
+    page_params = dict(params, limit=min(n_rows, 10000))
+    rows, n_bytes = [], 0
+    while len(rows) < n_rows:
+        resp = client.get("/readings", params=page_params)
+        resp.raise_for_status()
+        n_bytes += len(resp.content)
+        rows.extend(resp.json())
+        next_cursor = resp.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        page_params["cursor"] = next_cursor
+    return pd.DataFrame(rows[:n_rows]), n_bytes
+
+
+def fetch_ndjson(client, params, n_rows):
+    resp = client.get("/readings.ndjson", params=dict(params, limit=n_rows))
+    resp.raise_for_status()
+    return pd.read_json(io.BytesIO(resp.content), lines=True), len(resp.content)
+
+
+def fetch_arrow(client, params, n_rows):
+    resp = client.get("/readings.arrow", params=dict(params, limit=n_rows))
+    resp.raise_for_status()
+    table = pa.ipc.open_stream(resp.content).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True), len(resp.content)
+
+
+def fetch_parquet(client, params, n_rows):
+    resp = client.get("/readings.parquet", params=dict(params, limit=n_rows))
+    resp.raise_for_status()
+    return pq.read_table(io.BytesIO(resp.content)).to_pandas(), len(resp.content)
+
+
+FORMATS = [
+    ("json (/readings)", fetch_json),
+    ("ndjson", fetch_ndjson),
+    ("arrow", fetch_arrow),
+    ("parquet", fetch_parquet),
+]
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    params = {"dataset": args.dataset} if args.dataset else {}
+
+    if args.url:
+        client = httpx.Client(base_url=args.url.rstrip("/"), timeout=300.0)
+    else:
+        # TestClient runs the app (and its lifespan hooks) in-process
+        from fastapi.testclient import TestClient
+
+        import fastapi_app
+
+        client = TestClient(fastapi_app.app)
+
+    with client:
+        print(f"Rows requested: {args.rows}  params: {params}  runs per format: {args.repeat}")
+        print(f"{'format':<18} {'rows':>8} {'bytes':>12} {'bytes/row':>10} {'median s':>9} {'rows/s':>10}")
+        for name, fetch in FORMATS:
+            fetch(client, params, min(args.rows, 1000))  # warm up
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                df, n_bytes = fetch(client, params, args.rows)
+                timings.append(time.perf_counter() - start)
+            elapsed = statistics.median(timings)
+            n = len(df)
+            print(
+                f"{name:<18} {n:>8} {n_bytes:>12,} {n_bytes / max(n, 1):>10.1f} "
+                f"{elapsed:>9.3f} {n / elapsed:>10,.0f}"
+            )
+        if n < args.rows:
+            print(f"Note: only {n} rows matched; load more data for a {args.rows}-row comparison.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# bench_generator.py
+# Rows/sec and memory of the synthetic data generator
+# Pairs with scripts/generate_synthetic_data.py and benchmarks/README.md
+#
+# This script times generate_readings_for_dataset (NumPy, one block per
+# location) from 10k up to 100M rows, and the original per-reading Python
+# loop (kept here as the baseline) for the small sizes only.
+# Rows are scaled by adding synthetic locations and days. Peak memory is
+# traced with tracemalloc (NumPy reports its buffers to it).
+# No database needed.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from generate_synthetic_data import generate_readings_for_dataset  # noqa: E402
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Synthetic generator throughput from 10k to 100M rows.")
+    parser.add_argument(
+        "--rows",
+        default="10000,100000,1000000,10000000,100000000",
+        help="Comma-separated target row counts",
+    )
+    parser.add_argument("--legacy-max-rows", type=int, default=100_000, help="Largest size to run the old loop at")
+    return parser.parse_args()
+
+
+# 1. Baseline: the original per-reading loop #################################
+
+
+def legacy_generate(locations_df, label, seed, n_days, end_ts):
+    interval_mins = 15
+    n_readings_per_location = n_days * int(24 * 60 / interval_mins)
+    np.random.seed(seed)
+    base_ts = end_ts - timedelta(days=n_days)
+    records = []
+    for _, loc in locations_df.iterrows():
+        for i in range(n_readings_per_location):
+            ts = base_ts + timedelta(minutes=i * interval_mins)
+            hour = ts.hour + ts.minute / 60.0
+            rush = 1 if (7 <= hour <= 9) or (16 <= hour <= 18) else 0
+            level_raw = 1 + rush * 1.5 + np.random.normal(0, 0.6)
+            congestion_level = int(np.clip(round(level_raw), 1, 4))
+            delay_minutes = round(congestion_level * (2 + np.random.uniform(0, 3)), 2)
+            records.append(
+                {
+                    "location_id": loc["location_id"],
+                    "ts": ts.isoformat(),
+                    "congestion_level": congestion_level,
+                    "delay_minutes": delay_minutes,
+                    "dataset_label": label,
+                }
+            )
+    return pd.DataFrame.from_records(records)
+
+
+# 2. Sizing #################################
+
+
+def shape_for(rows: int):
+    """(n_locations, n_days) giving roughly `rows` readings at 96 per location-day."""
+    n_days = min(365, max(1, rows // (96 * 7)))
+    n_locations = max(1, round(rows / (96 * n_days)))
+    locations_df = pd.DataFrame({"location_id": [f"loc_{i:05d}" for i in range(n_locations)]})
+    return locations_df, n_days
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    df = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(df)
+    del df
+    return n, elapsed, peak
+
+
+# 3. Main #################################
+
+
+def main():
+    args = parse_args()
+    end_ts = datetime(2026, 3, 1)
+    print(f"{'impl':<8} {'rows':>12} {'locations':>9} {'days':>5} {'seconds':>9} {'rows/s':>12} {'peak MB':>9} {'B/row':>7}")
+    for target in [int(x) for x in args.rows.split(",") if x.strip()]:
+        locations_df, n_days = shape_for(target)
+        impls = [("numpy", generate_readings_for_dataset)]
+        if target <= args.legacy_max_rows:
+            impls.insert(0, ("loop", legacy_generate))
+        for name, fn in impls:
+            n, elapsed, peak = measure(fn, locations_df, "bench", 42, n_days, end_ts)
+            print(
+                f"{name:<8} {n:>12,} {len(locations_df):>9} {n_days:>5} {elapsed:>9.2f} "
+                f"{n / elapsed:>12,.0f} {peak / 1e6:>9.0f} {peak / n:>7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
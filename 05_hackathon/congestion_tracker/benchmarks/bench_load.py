@@ -0,0 +1,106 @@
+# bench_load.py
+# Rows/sec of the readings loaders: executemany INSERT vs. COPY
+# Pairs with scripts/bulk_load.py and benchmarks/README.md
+#
+# This script generates N readings (default 1M) with the chunked generator and
+# loads them into the local Postgres stand-in three ways:
+# - insert: the old cur.executemany INSERT (on a sample only; it is slow)
+# - copy:   COPY FROM STDIN with every index in place
+# - copy + drop indexes: secondary indexes dropped first and rebuilt after
+# Rows go in under dataset_label 'bench_load' and are deleted after each run.
+# Needs the local Postgres stand-in (see README.md), never Supabase.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from bulk_load import connect, copy_reading_chunks, ensure_partitions, load_readings  # noqa: E402
+from generate_synthetic_data import iter_reading_chunks, locations  # noqa: E402
+
+LABEL = "bench_load"
+END_TS = datetime(2026, 3, 1)
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="executemany INSERT vs. COPY load throughput.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Readings to load with COPY (default: 1000000)")
+    parser.add_argument("--insert-rows", type=int, default=20_000, help="Sample size for the INSERT baseline")
+    parser.add_argument("--rows-per-chunk", type=int, default=100_000)
+    return parser.parse_args()
+
+
+# 1. Loaders #################################
+
+
+def chunks_for(n_rows: int, rows_per_chunk: int):
+    """Generator chunks for the 7 real locations, trimmed to n_rows."""
+    n_days = max(1, -(-n_rows // (96 * len(locations))))
+    left = n_rows
+    for chunk in iter_reading_chunks(locations, LABEL, 7, n_days, rows_per_chunk, end_ts=END_TS):
+        if left <= 0:
+            return
+        yield chunk.iloc[:left]
+        left -= len(chunk)
+
+
+def insert_rows(cur, chunks) -> dict:
+    rows, start = 0, time.perf_counter()
+    for df in chunks:
+        cur.executemany(
+            "INSERT INTO congestion_readings (location_id, ts, congestion_level, delay_minutes, dataset_label) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            list(df[["location_id", "ts", "congestion_level", "delay_minutes", "dataset_label"]].itertuples(index=False, name=None)),
+        )
+        rows += len(df)
+    return {"rows": rows, "seconds": time.perf_counter() - start}
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    conn = connect()
+    results = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM congestion_readings")
+            print(f"congestion_readings already holds {cur.fetchone()[0]:,} rows (indexes cover them too)")
+            n_days = -(-max(args.rows, args.insert_rows) // (96 * len(locations)))
+            ensure_partitions(cur, END_TS - timedelta(days=n_days), END_TS)
+            runs = [
+                ("insert (executemany)", args.insert_rows, lambda c, n: insert_rows(c, chunks_for(n, args.rows_per_chunk)), "never"),
+                ("copy", args.rows, lambda c, n: copy_reading_chunks(c, chunks_for(n, args.rows_per_chunk)), "never"),
+                ("copy + drop indexes", args.rows, lambda c, n: copy_reading_chunks(c, chunks_for(n, args.rows_per_chunk)), "always"),
+            ]
+            for name, n_rows, load, drop in runs:
+                print(f"\n== {name}: {n_rows:,} rows")
+                start = time.perf_counter()
+                stats = load_readings(cur, lambda c: load(c, n_rows), n_rows, drop)
+                total = time.perf_counter() - start
+                conn.commit()
+                results.append((name, stats["rows"], total))
+                cur.execute("DELETE FROM congestion_readings WHERE dataset_label = %s", (LABEL,))
+                conn.commit()
+    finally:
+        conn.close()
+
+    print(f"\n{'loader':<22} {'rows':>10} {'seconds':>9} {'rows/s':>10}")
+    for name, rows, total in results:
+        print(f"{name:<22} {rows:>10,} {total:>9.1f} {rows / total:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
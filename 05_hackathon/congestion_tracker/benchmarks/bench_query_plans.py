@@ -0,0 +1,325 @@
+# bench_query_plans.py
+# Query plan regression suite for the API's readings and summary SQL
+# Pairs with api/queries.py, scripts/bulk_load.py and benchmarks/README.md
+#
+# This script seeds the local Postgres stand-in with generator output at one or
+# more scales (default 1M rows; --scales 1000000,10000000,50000000 for the full
+# suite) and runs every filter combination the endpoints accept through
+# EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON):
+# - /readings:   location_id, from_ts/to_ts, level, min_level, dataset (32 cases)
+# - /summary:    location_id, from_ts/to_ts, level, dataset (16 cases)
+# - /ai-summary: the last 7 days, with location_id, level, dataset (8 cases)
+# - incremental refresh: the dashboard's window and dataset, with after_id /
+#   after_ts one hour before its end, with and without location_id (2 cases)
+# - /timeseries: an 800-pixel plot of the window and of all N_DAYS, with and
+#   without location_id (4 cases)
+# The SQL comes from the same builders the API uses (api/queries.py).
+#
+# A case FAILS when its plan has a sequential scan on congestion_readings (or
+# one of its non-trivial partitions) that the stored baseline did not have, or when its
+# median planning + execution time exceeds the baseline by --tolerance.
+# The script exits 1 on any failure. Record a baseline on your machine first:
+#   python bench_query_plans.py --update-baseline
+#
+# Seeded rows use dataset_labels plan_a / plan_b / plan_c and locations
+# plan_loc_NNNNN; a scale already loaded is reused (--reseed forces a reload).
+# Needs the local Postgres stand-in (see README.md), never Supabase.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import itertools
+import json
+import statistics
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "api"))
+sys.path.insert(0, str(BENCH_DIR.parent / "scripts"))
+
+from bulk_load import (  # noqa: E402
+    connect,
+    copy_locations,
+    copy_reading_chunks,
+    ensure_partitions,
+    load_readings,
+    refresh_rollups,
+)
+from generate_synthetic_data import iter_reading_chunks  # noqa: E402
+from queries import readings_page_query, readings_where, summary_query, timeseries_query  # noqa: E402
+
+# Seeded data: 3 datasets over the same N_DAYS ending at END_TS; the location count sets the scale
+END_TS = datetime(2026, 3, 1)
+N_DAYS = 90
+DATASETS = [("plan_a", 101), ("plan_b", 102), ("plan_c", 103)]
+BASELINE_PATH = BENCH_DIR / "query_plan_baseline.json"
+SEQ_SCAN_MIN_ROWS = 1000
+
+# Filter values used when a filter is switched on
+# A week that starts and ends mid-hour, so /summary reads daily, hourly and raw pieces
+WINDOW = (
+    (END_TS - timedelta(days=7) + timedelta(hours=10, minutes=20)).isoformat(),
+    (END_TS - timedelta(hours=2, minutes=5)).isoformat(),
+)
+# Every seeded day, for /timeseries buckets long enough for the rollups
+FULL_SPAN = ((END_TS - timedelta(days=N_DAYS)).isoformat(), END_TS.isoformat())
+PLOT_WIDTH = 800
+LOCATIONS = ["plan_loc_00001", "plan_loc_00002"]
+LEVELS = [3, 4]
+MIN_LEVEL = "3"
+DATASET = "plan_b"
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE every API filter combination; fail on seq scans or slowdowns.")
+    parser.add_argument("--scales", default="1000000", help="Comma-separated seeded row counts (e.g. 1000000,10000000,50000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the median time is compared")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Fail above baseline ms x this factor")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="...plus this many ms (absorbs noise on fast queries)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--reseed", action="store_true", help="Reload the seeded rows even if the scale is already loaded")
+    parser.add_argument("--no-rollups", action="store_true", help="Plan /summary on raw readings (SUMMARY_USE_ROLLUPS=0)")
+    return parser.parse_args()
+
+
+# 1. Seeding #################################
+
+
+def n_locations_for(rows: int) -> int:
+    return max(1, round(rows / (len(DATASETS) * 96 * N_DAYS)))
+
+
+def seeded_locations(n: int) -> pd.DataFrame:
+    ids = [f"plan_loc_{i:05d}" for i in range(n)]
+    return pd.DataFrame({"location_id": ids, "name": ids, "zone": "plan"})
+
+
+def seed(conn, rows: int, reseed: bool) -> int:
+    """Load the plan_* datasets at this scale (reusing them if already loaded); returns the row count."""
+    locations_df = seeded_locations(n_locations_for(rows))
+    expected = len(DATASETS) * 96 * N_DAYS * len(locations_df)
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM congestion_readings WHERE dataset_label LIKE 'plan\\_%'")
+        if cur.fetchone()[0] == expected and not reseed:
+            print(f"Reusing {expected:,} seeded readings ({len(locations_df)} locations x {N_DAYS} days x 3 datasets)")
+            return expected
+
+        print(f"Seeding {expected:,} readings ({len(locations_df)} locations x {N_DAYS} days x 3 datasets)")
+        cur.execute("DELETE FROM congestion_readings WHERE dataset_label LIKE 'plan\\_%'")
+        cur.execute("DELETE FROM locations WHERE location_id LIKE 'plan\\_loc\\_%'")
+        copy_locations(cur, locations_df)
+        loaded_from = END_TS - timedelta(days=N_DAYS)
+        ensure_partitions(cur, loaded_from, END_TS)
+        chunks = (
+            chunk
+            for label, dataset_seed in DATASETS
+            for chunk in iter_reading_chunks(locations_df, label, dataset_seed, N_DAYS, 500_000, end_ts=END_TS)
+        )
+        load_readings(cur, lambda c: copy_reading_chunks(c, chunks), expected)
+        refresh_rollups(cur, loaded_from, END_TS)
+    conn.commit()
+
+    # Settle statistics and the visibility map now; otherwise autovacuum does it
+    # mid-run and plans (index-only scans especially) shift under the baseline
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for table in ["congestion_readings", "congestion_rollup_hourly", "congestion_rollup_daily"]:
+                cur.execute(f"VACUUM ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+    return expected
+
+
+# 2. Cases #################################
+
+
+def filter_cases(names: list):
+    """Every subset of the named filters, smallest first."""
+    for k in range(len(names) + 1):
+        yield from itertools.combinations(names, k)
+
+
+def build_cases(use_rollups: bool) -> list:
+    """(case name, sql, params) for every filter combination of each endpoint."""
+    cases = []
+    for combo in filter_cases(["location_id", "window", "level", "min_level", "dataset"]):
+        where_sql, params = readings_where(
+            location_id=LOCATIONS if "location_id" in combo else None,
+            from_ts=WINDOW[0] if "window" in combo else None,
+            to_ts=WINDOW[1] if "window" in combo else None,
+            min_level=MIN_LEVEL if "min_level" in combo else None,
+            level=LEVELS if "level" in combo else None,
+            dataset=DATASET if "dataset" in combo else None,
+        )
+        sql, params = readings_page_query(where_sql, params, 1001)
+        cases.append(("readings[" + ",".join(combo) + "]", sql, params))
+
+    for combo in filter_cases(["location_id", "window", "level", "dataset"]):
+        sql, params = summary_query(
+            from_ts=WINDOW[0] if "window" in combo else None,
+            to_ts=WINDOW[1] if "window" in combo else None,
+            location_id=LOCATIONS if "location_id" in combo else None,
+            level=LEVELS if "level" in combo else None,
+            dataset=DATASET if "dataset" in combo else None,
+            use_rollups=use_rollups,
+        )
+        cases.append(("summary[" + ",".join(combo) + "]", sql, params))
+
+    # /ai-summary always has a window: the last `days` (7) days up to "now" (END_TS here)
+    for combo in filter_cases(["location_id", "level", "dataset"]):
+        sql, params = summary_query(
+            from_ts=(END_TS - timedelta(days=7)).isoformat(),
+            to_ts=END_TS.isoformat(),
+            location_id=LOCATIONS if "location_id" in combo else None,
+            level=LEVELS if "level" in combo else None,
+            dataset=DATASET if "dataset" in combo else None,
+            use_rollups=use_rollups,
+        )
+        cases.append(("ai_summary[" + ",".join(combo) + "]", sql, params))
+
+    # Dashboard incremental refresh: rows added since the last load of a window
+    for combo in filter_cases(["location_id"]):
+        where_sql, params = readings_where(
+            location_id=LOCATIONS if "location_id" in combo else None,
+            from_ts=WINDOW[0],
+            to_ts=WINDOW[1],
+            dataset=DATASET,
+            after_id=0,
+            after_ts=(datetime.fromisoformat(WINDOW[1]) - timedelta(hours=1)).isoformat(),
+        )
+        sql, params = readings_page_query(where_sql, params, 1001)
+        cases.append(("readings_since[" + ",".join(combo + ("window", "dataset")) + "]", sql, params))
+
+    # Dashboard plot: a week is bucketed from raw readings, 90 days from the hourly rollup
+    for span_name, span in (("window", WINDOW), ("full_span", FULL_SPAN)):
+        for combo in filter_cases(["location_id"]):
+            sql, params, _ = timeseries_query(
+                span[0],
+                span[1],
+                PLOT_WIDTH,
+                location_id=LOCATIONS if "location_id" in combo else None,
+                dataset=DATASET,
+                use_rollups=use_rollups,
+            )
+            cases.append(("timeseries[" + ",".join(combo + (span_name, "dataset")) + "]", sql, params))
+    return cases
+
+
+# 3. EXPLAIN #################################
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def readings_seq_scans(plan: dict) -> list:
+    """
+    Relations of congestion_readings (or its partitions) read by a Seq Scan of
+    at least SEQ_SCAN_MIN_ROWS rows. Scanning an empty or nearly empty partition
+    (e.g. the current month at the edge of a window) is harmless.
+    """
+    return sorted(
+        {
+            n["Relation Name"]
+            for n in plan_nodes(plan)
+            if n["Node Type"] == "Seq Scan"
+            and n.get("Relation Name", "").startswith("congestion_readings")
+            and (n["Actual Rows"] + n.get("Rows Removed by Filter", 0)) * n["Actual Loops"] >= SEQ_SCAN_MIN_ROWS
+        }
+    )
+
+
+def scan_summary(plan: dict) -> str:
+    """Distinct scan node types over congestion_readings, e.g. 'Index Scan, Bitmap Heap Scan'."""
+    scans = []
+    for n in plan_nodes(plan):
+        if n.get("Relation Name", "").startswith("congestion_readings") and n["Node Type"] not in scans:
+            scans.append(n["Node Type"])
+    return ", ".join(scans) or "-"
+
+
+def explain(cur, sql: str, params: list, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        result = cur.fetchone()[0][0]
+        times.append(result["Planning Time"] + result["Execution Time"])
+    plan = result["Plan"]
+    return {
+        "ms": round(statistics.median(times), 3),
+        "seq_scans": readings_seq_scans(plan),
+        "scans": scan_summary(plan),
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+    }
+
+
+def check(result: dict, base: dict, tolerance: float, slack_ms: float) -> list:
+    """Reasons this case regressed against its baseline entry (empty list = pass)."""
+    problems = []
+    new_seq = [rel for rel in result["seq_scans"] if rel not in (base or {}).get("seq_scans", [])]
+    if new_seq:
+        problems.append("seq scan on " + ", ".join(new_seq))
+    if base and result["ms"] > base["ms"] * tolerance + slack_ms:
+        problems.append(f"{result['ms']:.1f} ms > baseline {base['ms']:.1f} ms")
+    return problems
+
+
+# 4. Main #################################
+
+
+def main():
+    args = parse_args()
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if not baseline and not args.update_baseline:
+        print(f"No baseline at {args.baseline}; only seq scans are checked (run with --update-baseline to store one).")
+
+    conn = connect()
+    failures = 0
+    try:
+        for scale in [int(x) for x in args.scales.split(",") if x.strip()]:
+            rows = seed(conn, scale, args.reseed)
+            key = str(scale)
+            results = {}
+            print(f"\n== {rows:,} readings")
+            print(f"{'case':<50} {'ms':>9} {'baseline':>9} {'buffers':>9}  scans / status")
+            with conn.cursor() as cur:
+                for name, sql, params in build_cases(not args.no_rollups):
+                    result = explain(cur, sql, params, args.repeat)
+                    results[name] = result
+                    base = baseline.get(key, {}).get(name)
+                    problems = [] if args.update_baseline else check(result, base, args.tolerance, args.slack_ms)
+                    failures += bool(problems)
+                    status = "FAIL: " + "; ".join(problems) if problems else "ok"
+                    base_ms = f"{base['ms']:.1f}" if base else "-"
+                    print(f"{name:<50} {result['ms']:>9.1f} {base_ms:>9} {result['buffers']:>9}  {result['scans']} / {status}")
+            conn.rollback()
+            if args.update_baseline:
+                baseline[key] = results
+    finally:
+        conn.close()
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nStored baseline for scales {', '.join(sorted(baseline, key=int))} in {args.baseline}")
+    elif failures:
+        print(f"\n{failures} case(s) regressed.")
+        sys.exit(1)
+    else:
+        print("\nAll cases passed.")
+
+
+if __name__ == "__main__":
+    main()
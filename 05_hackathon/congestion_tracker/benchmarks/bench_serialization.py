@@ -0,0 +1,126 @@
+# bench_serialization.py
+# Per-request CPU cost of serializing /readings
+# Pairs with api/fastapi_app.py (get_readings) and benchmarks/README.md
+#
+# This script compares two ways of turning readings rows into a JSON response:
+# - "model": format ts/delay in Python, build a Reading model per row, and let
+#   Pydantic validate + serialize the list (the API_DEBUG_VALIDATION=1 path)
+# - "fast": rows already formatted by SQL, encoded directly with orjson
+#
+# Part 1 times serialization alone on the same rows. Part 2 measures CPU time
+# per request through the whole app (in-process) with each mode switched on.
+# Needs the local Postgres stand-in (see README.md).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import orjson
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+sys.path.insert(0, str(API_DIR))
+
+import fastapi_app  # noqa: E402
+from db import db_connection, open_pool  # noqa: E402
+from queries import READINGS_SELECT  # noqa: E402
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CPU per request: Pydantic response_model vs. SQL-formatted rows + orjson.")
+    parser.add_argument("--rows", default="1000,5000,10000", help="Comma-separated page sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per measurement")
+    return parser.parse_args()
+
+
+# Rows as the endpoint used to fetch them: datetime ts and Decimal delay_minutes
+RAW_SQL = (
+    "SELECT r.id, r.location_id, l.name AS location_name, r.ts, r.congestion_level, r.delay_minutes "
+    "FROM congestion_readings r JOIN locations l ON l.location_id = r.location_id "
+    "ORDER BY r.ts DESC, r.id DESC LIMIT %s"
+)
+
+
+def fetch_rows(sql, n_rows):
+    import psycopg2.extras
+
+    with db_connection() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(sql, [n_rows])
+        return cur.fetchall()
+
+
+# 1. Serialization only #################################
+
+
+def serialize_model(raw_rows, adapter):
+    rows = [dict(row) for row in raw_rows]  # the old loop mutated the fetched rows
+    for row in rows:
+        ts_val = row.get("ts")
+        if isinstance(ts_val, datetime):
+            row["ts"] = ts_val.replace(tzinfo=timezone.utc).isoformat()
+    items = [fastapi_app.Reading(**row) for row in rows]
+    # FastAPI re-validates the returned objects against response_model, then dumps JSON
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+def serialize_fast(formatted_rows):
+    return orjson.dumps(formatted_rows)
+
+
+def cpu_per_call(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1000
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    sizes = [int(x) for x in args.rows.split(",") if x.strip()]
+    open_pool()
+    adapter = TypeAdapter(List[fastapi_app.Reading])
+
+    print("Part 1: serialization only (CPU ms per call)")
+    print(f"{'rows':>8} {'model':>10} {'fast':>10} {'saved':>10}")
+    for n_rows in sizes:
+        raw_rows = fetch_rows(RAW_SQL, n_rows)
+        formatted_rows = fetch_rows(READINGS_SELECT + "ORDER BY r.ts DESC, r.id DESC LIMIT %s", n_rows)
+        model_ms = cpu_per_call(lambda: serialize_model(raw_rows, adapter), args.repeat)
+        fast_ms = cpu_per_call(lambda: serialize_fast(formatted_rows), args.repeat)
+        print(f"{len(raw_rows):>8} {model_ms:>10.2f} {fast_ms:>10.2f} {model_ms - fast_ms:>10.2f}")
+
+    print()
+    print("Part 2: whole /readings request in-process (CPU ms per request, includes DB client work)")
+    print(f"{'rows':>8} {'model':>10} {'fast':>10} {'saved':>10}")
+    with TestClient(fastapi_app.app) as client:
+        for n_rows in sizes:
+            results = {}
+            for mode, debug in [("model", True), ("fast", False)]:
+                fastapi_app.DEBUG_VALIDATION = debug
+                client.get("/readings", params={"limit": n_rows})  # warm up
+                results[mode] = cpu_per_call(
+                    lambda: client.get("/readings", params={"limit": n_rows}), args.repeat
+                )
+            fastapi_app.DEBUG_VALIDATION = False
+            print(
+                f"{n_rows:>8} {results['model']:>10.2f} {results['fast']:>10.2f} "
+                f"{results['model'] - results['fast']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
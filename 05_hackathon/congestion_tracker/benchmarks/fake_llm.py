@@ -0,0 +1,111 @@
+# fake_llm.py
+# Local stand-in for the OpenAI chat completions endpoint
+# Pairs with bench_ai_stream.py and benchmarks/README.md
+#
+# Answers POST /v1/chat/completions with a canned summary, paced like a real
+# model: --first-token-ms before the first word, then --token-ms per word.
+# With "stream": true it sends OpenAI-style Server-Sent Events
+# (data: {choices: [{delta: {content}}]} ... data: [DONE]); otherwise it waits
+# for the whole answer and returns one JSON body. Token counts (one per word)
+# come back in `usage`, streamed as a last chunk when the request sets
+# stream_options.include_usage.
+#
+# Run it, then start the API with OPENAI_BASE_URL=http://127.0.0.1:8099/v1
+# (any OPENAI_API_KEY value works).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "Congestion is heaviest downtown and on the bridge approaches during the evening peak. "
+    "Average levels are above the usual weekday pattern, with several readings at level 4. "
+    "Airport Rd stays moderate. Avoid the bridge between 5 and 7 pm and watch the downtown "
+    "core for incidents that push delays past 20 minutes."
+)
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server for local benchmarks.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--first-token-ms", type=float, default=400.0, help="Delay before the first word")
+    parser.add_argument("--token-ms", type=float, default=40.0, help="Delay between words")
+    return parser.parse_args()
+
+
+# 1. Request handler #################################
+
+
+def make_handler(first_token_s: float, token_s: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            words = ANSWER.split(" ")
+            prompt = " ".join(message.get("content", "") for message in body.get("messages", []))
+            usage = {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(words),
+                "total_tokens": len(prompt.split()) + len(words),
+            }
+            if body.get("stream"):
+                include_usage = (body.get("stream_options") or {}).get("include_usage")
+                self._stream(words, usage if include_usage else None)
+            else:
+                time.sleep(first_token_s + token_s * (len(words) - 1))
+                payload = json.dumps(
+                    {"choices": [{"message": {"role": "assistant", "content": ANSWER}}], "usage": usage}
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        def _stream(self, words, usage=None):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(first_token_s)
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(token_s)
+                chunk = {"choices": [{"delta": {"content": word if i == 0 else " " + word}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            if usage is not None:
+                self._write_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+# 2. Main #################################
+
+
+def main():
+    args = parse_args()
+    handler = make_handler(args.first_token_ms / 1000, args.token_ms / 1000)
+    print(f"Fake LLM listening on http://127.0.0.1:{args.port}/v1/chat/completions")
+    ThreadingHTTPServer(("127.0.0.1", args.port), handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# mock_api.py
+# Local stand-in for the congestion API, as seen by the dashboard
+# Pairs with bench_dashboard_refresh.py and benchmarks/README.md
+#
+# Serves GET /locations, /readings.arrow and /summary from canned data, each
+# paced by a fixed delay (--readings-ms, --summary-ms) so dashboard refreshes
+# can be timed without Postgres. --connect-ms is paid once per new TCP
+# connection (standing in for the TCP + TLS handshake to a hosted API), and
+# GET /mock-stats counts connections and requests. With --etag, responses
+# carry an ETag and a matching If-None-Match gets an immediate 304 (the real
+# API checks it before running the query).
+#
+# Run it, then start the dashboard with CONGESTION_API_URL=http://127.0.0.1:8098
+# (or import start_mock_api() to run it in a background thread).
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import io
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pyarrow as pa
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+## 0.2 Command-line options ###############################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mock congestion API for dashboard benchmarks.")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--rows", type=int, default=20_000, help="Readings in /readings.arrow")
+    parser.add_argument("--readings-ms", type=float, default=150.0, help="Delay before /readings.arrow answers")
+    parser.add_argument("--summary-ms", type=float, default=100.0, help="Delay before /summary answers")
+    parser.add_argument("--connect-ms", type=float, default=0.0, help="Delay once per new connection")
+    parser.add_argument("--etag", action="store_true", help="Send ETags and answer 304 when they match")
+    return parser.parse_args()
+
+
+# 1. Canned payloads #################################
+
+
+def make_payloads(n_rows: int, n_locations: int = 8) -> dict:
+    """Arrow stream, /summary JSON and /locations JSON shaped like the real API's."""
+    end = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    location_ids = [f"loc_{i:03d}" for i in range(n_locations)]
+    table = pa.table(
+        {
+            "id": pa.array(range(n_rows), pa.int64()),
+            "location_id": [location_ids[i % n_locations] for i in range(n_rows)],
+            "location_name": [f"Road {i % n_locations}" for i in range(n_rows)],
+            "ts": pa.array([end - timedelta(minutes=15 * i) for i in range(n_rows)], pa.timestamp("us", tz="UTC")),
+            "congestion_level": pa.array([1 + (i * 7) % 4 for i in range(n_rows)], pa.int16()),
+            "delay_minutes": pa.array([((i * 13) % 300) / 10 for i in range(n_rows)], pa.float64()),
+        }
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+        writer.write_table(table, max_chunksize=20_000)
+    summary = [
+        {"location_id": lid, "name": f"Road {i}", "zone": "central", "n": n_rows // n_locations, "avg_level": 2.5, "max_level": 4}
+        for i, lid in enumerate(location_ids)
+    ]
+    locations = [{"location_id": lid, "name": f"Road {i}", "zone": "central"} for i, lid in enumerate(location_ids)]
+    return {
+        "/readings.arrow": (sink.getvalue(), ARROW_MEDIA_TYPE),
+        "/summary": (json.dumps(summary).encode(), "application/json"),
+        "/locations": (json.dumps(locations).encode(), "application/json"),
+    }
+
+
+# 2. Request handler #################################
+
+
+def make_handler(payloads: dict, delays: dict, connect_s: float, etag: bool, stats: dict):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats["connections"] += 1
+            time.sleep(connect_s)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            with lock:
+                stats["requests"] += 1
+            if path == "/mock-stats":
+                self._send(200, json.dumps(stats).encode(), "application/json")
+                return
+            if path not in payloads:
+                self._send(404, b'{"detail":"Not Found"}', "application/json")
+                return
+            tag = f'W/"{path}-1"'
+            if etag and self.headers.get("If-None-Match") == tag:
+                self._send(304, b"", None, {"ETag": tag})
+                return
+            time.sleep(delays.get(path, 0.0))
+            body, media_type = payloads[path]
+            self._send(200, body, media_type, {"ETag": tag} if etag else {})
+
+        def _send(self, status, body, media_type, headers=None):
+            self.send_response(status)
+            if media_type:
+                self.send_header("Content-Type", media_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def start_mock_api(port: int = 8098, rows: int = 20_000, readings_ms: float = 150.0, summary_ms: float = 100.0,
+                   connect_ms: float = 0.0, etag: bool = False):
+    """Serve the mock API from a daemon thread. Returns (server, stats dict)."""
+    stats = {"connections": 0, "requests": 0}
+    delays = {"/readings.arrow": readings_ms / 1000, "/summary": summary_ms / 1000}
+    handler = make_handler(make_payloads(rows), delays, connect_ms / 1000, etag, stats)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+# 3. Main #################################
+
+
+def main():
+    args = parse_args()
+    server, _ = start_mock_api(args.port, args.rows, args.readings_ms, args.summary_ms, args.connect_ms, args.etag)
+    print(f"Mock congestion API listening on http://127.0.0.1:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
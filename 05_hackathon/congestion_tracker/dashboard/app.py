@@ -7,9 +7,12 @@ from shiny import App
 import os
 
 from ui import app_ui
-from server import server
+from server import close_api_client, live_feed, server
 
 app = App(app_ui, server)
+# The API client and the live feed are shared by all sessions; close both on shutdown
+app.on_shutdown(close_api_client)
+app.on_shutdown(live_feed.stop)
 
 if __name__ == "__main__":
     # Run with: python app.py
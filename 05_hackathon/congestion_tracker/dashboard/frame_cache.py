@@ -0,0 +1,130 @@
+# frame_cache.py
+# City Congestion Tracker – dashboard cache of API results as DataFrames
+# Pairs with server.py
+#
+# Flipping between the Dataset A/B/C buttons, or back to a date range looked
+# at a minute ago, asks the API for results this process already holds. This
+# cache keeps the parsed DataFrames per (endpoint, normalized query params),
+# shared by every session of the dashboard process:
+# - entries with an ETag are revalidated on each use (If-None-Match); a 304
+#   reuses the cached DataFrame without downloading or parsing anything
+# - entries without one (an API that sends no ETags) are reused as-is for
+#   ttl_seconds, then fetched again
+# The least recently used entries are dropped beyond max_entries or max_bytes.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+
+# 1. Cache key #################################
+
+
+def normalize_params(params: dict) -> tuple:
+    """
+    Hashable, order-independent form of a query-params dict: keys sorted,
+    list values (location_id, level) sorted into tuples, empty values dropped.
+    """
+    items = []
+    for name, value in params.items():
+        if value is None or value == [] or value == "":
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(str(v) for v in value))
+        items.append((name, value))
+    return tuple(sorted(items))
+
+
+def cache_key(url: str, params: dict) -> tuple:
+    return (url, normalize_params(params))
+
+
+# 2. Cache class #################################
+
+
+@dataclass
+class CachedFrame:
+    frame: pd.DataFrame
+    etag: Optional[str]
+    stored_at: float  # time.monotonic() of the last download or 304
+    n_bytes: int
+
+
+class FrameCache:
+    """
+    Thread-safe LRU of DataFrames (max_entries and max_bytes) for API results.
+    get() returns the entry; the caller revalidates it when it has an ETag, or
+    uses it directly while is_fresh() when it does not.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> CachedFrame
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key: tuple) -> Optional[CachedFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: CachedFrame) -> bool:
+        """True while an entry without an ETag may be reused without asking the API."""
+        return time.monotonic() - entry.stored_at < self.ttl_seconds
+
+    def touch(self, key: tuple) -> None:
+        """Mark an entry as just confirmed by the API (a 304)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stored_at = time.monotonic()
+
+    def put(self, key: tuple, frame: pd.DataFrame, etag: Optional[str]) -> None:
+        n_bytes = int(frame.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.n_bytes
+            if n_bytes > self.max_bytes:
+                return  # larger than the whole cache: do not flush everything else for it
+            self._entries[key] = CachedFrame(frame, etag, time.monotonic(), n_bytes)
+            self._bytes += n_bytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.n_bytes
+                self._counters["evictions"] += 1
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return n
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "mb": round(self._bytes / 1e6, 1),
+                "max_mb": round(self.max_bytes / 1e6, 1),
+                "ttl_seconds": self.ttl_seconds,
+                **self._counters,
+            }
@@ -0,0 +1,103 @@
+# live_feed.py
+# City Congestion Tracker – dashboard subscription to the API's live readings
+# Pairs with server.py and api/live.py
+#
+# The API pushes new readings per dataset_label over GET /live (Server-Sent
+# Events). Opening that stream once per browser session would multiply
+# connections by the number of viewers, so the dashboard process holds a
+# single subscription (one asyncio task on Shiny's event loop) and keeps the
+# latest event per dataset in a reactive.Value shared by every session. A
+# session's effects read the value for the dataset it shows, so setting it
+# fans the update out to exactly the sessions that need it.
+#
+# After a dropped connection (or a `resync` from the API) the feed sets a
+# resync event for every dataset: sessions then catch up with one
+# incremental refresh (after_id) instead of trusting a stream with gaps.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import contextvars
+import json
+import time
+from typing import Optional
+
+import httpx
+from shiny import reactive
+
+
+# 1. Feed class #################################
+
+
+class LiveFeed:
+    """
+    One /live subscription per dashboard process. latest(dataset) is the
+    reactive.Value holding that dataset's most recent event:
+    {"kind": "readings" | "resync", "dataset", "received_at", ...API payload}.
+    """
+
+    def __init__(self, retry_seconds: float = 5.0):
+        self.retry_seconds = retry_seconds
+        self._values = {}  # dataset -> reactive.Value
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"connects": 0, "events": 0, "resyncs": 0}
+
+    def latest(self, dataset: str) -> reactive.Value:
+        value = self._values.get(dataset)
+        if value is None:
+            value = self._values[dataset] = reactive.Value(None)
+        return value
+
+    def start(self, base: str) -> None:
+        """Start the subscription on the running event loop (no-op when it is already running)."""
+        if self._task is not None and not self._task.done():
+            return
+        # A fresh context: the task outlives the session that happened to start it
+        self._task = asyncio.get_running_loop().create_task(self._run(base), context=contextvars.Context())
+
+    def stop(self) -> None:
+        """Cancel the subscription (registered with App.on_shutdown in app.py)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None and not self._task.done(), **self._counters}
+
+    async def _run(self, base: str) -> None:
+        timeout = httpx.Timeout(10.0, read=None)  # the stream may stay quiet between keep-alives
+        while True:
+            try:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    async with client.stream("GET", f"{base}/live") as resp:
+                        resp.raise_for_status()
+                        self._counters["connects"] += 1
+                        if self._counters["connects"] > 1:
+                            # Readings may have been added while we were disconnected
+                            await self._dispatch("resync", {"datasets": None})
+                        event = None
+                        async for line in resp.aiter_lines():
+                            if line.startswith("event:"):
+                                event = line[len("event:"):].strip()
+                            elif line.startswith("data:") and event in ("readings", "resync"):
+                                await self._dispatch(event, json.loads(line[len("data:"):]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"Warning: live feed disconnected ({exc}); retrying in {self.retry_seconds:.0f} s")
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _dispatch(self, kind: str, data: dict) -> None:
+        received_at = time.monotonic()
+        if kind == "readings":
+            self._counters["events"] += 1
+            self.latest(data["dataset"]).set({"kind": kind, "received_at": received_at, **data})
+        else:
+            self._counters["resyncs"] += 1
+            datasets = data.get("datasets") or list(self._values)
+            for dataset in datasets:
+                self.latest(dataset).set({"kind": kind, "received_at": received_at, "dataset": dataset})
+        # Set outside any session, so run the dependent effects (and send outputs) now
+        await reactive.flush()
@@ -0,0 +1,188 @@
+# readings_window.py
+# City Congestion Tracker – dashboard readings window with incremental refresh
+# Pairs with server.py
+#
+# A refresh used to throw the readings DataFrame away and download the whole
+# date window again, even when only a handful of readings had arrived since
+# the last load. A ReadingsWindow keeps the loaded rows together with their
+# daily aggregates (sum and count of congestion_level per location and day),
+# and the highest id / timestamp it has seen. When the next refresh asks for
+# the same dataset and locations over the same (or a narrower) window, the
+# dashboard asks the API only for rows after that id (after_id / after_ts),
+# then:
+# - prepends the new rows to the frame
+# - trims rows that fell out of the window
+# - adds the new rows into the days they belong to, and drops days outside
+#   the window, leaving every other day's aggregate untouched
+# so a refresh costs O(new rows) instead of O(window).
+# The window also keeps the API's data generation (X-Data-Generation), which
+# changes only when readings were deleted or rewritten, e.g. by a TRUNCATE +
+# reload. When it differs, the rows held are no longer the dataset's rows and
+# the dashboard downloads the full window again.
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+
+# 1. Daily aggregates #################################
+
+
+def group_column(frame: pd.DataFrame) -> str:
+    """Group key for the daily aggregates: location name when the API sent it, otherwise location_id."""
+    return "location_name" if "location_name" in frame.columns else "location_id"
+
+
+def daily_aggregates(frame: pd.DataFrame, group_col: str) -> pd.DataFrame:
+    """
+    Sum and count of congestion_level per (location, UTC date), indexed by
+    (group_col, date). Sums and counts (not means) so that new rows can be
+    added to a day without re-reading the rows already there.
+    """
+    if frame.empty or "ts" not in frame.columns or "congestion_level" not in frame.columns:
+        index = pd.MultiIndex.from_arrays([[], []], names=[group_col, "date"])
+        return pd.DataFrame({"level_sum": pd.Series(dtype="float64"), "n": pd.Series(dtype="int64")}, index=index)
+    dates = pd.to_datetime(frame["ts"], errors="coerce", utc=True).dt.date
+    return (
+        frame.groupby([frame[group_col], dates.rename("date")])["congestion_level"]
+        .agg(level_sum="sum", n="count")
+        .astype({"level_sum": "float64", "n": "int64"})
+    )
+
+
+# 2. Window class #################################
+
+
+@dataclass(frozen=True)
+class ReadingsWindow:
+    """
+    Readings for one query (key) between from_ts and to_ts, newest first, and
+    their daily aggregates. Immutable: extend() returns a new window, so a
+    frame shared with the result cache or another session is never modified.
+    """
+
+    key: tuple  # endpoint + every query param except the window bounds
+    frame: pd.DataFrame
+    daily: pd.DataFrame  # level_sum, n per (location, date)
+    from_ts: pd.Timestamp
+    to_ts: pd.Timestamp
+    max_id: Optional[int]
+    max_ts: Optional[pd.Timestamp]
+    generation: Optional[str] = None  # X-Data-Generation of the full download
+
+    @classmethod
+    def build(
+        cls, key: tuple, frame: pd.DataFrame, from_ts: str, to_ts: str, generation: Optional[str] = None
+    ) -> "ReadingsWindow":
+        """Window from a full download (aggregates computed over every row)."""
+        max_id, max_ts = _high_water_marks(frame)
+        return cls(
+            key=key,
+            frame=frame,
+            daily=daily_aggregates(frame, group_column(frame)),
+            from_ts=pd.Timestamp(from_ts),
+            to_ts=pd.Timestamp(to_ts),
+            max_id=max_id,
+            max_ts=max_ts,
+            generation=generation,
+        )
+
+    def can_extend(self, key: tuple, from_ts: str, to_ts: str, generation: Optional[str]) -> bool:
+        """
+        True when new rows plus trimming give the exact result for this query:
+        same key, a window inside the loaded one (rows before from_ts, or after
+        to_ts, were never downloaded), and the same data generation (rows were
+        only appended since). An empty window has no id to start from.
+        """
+        return (
+            key == self.key
+            and generation == self.generation
+            and self.max_id is not None
+            and pd.Timestamp(from_ts) >= self.from_ts
+            and pd.Timestamp(to_ts) <= self.to_ts
+        )
+
+    def covers(self, from_ts: str, to_ts: str) -> bool:
+        return pd.Timestamp(from_ts) == self.from_ts and pd.Timestamp(to_ts) == self.to_ts
+
+    def after_params(self, late_seconds: float) -> dict:
+        """
+        Query params for the rows added since this window was loaded. after_ts
+        sits late_seconds before the newest timestamp, so readings that arrive
+        a little out of order are still found; after_id keeps them unique.
+        """
+        params = {"after_id": self.max_id}
+        if self.max_ts is not None:
+            params["after_ts"] = (self.max_ts - pd.Timedelta(seconds=late_seconds)).isoformat()
+        return params
+
+    def extend(self, new_rows: pd.DataFrame, from_ts, to_ts) -> "ReadingsWindow":
+        """
+        New window for [from_ts, to_ts] (strings or Timestamps): new_rows with
+        ids above max_id prepended, rows outside the window trimmed, and only
+        the days touched by new_rows or by the trim recomputed. Assumes day-aligned windows (whole UTC
+        days, as the dashboard's date range gives), so a trimmed day is
+        dropped whole. Returns self when nothing changes.
+        """
+        start, end = pd.Timestamp(from_ts), pd.Timestamp(to_ts)
+        frame = self.frame
+        if not new_rows.empty:
+            # Rows pushed by the live feed may already have come in with a refresh
+            keep = (new_rows["ts"] >= start) & (new_rows["ts"] <= end)
+            if self.max_id is not None:
+                keep &= new_rows["id"] > self.max_id
+            new_rows = new_rows[keep]
+        if new_rows.empty and start == self.from_ts and end == self.to_ts:
+            return self
+        if not new_rows.empty:
+            new_rows = new_rows.sort_values(["ts", "id"], ascending=False)
+            frame = pd.concat([new_rows, frame], ignore_index=True)
+            if self.max_ts is not None and new_rows["ts"].min() < self.max_ts:
+                # A late reading landed among older ones: restore newest-first order
+                frame = frame.sort_values(["ts", "id"], ascending=False, ignore_index=True)
+        if start > self.from_ts or end < self.to_ts:
+            frame = frame[(frame["ts"] >= start) & (frame["ts"] <= end)].reset_index(drop=True)
+
+        daily = self.daily
+        if start > self.from_ts or end < self.to_ts:
+            dates = daily.index.get_level_values("date")
+            daily = daily[(dates >= start.date()) & (dates <= end.date())]
+        if not new_rows.empty:
+            added = daily_aggregates(new_rows, group_column(new_rows))
+            daily = daily.add(added, fill_value=0).astype({"level_sum": "float64", "n": "int64"})
+
+        max_id, max_ts = _high_water_marks(new_rows)
+        return ReadingsWindow(
+            key=self.key,
+            frame=frame,
+            daily=daily,
+            from_ts=start,
+            to_ts=end,
+            max_id=_larger(self.max_id, max_id),
+            max_ts=_larger(self.max_ts, max_ts),
+            generation=self.generation,
+        )
+
+    def mean_level(self) -> Optional[float]:
+        """Mean congestion_level over the whole window, from the daily sums."""
+        n = int(self.daily["n"].sum())
+        return float(self.daily["level_sum"].sum()) / n if n else None
+
+
+def _high_water_marks(frame: pd.DataFrame):
+    """(max id, max ts) of a readings frame, or (None, None) when it has no rows."""
+    if frame.empty or "id" not in frame.columns or "ts" not in frame.columns:
+        return None, None
+    return int(frame["id"].max()), frame["ts"].max()
+
+
+def _larger(a, b):
+    """max(a, b), where None means "nothing seen yet"."""
+    if a is None or b is None:
+        return b if a is None else a
+    return max(a, b)
@@ -7,14 +7,24 @@
 
 ## 0.1 Load packages ############################
 
+import asyncio
+import json
+import math
 import os
+import threading
+import time
 from pathlib import Path
 
 import httpx
 import pandas as pd
+import pyarrow as pa
 from dotenv import load_dotenv
 from shiny import reactive, render, ui
 
+from frame_cache import FrameCache, cache_key
+from live_feed import LiveFeed
+from readings_window import ReadingsWindow
+
 
 ## 0.2 Environment ###############################
 
@@ -31,6 +41,266 @@ def get_api_base() -> str:
     return os.getenv("CONGESTION_API_URL", "http://127.0.0.1:8001")
 
 
+## 0.3 Shared API client ###############################
+
+# One keep-alive client per dashboard process, shared by every session, so a
+# refresh reuses open connections to the API instead of paying a TCP (and TLS)
+# handshake per request. httpx.Client is thread-safe: the /readings.arrow and
+# /summary downloads run at the same time in worker threads (asyncio.to_thread).
+API_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+API_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+_api_client = None
+_api_client_lock = threading.Lock()
+
+
+def get_api_client() -> httpx.Client:
+    """Return the process-wide API client, creating it on first use."""
+    global _api_client
+    with _api_client_lock:
+        if _api_client is None:
+            _api_client = httpx.Client(timeout=API_TIMEOUT, limits=API_LIMITS)
+        return _api_client
+
+
+def close_api_client() -> None:
+    """Close the shared client and its connections (registered with App.on_shutdown in app.py)."""
+    global _api_client
+    with _api_client_lock:
+        if _api_client is not None:
+            _api_client.close()
+            _api_client = None
+
+
+## 0.4 Result cache ###############################
+
+# Parsed DataFrames per (endpoint, normalized query params), shared by every
+# session in this process (frame_cache.py). Entries with an ETag are
+# revalidated with If-None-Match on each use: a 304 reuses the cached
+# DataFrame as-is (nothing is downloaded or parsed, and plots that depend on
+# it do not redraw). Entries without an ETag are reused for
+# DASHBOARD_CACHE_TTL seconds.
+frame_cache = FrameCache(
+    max_entries=int(os.getenv("DASHBOARD_CACHE_SIZE", "32")),
+    max_bytes=int(float(os.getenv("DASHBOARD_CACHE_MB", "256")) * 1e6),
+    ttl_seconds=float(os.getenv("DASHBOARD_CACHE_TTL", "60")),
+)
+
+
+def get_frame(client: httpx.Client, url: str, params: dict, parse):
+    """
+    GET url and parse(response) -> DataFrame, through the result cache.
+    Returns (frame, cached) where cached is True when the cached DataFrame
+    was reused (a 304, or a fresh entry without an ETag).
+    """
+    frame, cached, _ = _get_frame(client, url, params, parse)
+    return frame, cached
+
+
+def _get_frame(client: httpx.Client, url: str, params: dict, parse):
+    """get_frame, plus the response's X-Data-Generation (None when no request was sent)."""
+    key = cache_key(url, params)
+    entry = frame_cache.get(key)
+    if entry is not None and entry.etag is None and frame_cache.is_fresh(entry):
+        frame_cache.count("fresh_hits")
+        return entry.frame, True, None
+    headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+    resp = client.get(url, params=params, headers=headers)
+    generation = resp.headers.get("X-Data-Generation")
+    if resp.status_code == 304 and entry is not None:
+        frame_cache.touch(key)
+        frame_cache.count("revalidated")
+        return entry.frame, True, generation
+    resp.raise_for_status()
+    frame = parse(resp)
+    frame_cache.count("misses")
+    frame_cache.put(key, frame, resp.headers.get("ETag"))
+    return frame, False, generation
+
+
+def _arrow_frame(resp: httpx.Response) -> pd.DataFrame:
+    table = pa.ipc.open_stream(resp.content).read_all()
+    # self_destruct releases each Arrow column as soon as pandas has taken it over
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def fetch_readings_frame(client: httpx.Client, base: str, params: dict):
+    """
+    Fetch every reading in the window from /readings.arrow and convert it to pandas.
+    Arrow sends typed columns, so there is no per-row JSON parsing; numeric
+    columns become DataFrame columns without copying. Returns (frame, cached).
+    """
+    return get_frame(client, f"{base}/readings.arrow", params, _arrow_frame)
+
+
+def fetch_summary_frame(client: httpx.Client, base: str, params: dict):
+    """Fetch /summary as a DataFrame. Returns (frame, cached)."""
+    return get_frame(client, f"{base}/summary", params, lambda resp: pd.DataFrame(resp.json()))
+
+
+async def load_readings(base: str, params: dict):
+    """fetch_readings_frame on the shared client, in a worker thread (download + Arrow decode)."""
+    return await asyncio.to_thread(fetch_readings_frame, get_api_client(), base, params)
+
+
+## 0.5 Incremental readings refresh ###############################
+
+# A refresh for the same dataset and locations over the same (or a narrower)
+# window asks /readings.arrow only for rows after the newest id already held
+# (readings_window.py), instead of the whole window. after_ts sits
+# DASHBOARD_LATE_SECONDS before the newest timestamp, so readings stamped a
+# little earlier than ones already loaded are still picked up. When the API's
+# X-Data-Generation differs from the one the window was loaded at, readings
+# were deleted or reloaded in between and the full window is downloaded again.
+# DASHBOARD_INCREMENTAL=0 downloads the full window on every refresh.
+INCREMENTAL_REFRESH = os.getenv("DASHBOARD_INCREMENTAL", "1") != "0"
+LATE_SECONDS = float(os.getenv("DASHBOARD_LATE_SECONDS", "3600"))
+
+
+def window_key(base: str, params: dict) -> tuple:
+    """Query identity of a readings window: everything but its time bounds."""
+    return cache_key(f"{base}/readings.arrow", {k: v for k, v in params.items() if k not in ("from_ts", "to_ts")})
+
+
+def refresh_readings_window(client: httpx.Client, base: str, params: dict, previous=None):
+    """
+    Readings for params as a ReadingsWindow. Extends `previous` with only the
+    new rows when it holds the same query over a window that contains this
+    one, and the API has only appended rows since; otherwise downloads the
+    full window (through the result cache).
+    Returns (window, cached) where cached is True when nothing changed.
+    """
+    key = window_key(base, params)
+    from_ts, to_ts = params["from_ts"], params["to_ts"]
+    # The current generation comes with the response, so check the query first, then the data
+    if INCREMENTAL_REFRESH and previous is not None and previous.can_extend(key, from_ts, to_ts, previous.generation):
+        resp = client.get(f"{base}/readings.arrow", params={**params, **previous.after_params(LATE_SECONDS)})
+        resp.raise_for_status()
+        if previous.can_extend(key, from_ts, to_ts, resp.headers.get("X-Data-Generation")):
+            new_rows = _arrow_frame(resp)
+            if new_rows.empty and previous.covers(from_ts, to_ts):
+                return previous, True
+            return previous.extend(new_rows, from_ts, to_ts), False
+    frame, cached, generation = _get_frame(client, f"{base}/readings.arrow", params, _arrow_frame)
+    if cached and previous is not None and previous.frame is frame and previous.covers(from_ts, to_ts):
+        return previous, True
+    return ReadingsWindow.build(key, frame, from_ts, to_ts, generation), cached
+
+
+async def load_readings_window(base: str, params: dict, previous=None):
+    """refresh_readings_window on the shared client, in a worker thread."""
+    return await asyncio.to_thread(refresh_readings_window, get_api_client(), base, params, previous)
+
+
+async def load_summary(base: str, params: dict):
+    """fetch_summary_frame on the shared client, in a worker thread."""
+    return await asyncio.to_thread(fetch_summary_frame, get_api_client(), base, params)
+
+
+## 0.6 Live updates ###############################
+
+# One GET /live subscription per dashboard process (live_feed.py), started by
+# the first session. Each session applies pushed readings of the dataset it
+# shows to its own readings window, without asking the API again.
+# DASHBOARD_LIVE=0 turns the subscription off (refresh buttons only).
+LIVE_UPDATES = os.getenv("DASHBOARD_LIVE", "1") != "0"
+live_feed = LiveFeed()
+
+
+def live_rows_frame(rows: list, like: pd.DataFrame, location_ids=None) -> pd.DataFrame:
+    """Pushed /readings-shaped rows as a DataFrame with the columns and dtypes of `like` (an Arrow frame)."""
+    frame = pd.DataFrame(rows, columns=list(like.columns))
+    if location_ids:
+        frame = frame[frame["location_id"].isin(location_ids)]
+    frame["ts"] = pd.to_datetime(frame["ts"], utc=True)
+    return frame.astype(like.dtypes.to_dict())
+
+
+## 0.7 Plot time series ###############################
+
+# The plot draws GET /timeseries as served: one series per location, already
+# bucketed by the API (from its rollups) to at most one point per pixel of the
+# plot's width, so a window of months costs the same few hundred points per
+# line as a week, and nothing is grouped here. Widths are rounded up to
+# PLOT_WIDTH_STEP pixels so small resizes reuse the cached series.
+# DASHBOARD_PLOT_METHOD=lttb asks for LTTB-picked buckets instead of evenly
+# spaced ones (short spikes stay visible).
+PLOT_METHOD = os.getenv("DASHBOARD_PLOT_METHOD", "buckets")
+PLOT_WIDTH_STEP = 100
+PLOT_MAX_WIDTH = 4000  # the API's limit
+DEFAULT_PLOT_WIDTH = 800  # until the browser reports the plot's size
+PLOT_MARKER_MAX = 31  # draw point markers on series this short or shorter
+
+
+def timeseries_width(width) -> int:
+    """Points per series to ask for when the plot is `width` CSS pixels wide (None: not known yet)."""
+    width = width or DEFAULT_PLOT_WIDTH
+    return min(PLOT_MAX_WIDTH, math.ceil(width / PLOT_WIDTH_STEP) * PLOT_WIDTH_STEP)
+
+
+def step_label(seconds: int) -> str:
+    """Bucket width for the plot title, e.g. 15 min, 3 h, 1 day, 7 days."""
+    if seconds % 86400 == 0:
+        days = seconds // 86400
+        return "1 day" if days == 1 else f"{days} days"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} h"
+    return f"{seconds // 60} min"
+
+
+def _timeseries_frame(resp: httpx.Response) -> pd.DataFrame:
+    """One row per location: location_id, name, and its points as arrays (ts, avg_level)."""
+    body = resp.json()
+    frame = pd.DataFrame(
+        [
+            {
+                "location_id": series["location_id"],
+                "name": series["name"] or series["location_id"],
+                "ts": pd.to_datetime(series["ts"], utc=True),
+                "avg_level": pd.Series(series["avg_level"], dtype="float64").to_numpy(),
+            }
+            for series in body["series"]
+        ],
+        columns=["location_id", "name", "ts", "avg_level"],
+    )
+    frame.attrs.update(method=body["method"], step_seconds=body["step_seconds"])
+    return frame
+
+
+def fetch_timeseries_frame(client: httpx.Client, base: str, params: dict, width: int):
+    """Fetch /timeseries for a plot `width` pixels wide, through the result cache. Returns (frame, cached)."""
+    params = {**params, "width": width, "method": PLOT_METHOD}
+    return get_frame(client, f"{base}/timeseries", params, _timeseries_frame)
+
+
+async def load_timeseries(base: str, params: dict, width: int):
+    """fetch_timeseries_frame on the shared client, in a worker thread."""
+    return await asyncio.to_thread(fetch_timeseries_frame, get_api_client(), base, params, width)
+
+
+async def stream_ai_summary_text(base: str, params: dict):
+    """
+    Yield AI summary text from /ai-summary/stream as the model writes it.
+    The endpoint sends Server-Sent Events: `data` (summary table, first),
+    `token` (a piece of text), `done`, or `error`.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=60.0)) as client:
+            async with client.stream("POST", f"{base}/ai-summary/stream", params=params) as resp:
+                resp.raise_for_status()
+                event = None
+                async for line in resp.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[len("data:"):])
+                        if event == "token":
+                            yield data["text"]
+                        elif event == "error":
+                            yield f"Error: {data['error']}"
+    except Exception as exc:
+        yield f"Error requesting AI summary: {exc}"
+
+
 # 1. Server function #####################################
 
 
@@ -38,22 +308,28 @@ def server(input, output, session):
     # 1.1 Reactive state #################################
 
     readings_df = reactive.Value(pd.DataFrame())
+    readings_window = reactive.Value(None)  # ReadingsWindow behind readings_df, with daily aggregates
     summary_df = reactive.Value(pd.DataFrame())
+    timeseries_df = reactive.Value(pd.DataFrame())  # plot series from /timeseries, one row per location
     current_dataset = reactive.Value("dataset_a")
-    ai_summary_text_val = reactive.Value(
-        "Click 'Get AI summary' to request a narrative from OpenAI (for the current filters)."
-    )
+    live_status = reactive.Value(None)  # last live event applied in this session
+    ai_summary_stream = ui.MarkdownStream("ai_summary_stream")
     api_base = get_api_base()
+    # Params and start time of the last load (live events received before it
+    # are already in it), the plot width its series were fetched for, and
+    # whether the summary in flight was asked for by a live event (no toast)
+    last_load = {"params": None, "started_at": 0.0, "plot_width": None, "live_summary": False}
+    if LIVE_UPDATES:
+        live_feed.start(api_base.rstrip("/"))
 
     # 2. Populate location checkboxes from API ###########
 
     @reactive.Effect
     def _load_locations():
         try:
-            with httpx.Client(timeout=10.0) as client:
-                resp = client.get(f"{api_base.rstrip('/')}/locations")
-                resp.raise_for_status()
-                locations = resp.json()
+            resp = get_api_client().get(f"{api_base.rstrip('/')}/locations", timeout=10.0)
+            resp.raise_for_status()
+            locations = resp.json()
         except Exception:
             locations = []
         choices = {"all": "All locations"}
@@ -81,43 +357,96 @@ def server(input, output, session):
             params["location_id"] = [x for x in locs if x != "all"]
         return params
 
+    # Readings and summary load as two background tasks that run at the same
+    # time; each output updates as soon as its own result lands.
+    @reactive.extended_task
+    async def readings_task(base: str, params: dict, previous):
+        return await load_readings_window(base, params, previous)
+
+    @reactive.extended_task
+    async def summary_task(base: str, params: dict):
+        return await load_summary(base, params)
+
+    @reactive.extended_task
+    async def timeseries_task(base: str, params: dict, width: int):
+        return await load_timeseries(base, params, width)
+
+    def _plot_width() -> int:
+        return timeseries_width(session.clientdata.output_width("readings_plot"))
+
+    def _fetch_timeseries():
+        with reactive.isolate():
+            width = _plot_width()
+        last_load["plot_width"] = width
+        timeseries_task.cancel()
+        timeseries_task.invoke(api_base.rstrip("/"), last_load["params"], width)
+
     def _fetch_readings_and_summary(dataset: str):
         base = api_base.rstrip("/")
         params = _query_params(dataset)
-        try:
-            with httpx.Client(timeout=20.0) as client:
-                readings_resp = client.get(f"{base}/readings", params=params)
-                readings_resp.raise_for_status()
-                readings_json = readings_resp.json()
-
-                summary_resp = client.get(f"{base}/summary", params=params)
-                summary_resp.raise_for_status()
-                summary_json = summary_resp.json()
+        current_dataset.set(dataset)
+        last_load.update(params=params, started_at=time.monotonic(), live_summary=False)
+        with reactive.isolate():
+            previous = readings_window()
+        for task in (readings_task, summary_task):
+            task.cancel()  # a newer refresh replaces one still in flight
+        readings_task.invoke(base, params, previous)
+        summary_task.invoke(base, params)
+        _fetch_timeseries()
+
+    def _apply_result(task, target: reactive.Value):
+        if task.status() == "success":
+            frame, _ = task.result()
+            # Setting the same DataFrame object again (a 304) does not invalidate the outputs
+            target.set(frame)
+        elif task.status() == "error":
+            target.set(pd.DataFrame())
 
-            readings_df.set(pd.DataFrame(readings_json))
-            summary_df.set(pd.DataFrame(summary_json))
-            ui.notification_show("Data loaded from API.", type="message")
-        except Exception as exc:
+    @reactive.Effect
+    def _on_readings_loaded():
+        if readings_task.status() == "success":
+            window, _ = readings_task.result()
+            # An unchanged refresh returns the same window object: nothing redraws
+            readings_window.set(window)
+            readings_df.set(window.frame)
+        elif readings_task.status() == "error":
+            readings_window.set(None)
             readings_df.set(pd.DataFrame())
-            summary_df.set(pd.DataFrame())
-            ui.notification_show(f"Failed to load data from API: {exc}", type="error")
 
-    def _fetch_ai_summary():
-        base = api_base.rstrip("/")
-        params = _query_params(current_dataset())
-        try:
-            with httpx.Client(timeout=30.0) as client:
-                resp = client.post(f"{base}/ai-summary", params=params)
-                resp.raise_for_status()
-                data = resp.json()
-            if data.get("error"):
-                ai_summary_text_val.set(f"Error: {data['error']}")
-            else:
-                ai_summary_text_val.set(data.get("summary") or "No summary text returned.")
-            ui.notification_show("AI summary loaded from API.", type="message")
-        except Exception as exc:
-            ai_summary_text_val.set(f"Error requesting AI summary: {exc}")
-            ui.notification_show(f"AI summary request failed: {exc}", type="error")
+    @reactive.Effect
+    def _on_summary_loaded():
+        _apply_result(summary_task, summary_df)
+
+    @reactive.Effect
+    def _on_timeseries_loaded():
+        _apply_result(timeseries_task, timeseries_df)
+
+    @reactive.Effect
+    def _on_plot_resized():
+        # A different width may mean a different bucket size: ask the API again
+        width = _plot_width()
+        with reactive.isolate():
+            if last_load["params"] is not None and width != last_load["plot_width"]:
+                _fetch_timeseries()
+
+    @reactive.Effect
+    def _on_load_settled():
+        statuses = {readings_task.status(), summary_task.status()}
+        if statuses & {"running", "initial", "cancelled"}:
+            return
+        with reactive.isolate():
+            if last_load["live_summary"]:
+                last_load["live_summary"] = False
+                return
+            try:
+                (_, readings_cached), (_, summary_cached) = readings_task.result(), summary_task.result()
+            except Exception as exc:
+                ui.notification_show(f"Failed to load data from API: {exc}", type="error")
+                return
+        if readings_cached and summary_cached:
+            ui.notification_show("Data unchanged; reused the cached copy.", type="message")
+        else:
+            ui.notification_show("Data loaded from API.", type="message")
 
     # 4. Effects (load data) #############################
 
@@ -136,15 +465,46 @@ def server(input, output, session):
     def _on_refresh_c():
         _fetch_readings_and_summary("dataset_c")
 
+    @reactive.Effect
+    def _on_live_event():
+        # Depends on the shared value of the shown dataset only
+        event = live_feed.latest(current_dataset())()
+        if event is None or event["received_at"] < last_load["started_at"]:
+            return
+        with reactive.isolate():
+            if event["kind"] == "resync":
+                # The feed may have missed readings: catch up with one incremental refresh
+                _fetch_readings_and_summary(current_dataset())
+                return
+            window = readings_window()
+            if window is None:
+                return
+            new_rows = live_rows_frame(event["readings"], window.frame, last_load["params"].get("location_id"))
+            updated = window.extend(new_rows, window.from_ts, window.to_ts)
+            if updated is not window:
+                readings_window.set(updated)
+                readings_df.set(updated.frame)
+                # The API's buckets and summary already hold the pushed readings
+                # (its rollups are refreshed on insert)
+                _fetch_timeseries()
+                last_load["live_summary"] = True
+                summary_task.cancel()
+                summary_task.invoke(api_base.rstrip("/"), last_load["params"])
+            live_status.set(event)
+
     @reactive.Effect
     def _initial_load():
-        if readings_df().empty and summary_df().empty:
-            _fetch_readings_and_summary("dataset_a")
+        # Once per session; the results arrive through the tasks above
+        with reactive.isolate():
+            if readings_df().empty and summary_df().empty:
+                _fetch_readings_and_summary("dataset_a")
 
     @reactive.Effect
     @reactive.event(input.get_summary)
-    def _on_get_summary_click():
-        _fetch_ai_summary()
+    async def _on_get_summary_click():
+        # Read the filters here; the stream itself runs as a background task
+        params = _query_params(current_dataset())
+        await ai_summary_stream.stream(stream_ai_summary_text(api_base.rstrip("/"), params))
 
     # 5. Outputs #########################################
 
@@ -164,11 +524,10 @@ def server(input, output, session):
 
     @render.ui
     def value_box():
-        df = readings_df()
-        if df.empty or "congestion_level" not in df.columns:
-            val = "—"
-        else:
-            val = f"{df['congestion_level'].mean():.2f}"
+        # From the window's daily sums and counts, not a pass over every reading
+        window = readings_window()
+        mean = window.mean_level() if window is not None else None
+        val = "—" if mean is None else f"{mean:.2f}"
         label = _value_box_label()
         return ui.card(
             {"class": "value-box-card"},
@@ -178,6 +537,22 @@ def server(input, output, session):
             ),
         )
 
+    @render.ui
+    def live_status_text():
+        event = live_status()
+        if not LIVE_UPDATES:
+            return None
+        if event is None:
+            return ui.tags.p("Live updates: waiting for new readings.", class_="helper-text")
+        locations = event.get("locations") or []
+        n = sum(loc["n"] for loc in locations)
+        recent = sum(loc["avg_level"] * loc["n"] for loc in locations) / n if n else None
+        stamp = max((loc["last_ts"] for loc in locations), default="")[11:19]
+        text = f"Live: {len(event['readings'])} new readings for {event['dataset']} at {stamp} UTC"
+        if recent is not None:
+            text += f"; {event['window_seconds'] / 60:.0f}-minute average {recent:.2f}"
+        return ui.tags.p(text + ".", class_="helper-text")
+
     @render.data_frame
     def readings_table():
         df = readings_df()
@@ -185,39 +560,35 @@ def server(input, output, session):
             df = pd.DataFrame(
                 {"message": ["No readings. Click Refresh data to query the API."]}
             )
-        return render.DataGrid(df.head(100))
+        preview = df.head(100).copy()
+        # Arrow readings carry real timestamps; show them as ISO strings in the grid
+        if "ts" in preview.columns and pd.api.types.is_datetime64_any_dtype(preview["ts"]):
+            preview["ts"] = preview["ts"].map(lambda ts: ts.isoformat())
+        return render.DataGrid(preview)
 
     @render.plot
     def readings_plot():
         import matplotlib.pyplot as plt
 
-        df = readings_df()
-        if df.empty or "ts" not in df.columns:
+        # Series arrive bucketed to the plot's width by /timeseries: drawn as-is
+        series = timeseries_df()
+        if series.empty:
             fig, ax = plt.subplots(facecolor="#fff")
             ax.set_facecolor("#fff")
             ax.text(0.5, 0.5, "No data to plot.", ha="center", va="center", color="#5f6368")
             ax.axis("off")
             return fig
-        df = df.copy()
-        df["ts"] = pd.to_datetime(df["ts"], errors="coerce")
-        df["date"] = df["ts"].dt.date
-        if "location_name" in df.columns:
-            group_cols = ["location_name", "date"]
-        else:
-            group_cols = ["location_id", "date"]
-        grouped = (
-            df.groupby(group_cols)["congestion_level"]
-            .mean()
-            .reset_index()
-            .rename(columns={"congestion_level": "avg_level"})
-        )
         fig, ax = plt.subplots(facecolor="#fff")
         ax.set_facecolor("#fff")
-        for key, group in grouped.groupby(group_cols[0]):
-            ax.plot(group["date"], group["avg_level"], marker="o", label=str(key))
-        ax.set_xlabel("Date", color="#202124")
+        for row in series.itertuples(index=False):
+            marker = "o" if len(row.ts) <= PLOT_MARKER_MAX else None
+            ax.plot(row.ts, row.avg_level, marker=marker, label=str(row.name))
+        resolution = step_label(series.attrs["step_seconds"])
+        if series.attrs["method"] == "lttb":
+            resolution = f"LTTB over {resolution}"
+        ax.set_xlabel("Time (UTC)", color="#202124")
         ax.set_ylabel("Average congestion level", color="#202124")
-        ax.set_title("Daily average congestion by location", color="#202124")
+        ax.set_title(f"Average congestion by location ({resolution} buckets)", color="#202124")
         ax.legend(facecolor="#f8f9fa", edgecolor="#dadce0", labelcolor="#202124")
         ax.tick_params(colors="#5f6368")
         for spine in ax.spines.values():
@@ -241,7 +612,3 @@ def server(input, output, session):
         if "avg_level" in out.columns:
             out["avg_level"] = out["avg_level"].round(2)
         return render.DataGrid(out)
-
-    @render.text
-    def ai_summary_text():
-        return ai_summary_text_val()
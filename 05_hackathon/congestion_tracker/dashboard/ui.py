@@ -35,6 +35,8 @@ sidebar = ui.sidebar(
         "Click a Refresh Test button for Dataset A, B, or C, then Get AI summary.",
         class_="helper-text",
     ),
+    # New readings pushed by the API (server.py, live_feed.py)
+    ui.output_ui("live_status_text"),
     width=360,
 )
 
@@ -64,7 +66,7 @@ custom_styles = ui.tags.style(
         color: #202124;
     }
     .ai-summary-text { font-size: 1.25rem; min-height: 200px; }
-    .ai-summary-text pre, .ai-summary-text .shiny-text-output { font-size: inherit; color: #202124; }
+    .ai-summary-text pre, .ai-summary-text .shiny-text-output, .ai-summary-text shiny-markdown-stream { font-size: inherit; color: #202124; }
     .data-grid { background-color: #fff; color: #202124; }
     .data-grid table { color: #202124; }
     .data-grid th, .data-grid td { border-color: #dadce0; }
@@ -107,7 +109,7 @@ main_content = ui.div(
     ),
     ui.layout_columns(
         ui.card(
-            ui.card_header("Daily average congestion"),
+            ui.card_header("Average congestion over time"),
             ui.output_plot("readings_plot"),
         ),
         ui.card(
@@ -122,7 +124,13 @@ main_content = ui.div(
             {"class": "ai-summary-card"},
             ui.card_header("AI summary (OpenAI)"),
             ui.div(
-                ui.output_text_verbatim("ai_summary_text"),
+                # Filled in word by word from /ai-summary/stream (server.py)
+                ui.output_markdown_stream(
+                    "ai_summary_stream",
+                    content="Click 'Get AI summary' to request a narrative from OpenAI (for the current filters).",
+                    content_type="text",
+                    width="100%",
+                ),
                 class_="ai-summary-text",
             ),
         ),
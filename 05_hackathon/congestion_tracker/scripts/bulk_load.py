@@ -0,0 +1,301 @@
+# bulk_load.py
+# Bulk-load congestion readings into PostgreSQL with COPY
+# Pairs with generate_synthetic_data.py and supabase/schema.sql
+#
+# One INSERT per reading costs a network round trip and a statement parse per
+# row. COPY FROM STDIN streams rows in Postgres' CSV format over one statement,
+# which is orders of magnitude faster. For large loads the secondary indexes
+# are dropped first and rebuilt once at the end (one sort per index instead of
+# one B-tree update per row per index).
+#
+# Used by generate_synthetic_data.py, or on its own to load an existing CSV:
+#   python bulk_load.py ../data/congestion_readings.csv --truncate
+#
+# Students learn how to:
+# - Stream rows into Postgres with psycopg2's copy_expert
+# - Save, drop and rebuild indexes around a bulk load
+# - Create monthly partitions on demand before loading (partitioned schema)
+# - Measure load throughput (rows/sec)
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import argparse
+import io
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import psycopg2
+import psycopg2.extras
+import pyarrow as pa
+import pyarrow.compute  # noqa: F401  (pa.compute)
+import pyarrow.csv as pa_csv
+from dotenv import load_dotenv
+
+
+## 0.2 Settings ###############################
+
+READING_COLUMNS = ["location_id", "ts", "congestion_level", "delay_minutes", "dataset_label"]
+COPY_READINGS_SQL = (
+    f"COPY congestion_readings ({', '.join(READING_COLUMNS)}) FROM STDIN WITH (FORMAT csv, HEADER {{header}})"
+)
+
+# Loads at least this many rows drop and rebuild secondary indexes (override with --drop-indexes)
+DROP_INDEXES_MIN_ROWS = 1_000_000
+
+
+def connect():
+    """Open a connection from SUPABASE_DB_* (SUPABASE_DB_SSLMODE=disable for a local Postgres)."""
+    missing = [k for k in ["SUPABASE_DB_HOST", "SUPABASE_DB_USER", "SUPABASE_DB_PASSWORD"] if not os.getenv(k)]
+    if missing:
+        raise RuntimeError("Database credentials not set (missing: " + ", ".join(missing) + ").")
+    return psycopg2.connect(
+        host=os.getenv("SUPABASE_DB_HOST"),
+        port=int(os.getenv("SUPABASE_DB_PORT", "5432")),
+        dbname=os.getenv("SUPABASE_DB_NAME", "postgres"),
+        user=os.getenv("SUPABASE_DB_USER"),
+        password=os.getenv("SUPABASE_DB_PASSWORD"),
+        sslmode=os.getenv("SUPABASE_DB_SSLMODE", "require"),
+    )
+
+
+# 1. Secondary indexes #################################
+
+
+def secondary_indexes(cur, table: str = "congestion_readings") -> list:
+    """(name, CREATE INDEX statement) for every index that backs no constraint."""
+    cur.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(ix.indexrelid)
+        FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        WHERE ix.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)
+        ORDER BY i.relname
+        """,
+        (table,),
+    )
+    return cur.fetchall()
+
+
+def drop_indexes(cur, indexes: list) -> None:
+    for name, _ in indexes:
+        cur.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+def rebuild_indexes(cur, indexes: list) -> float:
+    """Recreate dropped indexes; returns seconds spent."""
+    start = time.perf_counter()
+    for name, definition in indexes:
+        # Indexes of a partitioned table read "ON ONLY parent"; rebuild them on every partition
+        cur.execute(definition.replace(" ON ONLY ", " ON ", 1))
+        print(f"  rebuilt {name}")
+    return time.perf_counter() - start
+
+
+# 2. Monthly partitions (supabase/schema_partitioned.sql) #################################
+
+
+def readings_partitioned(cur) -> bool:
+    """True when congestion_readings is the partitioned table of schema_partitioned.sql."""
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'congestion_readings'::regclass")
+    return cur.fetchone()[0]
+
+
+def ensure_partitions(cur, loaded_from, loaded_to) -> None:
+    """Create any missing monthly partitions for [loaded_from, loaded_to] (no-op on the plain schema)."""
+    if loaded_from is None or not readings_partitioned(cur):
+        return
+    cur.execute("SELECT ensure_congestion_partitions(%s, %s)", (loaded_from, loaded_to))
+    created = cur.fetchone()[0]
+    if created:
+        print(f"Created {created} monthly partition{'s' if created > 1 else ''} for {loaded_from} .. {loaded_to}")
+
+
+def csv_profile(path: Path):
+    """
+    (min ts, max ts, dataset labels) of a readings CSV, read with Arrow's
+    streaming reader (ts and dataset_label columns only).
+    """
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=1 << 24),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=["ts", "dataset_label"],
+            column_types={"ts": pa.timestamp("us"), "dataset_label": pa.string()},
+        ),
+    )
+    loaded_from = loaded_to = None
+    labels = set()
+    for batch in reader:
+        if batch.num_rows:
+            chunk_from, chunk_to = pa.compute.min_max(batch.column("ts")).values()
+            loaded_from = chunk_from.as_py() if loaded_from is None else min(loaded_from, chunk_from.as_py())
+            loaded_to = chunk_to.as_py() if loaded_to is None else max(loaded_to, chunk_to.as_py())
+            labels.update(pa.compute.unique(batch.column("dataset_label")).to_pylist())
+    return loaded_from, loaded_to, sorted(label or "default" for label in labels)
+
+
+# 3. COPY #################################
+
+
+def csv_ready(df):
+    """
+    Readings chunk with ts as ISO 8601 text (2026-03-01T08:15:00.123456, as the
+    readings CSV has always used). np.datetime_as_string formats the whole
+    column in C, much faster than to_csv(date_format=...) calling strftime per row.
+    """
+    return df.assign(ts=np.datetime_as_string(df["ts"].to_numpy(dtype="datetime64[us]"), unit="us"))
+
+
+def copy_locations(cur, locations_df) -> None:
+    """Insert the (small) locations table in one statement."""
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO locations (location_id, name, zone) VALUES %s",
+        list(locations_df[["location_id", "name", "zone"]].itertuples(index=False, name=None)),
+    )
+
+
+def copy_reading_chunks(cur, chunks) -> dict:
+    """
+    COPY each DataFrame chunk (READING_COLUMNS) into congestion_readings.
+    Each chunk is rendered to CSV in memory, so memory stays bounded by the
+    chunk size. Returns rows, seconds, and the min/max ts loaded.
+    """
+    sql = COPY_READINGS_SQL.format(header="false")
+    options = pa_csv.WriteOptions(include_header=False)
+    rows, start = 0, time.perf_counter()
+    loaded_from = loaded_to = None
+    for df in chunks:
+        # Arrow's C++ CSV writer renders a chunk ~3x faster than DataFrame.to_csv
+        buf = io.BytesIO()
+        pa_csv.write_csv(pa.Table.from_pandas(csv_ready(df[READING_COLUMNS]), preserve_index=False), buf, options)
+        buf.seek(0)
+        cur.copy_expert(sql, buf)
+        rows += len(df)
+        chunk_from, chunk_to = df["ts"].min(), df["ts"].max()
+        loaded_from = chunk_from if loaded_from is None else min(loaded_from, chunk_from)
+        loaded_to = chunk_to if loaded_to is None else max(loaded_to, chunk_to)
+    return {"rows": rows, "seconds": time.perf_counter() - start, "from": loaded_from, "to": loaded_to}
+
+
+def copy_csv_file(cur, path: Path) -> dict:
+    """Stream a readings CSV (with header, READING_COLUMNS) straight from disk into COPY."""
+    start = time.perf_counter()
+    with open(path, "r", newline="") as fh:
+        cur.copy_expert(COPY_READINGS_SQL.format(header="true"), fh, size=1 << 20)
+    return {"rows": cur.rowcount, "seconds": time.perf_counter() - start}
+
+
+def iter_parquet_chunks(path: Path, rows_per_chunk: int = 500_000):
+    """Read a readings Parquet file back as DataFrames of at most rows_per_chunk rows."""
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=rows_per_chunk):
+        yield batch.to_pandas()
+
+
+def load_readings(cur, load, expected_rows: int, drop: str = "auto") -> dict:
+    """
+    Run load(cur) -> stats dict, dropping secondary indexes first when drop is
+    "always", or "auto" and expected_rows >= DROP_INDEXES_MIN_ROWS. Indexes are
+    rebuilt (and the table analyzed) before returning. Prints rows/sec.
+    """
+    indexes = []
+    if drop == "always" or (drop == "auto" and expected_rows >= DROP_INDEXES_MIN_ROWS):
+        indexes = secondary_indexes(cur)
+        drop_indexes(cur, indexes)
+        print(f"Dropped {len(indexes)} secondary indexes for the load.")
+
+    stats = load(cur)
+    print(f"Loaded {stats['rows']:,} readings in {stats['seconds']:.1f} s ({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} rows/s)")
+
+    if indexes:
+        stats["index_seconds"] = rebuild_indexes(cur, indexes)
+        print(f"Rebuilt {len(indexes)} indexes in {stats['index_seconds']:.1f} s")
+    cur.execute("ANALYZE congestion_readings")
+    total = stats["seconds"] + stats.get("index_seconds", 0.0)
+    print(f"Total {total:.1f} s ({stats['rows'] / max(total, 1e-9):,.0f} rows/s including index builds)")
+    return stats
+
+
+def refresh_rollups(cur, loaded_from, loaded_to) -> None:
+    """
+    Rebuild the hourly/daily rollups (supabase/rollups.sql) for the loaded time
+    range, if installed. None for both rebuilds every bucket.
+    """
+    cur.execute("SELECT to_regclass('congestion_rollup_hourly') IS NOT NULL")
+    if cur.fetchone()[0]:
+        cur.execute("SELECT refresh_congestion_rollups(%s, %s)", (loaded_from, loaded_to))
+        span = "all time" if loaded_from is None and loaded_to is None else f"{loaded_from} .. {loaded_to}"
+        print(f"Refreshed congestion rollups for {span}")
+    else:
+        print("Rollup tables not found; run supabase/rollups.sql to enable fast summaries.")
+
+
+def bump_data_versions(cur, labels=None, replaced: bool = False) -> None:
+    """
+    Bump the data version of each dataset label (every known label when None)
+    so the API's ETags change and clients refetch (supabase/data_versions.sql, if installed).
+    replaced=True when readings were deleted or rewritten, so clients holding
+    rows reload them instead of fetching only the new ones.
+    """
+    cur.execute("SELECT to_regclass('congestion_data_versions') IS NOT NULL")
+    if cur.fetchone()[0]:
+        cur.execute(
+            "SELECT bump_congestion_data_versions(%s, %s)",
+            (list(labels) if labels is not None else None, replaced),
+        )
+        print(f"Bumped data versions for {', '.join(labels) if labels is not None else 'every dataset'}")
+
+
+# 4. Command line: load an existing CSV #################################
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY a congestion_readings CSV into Postgres.")
+    parser.add_argument("csv", type=Path, help="CSV with columns " + ",".join(READING_COLUMNS))
+    parser.add_argument("--truncate", action="store_true", help="Empty congestion_readings first")
+    parser.add_argument(
+        "--drop-indexes",
+        choices=["auto", "always", "never"],
+        default="auto",
+        help=f"Drop/rebuild secondary indexes (auto: files of {DROP_INDEXES_MIN_ROWS:,}+ rows)",
+    )
+    args = parser.parse_args()
+
+    root_env = Path(__file__).resolve().parents[3] / ".env"
+    if root_env.exists():
+        load_dotenv(root_env)
+
+    # Estimate rows from the file size (~60 bytes per CSV row) for the auto index decision
+    expected_rows = args.csv.stat().st_size // 60
+    # The file's time range sizes the partitions up front and the rollup refresh after
+    loaded_from, loaded_to, labels = csv_profile(args.csv)
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            if args.truncate:
+                cur.execute("TRUNCATE congestion_readings")
+            ensure_partitions(cur, loaded_from, loaded_to)
+            load_readings(cur, lambda c: copy_csv_file(c, args.csv), expected_rows, args.drop_indexes)
+            if args.truncate:
+                # TRUNCATE does not reach the rollups: rebuild them all, or buckets
+                # outside the new file would keep summarizing deleted readings
+                refresh_rollups(cur, None, None)
+            else:
+                refresh_rollups(cur, loaded_from, loaded_to)
+            if args.truncate:
+                bump_data_versions(cur, replaced=True)
+            bump_data_versions(cur, labels)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,13 @@
 #
 # This script:
 # - Creates 3 labeled test datasets (Dataset A, B, C) with different seeds and time ranges
+# - Builds readings with vectorized NumPy, one block of arrays per location
+# - Streams readings to CSV or Parquet in chunks (--rows-per-chunk) to bound memory
+# - Generates datasets (and location shards) in parallel worker processes (--workers)
 # - Writes CSVs to ../data/ per dataset
-# - Optionally loads all datasets into Supabase PostgreSQL using psycopg2
+# - Optionally loads all datasets into Supabase PostgreSQL with COPY (bulk_load.py)
+# - Refreshes the hourly/daily rollup tables used by /summary (supabase/rollups.sql)
+# - Tells a running API (CONGESTION_API_URL) to refresh its cached locations table
 #
 # Students learn how to:
 # - Use pandas and numpy to generate synthetic time series data
@@ -16,15 +21,35 @@
 
 ## 0.1 Load packages ############################
 
+import argparse
 import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import httpx
 import numpy as np
 import pandas as pd
 import psycopg2
 from dotenv import load_dotenv
 
+from bulk_load import (
+    READING_COLUMNS,
+    bump_data_versions,
+    copy_csv_file,
+    copy_locations,
+    copy_reading_chunks,
+    csv_ready,
+    ensure_partitions,
+    iter_parquet_chunks,
+    load_readings,
+    readings_partitioned,
+    refresh_rollups,
+)
+
 
 ## 0.2 Environment ###############################
 
@@ -89,125 +114,407 @@ DATASET_CONFIGS = [
 ]
 
 
-def generate_readings_for_dataset(locations_df: pd.DataFrame, label: str, seed: int, n_days: int) -> pd.DataFrame:
-    """Generate congestion readings for one test dataset."""
-    interval_mins = 15
-    n_per_day = int(24 * 60 / interval_mins)
+INTERVAL_MINS = 15
+
+# Rush hours (inclusive), as minutes after midnight UTC: 07:00–09:00 and 16:00–18:00
+RUSH_WINDOWS = [(7 * 60, 9 * 60), (16 * 60, 18 * 60)]
+
+
+def location_streams(seed: int, n_locations: int) -> list:
+    """
+    Independent random streams per location, derived from the dataset seed:
+    one for congestion noise, one for delay. Each location's readings depend
+    only on (seed, location index), never on how the work is split up.
+    """
+    children = np.random.SeedSequence(seed).spawn(n_locations)
+    return [tuple(np.random.default_rng(s) for s in child.spawn(2)) for child in children]
+
+
+def reading_arrays(base_ts: np.datetime64, start: int, n: int, level_rng, delay_rng):
+    """
+    Readings start .. start+n-1 of one location as NumPy arrays (ts, level, delay).
+    Same model as the original per-reading loop: level = round(1 + 1.5*rush + N(0, 0.6))
+    clipped to 1–4, delay = level * (2 + U(0, 3)) rounded to 2 decimals.
+    """
+    ts = base_ts + np.arange(start, start + n, dtype=np.int64) * np.timedelta64(INTERVAL_MINS, "m")
+    minute_of_day = (ts - ts.astype("datetime64[D]")) // np.timedelta64(1, "m")
+    rush = np.zeros(n, dtype=bool)
+    for lo, hi in RUSH_WINDOWS:
+        rush |= (minute_of_day >= lo) & (minute_of_day <= hi)
+    level_raw = 1 + rush * 1.5 + level_rng.normal(0, 0.6, n)
+    level = np.clip(np.rint(level_raw), 1, 4).astype(np.int16)
+    delay = np.round(level * (2 + delay_rng.uniform(0, 3, n)), 2)
+    return ts, level, delay
+
+
+def dataset_base_ts(n_days: int, end_ts: datetime = None) -> np.datetime64:
+    """First timestamp of a dataset: n_days before end_ts (default: now, UTC)."""
+    end_ts = end_ts or datetime.utcnow()
+    return np.datetime64(end_ts - timedelta(days=n_days), "us")
+
+
+def generate_readings_for_dataset(
+    locations_df: pd.DataFrame, label: str, seed: int, n_days: int, end_ts: datetime = None
+) -> pd.DataFrame:
+    """
+    Generate congestion readings for one test dataset, one NumPy block per location.
+    Output is fixed by (seed, n_days, end_ts); pass end_ts for a reproducible time axis.
+    """
+    n_per_day = int(24 * 60 / INTERVAL_MINS)
     n_readings_per_location = n_days * n_per_day
+    n_locations = len(locations_df)
+    n_total = n_locations * n_readings_per_location
+    base_ts = dataset_base_ts(n_days, end_ts)
+
+    # Fill preallocated columns in place (no per-row objects, no concat)
+    ts = np.empty(n_total, dtype="datetime64[us]")
+    level = np.empty(n_total, dtype=np.int16)
+    delay = np.empty(n_total, dtype=np.float64)
+    for i, (level_rng, delay_rng) in enumerate(location_streams(seed, n_locations)):
+        block = slice(i * n_readings_per_location, (i + 1) * n_readings_per_location)
+        ts[block], level[block], delay[block] = reading_arrays(
+            base_ts, 0, n_readings_per_location, level_rng, delay_rng
+        )
+
+    # Repeated strings are stored as categoricals: one small code per row
+    code_dtype = np.int16 if n_locations < 2**15 else np.int32
+    location_codes = np.repeat(np.arange(n_locations, dtype=code_dtype), n_readings_per_location)
+    # copy=False: the columns above become the frame's columns without another copy
+    return pd.DataFrame(
+        {
+            "location_id": pd.Categorical.from_codes(location_codes, categories=locations_df["location_id"]),
+            "ts": ts,
+            "congestion_level": level,
+            "delay_minutes": delay,
+            "dataset_label": pd.Categorical.from_codes(np.zeros(n_total, dtype=np.int8), categories=[label]),
+        },
+        copy=False,
+    )
+
 
-    np.random.seed(seed)
-    now = datetime.utcnow()
-    base_ts = now - timedelta(days=n_days)
-
-    records = []
-    for _, loc in locations_df.iterrows():
-        for i in range(n_readings_per_location):
-            ts = base_ts + timedelta(minutes=i * interval_mins)
-            hour = ts.hour + ts.minute / 60.0
-            rush = 1 if (7 <= hour <= 9) or (16 <= hour <= 18) else 0
-            level_raw = 1 + rush * 1.5 + np.random.normal(0, 0.6)
-            congestion_level = int(np.clip(round(level_raw), 1, 4))
-            delay_minutes = round(congestion_level * (2 + np.random.uniform(0, 3)), 2)
-            records.append(
+# 2.1 Chunked generation (bounded memory) ####################
+
+
+def iter_reading_chunks(
+    locations_df: pd.DataFrame,
+    label: str,
+    seed: int,
+    n_days: int,
+    rows_per_chunk: int,
+    end_ts: datetime = None,
+    location_indices=None,
+):
+    """
+    Yield the same readings as generate_readings_for_dataset as DataFrames of at
+    most rows_per_chunk rows: one location at a time, cut into time slices.
+    Each location draws from its own random streams in time order, so the
+    values do not depend on rows_per_chunk. location_indices limits the output
+    to those rows of locations_df (a shard) without changing their values.
+    """
+    n_readings_per_location = n_days * int(24 * 60 / INTERVAL_MINS)
+    base_ts = dataset_base_ts(n_days, end_ts)
+    categories = locations_df["location_id"]
+    streams = location_streams(seed, len(locations_df))
+    if location_indices is None:
+        location_indices = range(len(locations_df))
+    for code in location_indices:
+        level_rng, delay_rng = streams[code]
+        for start in range(0, n_readings_per_location, rows_per_chunk):
+            n = min(rows_per_chunk, n_readings_per_location - start)
+            ts, level, delay = reading_arrays(base_ts, start, n, level_rng, delay_rng)
+            yield pd.DataFrame(
                 {
-                    "location_id": loc["location_id"],
-                    "ts": ts.isoformat(),
-                    "congestion_level": congestion_level,
-                    "delay_minutes": delay_minutes,
-                    "dataset_label": label,
-                }
+                    "location_id": pd.Categorical.from_codes(np.full(n, code, dtype=np.int32), categories=categories),
+                    "ts": ts,
+                    "congestion_level": level,
+                    "delay_minutes": delay,
+                    "dataset_label": pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[label]),
+                },
+                copy=False,
+            )
+
+
+class ChunkWriter:
+    """Append reading chunks to one CSV or Parquet file as they are generated."""
+
+    def __init__(self, path: Path, fmt: str, header: bool = True):
+        self.path = path
+        self.fmt = fmt
+        self.header = header
+        self.rows = 0
+        self._parquet = None
+        if path.exists():
+            path.unlink()
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.fmt == "parquet":
+            # Optional dependency: only needed for --format parquet
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # Plain strings, so every chunk has the same schema whatever its categories
+            table = pa.Table.from_pandas(
+                chunk.astype({"location_id": str, "dataset_label": str}), preserve_index=False
             )
-    return pd.DataFrame.from_records(records)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._parquet.write_table(table)
+        else:
+            csv_ready(chunk).to_csv(self.path, mode="a", header=self.header and self.rows == 0, index=False)
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+# 2.2 Parallel generation (process pool) ####################
+
+
+def shard_locations(n_locations: int, n_shards: int) -> list:
+    """Split location indices 0..n_locations-1 into up to n_shards contiguous ranges."""
+    n_shards = max(1, min(n_shards, n_locations))
+    bounds = np.linspace(0, n_locations, n_shards + 1).astype(int)
+    return [range(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def generate_part(task: dict) -> dict:
+    """
+    Worker: generate one (dataset, location shard) task into its own part file.
+    Values come from the per-location streams of the dataset seed, so the
+    parts are identical whichever process (or how many) produced them.
+    """
+    writer = ChunkWriter(Path(task["path"]), task["format"], header=False)
+    try:
+        for chunk in iter_reading_chunks(
+            locations,
+            label=task["label"],
+            seed=task["seed"],
+            n_days=task["n_days"],
+            rows_per_chunk=task["rows_per_chunk"],
+            end_ts=task["end_ts"],
+            location_indices=task["locations"],
+        ):
+            writer.write(chunk)
+    finally:
+        writer.close()
+    return {"label": task["label"], "path": task["path"], "rows": writer.rows}
+
+
+def run_tasks(tasks: list, workers: int) -> list:
+    """Run generate_part over tasks, in a process pool when workers > 1. Results keep task order."""
+    if workers <= 1 or len(tasks) <= 1:
+        return [generate_part(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(generate_part, tasks))
+
 
+def merge_parts(part_paths: list, path: Path, fmt: str) -> None:
+    """Concatenate part files, in order, into one CSV (one header) or Parquet file."""
+    if path.exists():
+        path.unlink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
 
-# 3. Generate all 3 datasets and write one combined CSV ########
+        writer = None
+        try:
+            for part in part_paths:
+                part_file = pq.ParquetFile(part)
+                writer = writer or pq.ParquetWriter(path, part_file.schema_arrow, compression="zstd")
+                for i in range(part_file.num_row_groups):
+                    writer.write_table(part_file.read_row_group(i))
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, "wb") as out:
+            out.write((",".join(READING_COLUMNS) + "\n").encode())
+            for part in part_paths:
+                with open(part, "rb") as fh:
+                    shutil.copyfileobj(fh, out, 1 << 20)
 
-data_dir = Path(__file__).resolve().parents[1] / "data"
-data_dir.mkdir(parents=True, exist_ok=True)
 
-# Shared locations (no dataset_label)
-locations_path = data_dir / "locations.csv"
-locations.to_csv(locations_path, index=False)
-print(f"Wrote {locations_path}")
+def peak_memory_mb() -> float:
+    """High-water mark of resident memory (MB) of any one process of this run, or None if unavailable."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # Largest of this process and any pool worker; Linux reports kilobytes, macOS bytes
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
 
-all_readings = []
-for cfg in DATASET_CONFIGS:
-    df = generate_readings_for_dataset(
-        locations,
-        label=cfg["label"],
-        seed=cfg["seed"],
-        n_days=cfg["n_days"],
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic congestion datasets A, B, C (and optionally load them).")
+    parser.add_argument(
+        "--rows-per-chunk",
+        type=int,
+        default=500_000,
+        help="Readings generated and written per block; bounds peak memory (default: 500000)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Readings output file: data/congestion_readings.csv or .parquet (default: csv)",
+    )
+    parser.add_argument(
+        "--end-ts",
+        type=datetime.fromisoformat,
+        default=None,
+        help="Last reading time (UTC, ISO 8601) for reproducible output (default: now)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes generating datasets/shards in parallel (default: CPU count; 1 = no pool)",
     )
-    all_readings.append(df)
-    print(f"Generated {cfg['name']}: {cfg['n_days']} days, seed {cfg['seed']}")
+    parser.add_argument(
+        "--location-shards",
+        type=int,
+        default=1,
+        help="Split each dataset's locations into this many tasks (default: 1 task per dataset)",
+    )
+    parser.add_argument(
+        "--drop-indexes",
+        choices=["auto", "always", "never"],
+        default="auto",
+        help="Drop secondary indexes during the database load and rebuild them after (auto: 1M+ rows)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rows_per_chunk = max(1, args.rows_per_chunk)
 
-# Single CSV with all 3 datasets (dataset_label column identifies A, B, C)
-readings_combined = pd.concat(all_readings, ignore_index=True)
-readings_path = data_dir / "congestion_readings.csv"
-readings_combined.to_csv(readings_path, index=False)
-print(f"Wrote {readings_path} (Datasets A, B, C combined; {len(readings_combined)} rows)")
+    # 3. Generate all 3 datasets and write one combined file ########
 
+    data_dir = Path(__file__).resolve().parents[1] / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
 
-# 4. Optional: load into Supabase #############################
+    # Shared locations (no dataset_label)
+    locations_path = data_dir / "locations.csv"
+    locations.to_csv(locations_path, index=False)
+    print(f"Wrote {locations_path}")
 
-db_host = os.getenv("SUPABASE_DB_HOST")
-db_name = os.getenv("SUPABASE_DB_NAME", "postgres")
-db_user = os.getenv("SUPABASE_DB_USER")
-db_pass = os.getenv("SUPABASE_DB_PASSWORD")
-db_port = int(os.getenv("SUPABASE_DB_PORT", "5432"))
+    # One shared end time for every dataset and worker
+    end_ts = args.end_ts or datetime.utcnow()
 
-missing = [k for k, v in [("SUPABASE_DB_HOST", db_host), ("SUPABASE_DB_USER", db_user), ("SUPABASE_DB_PASSWORD", db_pass)] if not v]
-if missing:
+    # One task per dataset (and per location shard), each written to its own part
+    # file by a pool worker, then merged in task order. The merged file is the
+    # same for any --workers / --location-shards setting.
+    readings_path = data_dir / f"congestion_readings.{args.format}"
+    with tempfile.TemporaryDirectory(dir=data_dir, prefix=".parts_") as parts_dir:
+        tasks = [
+            {
+                "label": cfg["label"],
+                "seed": cfg["seed"],
+                "n_days": cfg["n_days"],
+                "locations": shard,
+                "rows_per_chunk": rows_per_chunk,
+                "end_ts": end_ts,
+                "format": args.format,
+                "path": str(Path(parts_dir) / f"{cfg['label']}_{k:04d}.{args.format}"),
+            }
+            for cfg in DATASET_CONFIGS
+            for k, shard in enumerate(shard_locations(len(locations), args.location_shards))
+        ]
+        workers = max(1, min(args.workers, len(tasks)))
+        results = run_tasks(tasks, workers)
+        for cfg in DATASET_CONFIGS:
+            n_rows = sum(r["rows"] for r in results if r["label"] == cfg["label"])
+            print(f"Generated {cfg['name']}: {cfg['n_days']} days, seed {cfg['seed']} ({n_rows} rows)")
+        merge_parts([r["path"] for r in results], readings_path, args.format)
+    total_rows = sum(r["rows"] for r in results)
     print(
-        "Supabase credentials not set (missing: " + ", ".join(missing) + "). "
-        "CSV files written; set these in .env and re-run to push to Supabase."
+        f"Wrote {readings_path} (Datasets A, B, C combined; {total_rows} rows; "
+        f"{len(tasks)} tasks on {workers} worker{'s' if workers > 1 else ''})"
     )
-else:
-    try:
-        conn = psycopg2.connect(
-            host=db_host,
-            port=db_port,
-            dbname=db_name,
-            user=db_user,
-            password=db_pass,
-            sslmode="require",
+
+    # 4. Optional: load into Supabase #############################
+
+    db_host = os.getenv("SUPABASE_DB_HOST")
+    db_name = os.getenv("SUPABASE_DB_NAME", "postgres")
+    db_user = os.getenv("SUPABASE_DB_USER")
+    db_pass = os.getenv("SUPABASE_DB_PASSWORD")
+    db_port = int(os.getenv("SUPABASE_DB_PORT", "5432"))
+
+    missing = [k for k, v in [("SUPABASE_DB_HOST", db_host), ("SUPABASE_DB_USER", db_user), ("SUPABASE_DB_PASSWORD", db_pass)] if not v]
+    if missing:
+        print(
+            "Supabase credentials not set (missing: " + ", ".join(missing) + "). "
+            "CSV files written; set these in .env and re-run to push to Supabase."
         )
+    else:
         try:
-            with conn.cursor() as cur:
-                # Ensure dataset_label column exists (for existing DBs created before this feature)
-                cur.execute(
-                    "ALTER TABLE congestion_readings ADD COLUMN IF NOT EXISTS dataset_label TEXT DEFAULT 'default'"
-                )
-                cur.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_readings_dataset ON congestion_readings(dataset_label)"
-                )
-                cur.execute("TRUNCATE congestion_readings CASCADE")
-                cur.execute("DELETE FROM locations")
-                for _, row in locations.iterrows():
+            conn = psycopg2.connect(
+                host=db_host,
+                port=db_port,
+                dbname=db_name,
+                user=db_user,
+                password=db_pass,
+                sslmode=os.getenv("SUPABASE_DB_SSLMODE", "require"),
+            )
+            try:
+                with conn.cursor() as cur:
+                    # Ensure dataset_label column exists (for existing DBs created before this feature)
                     cur.execute(
-                        """
-                        INSERT INTO locations (location_id, name, zone)
-                        VALUES (%s, %s, %s)
-                        """,
-                        (row["location_id"], row["name"], row["zone"]),
+                        "ALTER TABLE congestion_readings ADD COLUMN IF NOT EXISTS dataset_label TEXT DEFAULT 'default'"
                     )
-                for df in all_readings:
-                    reading_rows = list(
-                        df[["location_id", "ts", "congestion_level", "delay_minutes", "dataset_label"]].itertuples(
-                            index=False, name=None
+                    # (the partitioned schema covers dataset_label with its composite index)
+                    if not readings_partitioned(cur):
+                        cur.execute(
+                            "CREATE INDEX IF NOT EXISTS idx_readings_dataset ON congestion_readings(dataset_label)"
                         )
-                    )
-                    cur.executemany(
-                        """
-                        INSERT INTO congestion_readings (location_id, ts, congestion_level, delay_minutes, dataset_label)
-                        VALUES (%s, %s, %s, %s, %s)
-                        """,
-                        reading_rows,
-                    )
-            conn.commit()
-            print("Loaded locations and all 3 test datasets (dataset_a, dataset_b, dataset_c) into Supabase.")
-        finally:
-            conn.close()
-    except Exception as e:
-        print(f"Failed to push to Supabase: {e}")
-        raise
+                    cur.execute("TRUNCATE congestion_readings CASCADE")
+                    cur.execute("DELETE FROM locations")
+                    copy_locations(cur, locations)
+                    loaded_from = min(pd.Timestamp(dataset_base_ts(cfg["n_days"], end_ts)) for cfg in DATASET_CONFIGS)
+                    ensure_partitions(cur, loaded_from, end_ts)
+                    # COPY the merged file written above; big loads drop/rebuild secondary indexes
+                    if args.format == "csv":
+                        load = lambda c: copy_csv_file(c, readings_path)  # noqa: E731
+                    else:
+                        load = lambda c: copy_reading_chunks(c, iter_parquet_chunks(readings_path))  # noqa: E731
+                    load_readings(cur, load, total_rows, args.drop_indexes)
+                    refresh_rollups(cur, loaded_from, end_ts)
+                    # Everything was truncated; new ETags for every dataset the API has served
+                    bump_data_versions(cur, replaced=True)
+                    bump_data_versions(cur, [cfg["label"] for cfg in DATASET_CONFIGS], replaced=True)
+                conn.commit()
+                print("Loaded locations and all 3 test datasets (dataset_a, dataset_b, dataset_c) into Supabase.")
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Failed to push to Supabase: {e}")
+            raise
+
+        # The API caches the locations table in memory; ask it to reload (best effort,
+        # the cache also expires on its own after LOCATIONS_CACHE_TTL seconds)
+        api_url = os.getenv("CONGESTION_API_URL")
+        admin_token = os.getenv("API_ADMIN_TOKEN")
+        if api_url and admin_token:
+            try:
+                resp = httpx.post(
+                    f"{api_url.rstrip('/')}/cache/locations/invalidate",
+                    headers={"Authorization": f"Bearer {admin_token}"},
+                    timeout=5.0,
+                )
+                resp.raise_for_status()
+                print(f"Invalidated the API locations cache at {api_url}.")
+            except httpx.HTTPError as exc:
+                print(f"Could not invalidate the API locations cache at {api_url}: {exc}")
+
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"Peak memory (max RSS): {peak:.0f} MB with --rows-per-chunk {rows_per_chunk}")
+
+
+if __name__ == "__main__":
+    main()
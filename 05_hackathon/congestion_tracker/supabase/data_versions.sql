@@ -0,0 +1,54 @@
+-- City Congestion Tracker — per-dataset data versions for HTTP caching
+-- Run this in Supabase SQL Editor after schema.sql (safe to re-run).
+--
+-- The API tags /readings and /summary responses with an ETag built from the
+-- version of the requested dataset_label, and answers 304 Not Modified while
+-- it is unchanged. The loader bumps a label's version in the same transaction
+-- that changes its readings. Without this table the API falls back to
+-- max(id) per dataset (which misses deletes and in-place updates).
+--
+-- replaced_version is the version of the last load that deleted or rewrote
+-- readings (TRUNCATE + reload); later versions only appended rows. The API
+-- sends it as X-Data-Generation, so a client holding rows can tell whether it
+-- may just fetch the new ones or has to reload.
+
+CREATE TABLE IF NOT EXISTS congestion_data_versions (
+  dataset_label   TEXT PRIMARY KEY,
+  version         BIGINT NOT NULL DEFAULT 1,
+  replaced_version BIGINT NOT NULL DEFAULT 1,
+  updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Tables created before replaced_version existed
+ALTER TABLE congestion_data_versions ADD COLUMN IF NOT EXISTS replaced_version BIGINT NOT NULL DEFAULT 1;
+
+-- Bump the version of each label in p_labels (adding new labels at 1).
+-- Pass NULL to bump every known label, e.g. after TRUNCATE congestion_readings.
+-- p_replaced marks a load that deleted or rewrote readings, not just appended.
+DROP FUNCTION IF EXISTS bump_congestion_data_versions(TEXT[]);
+CREATE OR REPLACE FUNCTION bump_congestion_data_versions(p_labels TEXT[], p_replaced BOOLEAN DEFAULT FALSE)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF p_labels IS NULL THEN
+    UPDATE congestion_data_versions
+    SET version = version + 1,
+        replaced_version = CASE WHEN p_replaced THEN version + 1 ELSE replaced_version END,
+        updated_at = NOW();
+  ELSE
+    INSERT INTO congestion_data_versions AS v (dataset_label)
+    SELECT DISTINCT unnest(p_labels)
+    ON CONFLICT (dataset_label) DO UPDATE
+    SET version = v.version + 1,
+        replaced_version = CASE WHEN p_replaced THEN v.version + 1 ELSE v.replaced_version END,
+        updated_at = NOW();
+  END IF;
+END;
+$$;
+
+-- Register the labels already loaded (existing versions are left as they are).
+-- A label without a row gets max(id) ETags from the API until its first bump.
+INSERT INTO congestion_data_versions (dataset_label)
+SELECT DISTINCT COALESCE(dataset_label, 'default') FROM congestion_readings
+ON CONFLICT (dataset_label) DO NOTHING;
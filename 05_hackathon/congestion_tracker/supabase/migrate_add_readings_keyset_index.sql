@@ -0,0 +1,2 @@
+-- Run this on an existing database to support keyset pagination on /readings (ORDER BY ts, id).
+CREATE INDEX IF NOT EXISTS idx_readings_ts_id ON congestion_readings(ts, id);
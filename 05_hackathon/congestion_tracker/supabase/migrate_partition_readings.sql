@@ -0,0 +1,77 @@
+-- Run this on an existing database to convert congestion_readings (schema.sql)
+-- into the monthly-partitioned layout of schema_partitioned.sql.
+-- Runs in one transaction: rows, ids and the id sequence are kept. The table is
+-- locked while the rows are copied, so run it outside busy hours.
+
+BEGIN;
+
+-- 1. Move the old table (and the names it owns) out of the way
+ALTER TABLE congestion_readings RENAME TO congestion_readings_old;
+ALTER INDEX congestion_readings_pkey RENAME TO congestion_readings_old_pkey;
+ALTER SEQUENCE congestion_readings_id_seq RENAME TO congestion_readings_old_id_seq;
+
+-- 2. New partitioned table (same columns as schema_partitioned.sql)
+CREATE TABLE congestion_readings (
+  id              BIGSERIAL,
+  location_id     TEXT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+  ts              TIMESTAMPTZ NOT NULL,
+  congestion_level INTEGER NOT NULL CHECK (congestion_level BETWEEN 1 AND 4),
+  delay_minutes   NUMERIC(5,2),
+  dataset_label   TEXT DEFAULT 'default',
+  created_at      TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+CREATE OR REPLACE FUNCTION ensure_congestion_partitions(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  m_start TIMESTAMPTZ := date_trunc('month', p_from, 'UTC');
+  m_end   TIMESTAMPTZ;
+  part    TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE m_start <= p_to LOOP
+    m_end := (m_start AT TIME ZONE 'UTC' + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    part := 'congestion_readings_' || to_char(m_start AT TIME ZONE 'UTC', '"y"YYYY"m"MM');
+    IF to_regclass(part) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF congestion_readings FOR VALUES FROM (%L) TO (%L)',
+        part, m_start, m_end
+      );
+      created := created + 1;
+    END IF;
+    m_start := m_end;
+  END LOOP;
+  RETURN created;
+END;
+$$;
+
+-- 3. Partitions for the existing rows plus the next three months, then copy them over
+SELECT ensure_congestion_partitions(
+  COALESCE((SELECT min(ts) FROM congestion_readings_old), NOW()),
+  GREATEST((SELECT max(ts) FROM congestion_readings_old), NOW() + INTERVAL '3 months')
+);
+
+INSERT INTO congestion_readings (id, location_id, ts, congestion_level, delay_minutes, dataset_label, created_at)
+SELECT id, location_id, ts, congestion_level, delay_minutes, dataset_label, created_at
+FROM congestion_readings_old
+ORDER BY ts;
+
+SELECT setval(
+  'congestion_readings_id_seq',
+  COALESCE((SELECT max(id) FROM congestion_readings), 0) + 1,
+  false
+);
+
+-- 4. Drop the old table (and its four single-column B-trees); index the new one once, after the copy
+DROP TABLE congestion_readings_old;
+
+CREATE INDEX IF NOT EXISTS idx_readings_ts_brin ON congestion_readings USING BRIN (ts);
+CREATE INDEX IF NOT EXISTS idx_readings_dataset_location_ts ON congestion_readings(dataset_label, location_id, ts);
+CREATE INDEX IF NOT EXISTS idx_readings_ts_id ON congestion_readings(ts, id);
+
+COMMIT;
+
+ANALYZE congestion_readings;
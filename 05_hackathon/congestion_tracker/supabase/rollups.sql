@@ -0,0 +1,103 @@
+-- City Congestion Tracker — hourly and daily rollups of congestion_readings
+-- Run this in Supabase SQL Editor after schema.sql (safe to re-run).
+--
+-- /summary and /ai-summary only need count, sum, max and a level histogram per
+-- location. Pre-aggregating those per hour and per day lets the API read a few
+-- rows per location instead of scanning every 15-minute reading in the window.
+
+-- One row per (dataset_label, location_id, hour) / (dataset_label, location_id, day), UTC-aligned.
+-- level_sum / n = average congestion_level; n_level_1..4 = how many readings had each level.
+CREATE TABLE IF NOT EXISTS congestion_rollup_hourly (
+  dataset_label   TEXT NOT NULL,
+  location_id     TEXT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+  bucket_start    TIMESTAMPTZ NOT NULL,
+  n               BIGINT NOT NULL,
+  level_sum       BIGINT NOT NULL,
+  max_level       INTEGER NOT NULL,
+  n_level_1       BIGINT NOT NULL DEFAULT 0,
+  n_level_2       BIGINT NOT NULL DEFAULT 0,
+  n_level_3       BIGINT NOT NULL DEFAULT 0,
+  n_level_4       BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (dataset_label, location_id, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS congestion_rollup_daily (
+  dataset_label   TEXT NOT NULL,
+  location_id     TEXT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+  bucket_start    TIMESTAMPTZ NOT NULL,
+  n               BIGINT NOT NULL,
+  level_sum       BIGINT NOT NULL,
+  max_level       INTEGER NOT NULL,
+  n_level_1       BIGINT NOT NULL DEFAULT 0,
+  n_level_2       BIGINT NOT NULL DEFAULT 0,
+  n_level_3       BIGINT NOT NULL DEFAULT 0,
+  n_level_4       BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (dataset_label, location_id, bucket_start)
+);
+
+-- The API filters by time window without a dataset, so also index bucket_start alone
+CREATE INDEX IF NOT EXISTS idx_rollup_hourly_bucket ON congestion_rollup_hourly(bucket_start);
+CREATE INDEX IF NOT EXISTS idx_rollup_daily_bucket ON congestion_rollup_daily(bucket_start);
+
+-- Recompute only the hour/day buckets that overlap [p_from, p_to] from raw readings.
+-- The loader calls this after inserting readings; pass NULL, NULL to rebuild everything.
+CREATE OR REPLACE FUNCTION refresh_congestion_rollups(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  h_from TIMESTAMPTZ := date_trunc('hour', p_from, 'UTC');
+  h_to   TIMESTAMPTZ := date_trunc('hour', p_to, 'UTC') + INTERVAL '1 hour';
+  d_from TIMESTAMPTZ := date_trunc('day', p_from, 'UTC');
+  d_to   TIMESTAMPTZ := date_trunc('day', p_to, 'UTC') + INTERVAL '1 day';
+BEGIN
+  -- Hourly buckets come straight from the raw readings
+  DELETE FROM congestion_rollup_hourly
+  WHERE (p_from IS NULL OR bucket_start >= h_from)
+    AND (p_to IS NULL OR bucket_start < h_to);
+
+  INSERT INTO congestion_rollup_hourly
+    (dataset_label, location_id, bucket_start, n, level_sum, max_level,
+     n_level_1, n_level_2, n_level_3, n_level_4)
+  SELECT COALESCE(dataset_label, 'default'),
+         location_id,
+         date_trunc('hour', ts, 'UTC'),
+         COUNT(*),
+         SUM(congestion_level),
+         MAX(congestion_level),
+         COUNT(*) FILTER (WHERE congestion_level = 1),
+         COUNT(*) FILTER (WHERE congestion_level = 2),
+         COUNT(*) FILTER (WHERE congestion_level = 3),
+         COUNT(*) FILTER (WHERE congestion_level = 4)
+  FROM congestion_readings
+  WHERE (p_from IS NULL OR ts >= h_from)
+    AND (p_to IS NULL OR ts < h_to)
+  GROUP BY 1, 2, 3;
+
+  -- Daily buckets are summed from the (now fresh) hourly buckets
+  DELETE FROM congestion_rollup_daily
+  WHERE (p_from IS NULL OR bucket_start >= d_from)
+    AND (p_to IS NULL OR bucket_start < d_to);
+
+  INSERT INTO congestion_rollup_daily
+    (dataset_label, location_id, bucket_start, n, level_sum, max_level,
+     n_level_1, n_level_2, n_level_3, n_level_4)
+  SELECT dataset_label,
+         location_id,
+         date_trunc('day', bucket_start, 'UTC'),
+         SUM(n),
+         SUM(level_sum),
+         MAX(max_level),
+         SUM(n_level_1),
+         SUM(n_level_2),
+         SUM(n_level_3),
+         SUM(n_level_4)
+  FROM congestion_rollup_hourly
+  WHERE (p_from IS NULL OR bucket_start >= d_from)
+    AND (p_to IS NULL OR bucket_start < d_to)
+  GROUP BY 1, 2, 3;
+END;
+$$;
+
+-- Backfill an existing database once after creating the tables:
+-- SELECT refresh_congestion_rollups(NULL, NULL);
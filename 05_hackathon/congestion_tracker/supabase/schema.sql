@@ -27,6 +27,8 @@ CREATE INDEX IF NOT EXISTS idx_readings_location ON congestion_readings(location
 CREATE INDEX IF NOT EXISTS idx_readings_ts ON congestion_readings(ts);
 CREATE INDEX IF NOT EXISTS idx_readings_level ON congestion_readings(congestion_level);
 CREATE INDEX IF NOT EXISTS idx_readings_dataset ON congestion_readings(dataset_label);
+-- Keyset pagination for /readings: ORDER BY ts DESC, id DESC and WHERE (ts, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_readings_ts_id ON congestion_readings(ts, id);
 
 -- Optional: RLS (Row Level Security) — enable if you want API to use anon key
 -- ALTER TABLE locations ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,75 @@
+-- City Congestion Tracker — Supabase PostgreSQL schema, partitioned readings
+-- Run this in Supabase SQL Editor instead of schema.sql for a new project
+-- (existing databases: run migrate_partition_readings.sql instead).
+--
+-- congestion_readings is range-partitioned by month on ts, so a query for one
+-- week only touches that month's partition. Within a partition the rows arrive
+-- roughly in ts order, so a tiny BRIN index replaces the B-tree on ts, and one
+-- composite B-tree matches the API's WHERE dataset_label / location_id / ts.
+
+-- Locations: intersections, segments, or zones where we measure congestion
+CREATE TABLE IF NOT EXISTS locations (
+  location_id   TEXT PRIMARY KEY,
+  name          TEXT NOT NULL,
+  zone          TEXT,
+  created_at    TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Congestion readings: one row per location per timestamp
+-- congestion_level: 1 = low, 2 = moderate, 3 = high, 4 = severe
+-- dataset_label: optional test set id (e.g. 'default', 'dataset_a', 'dataset_b', 'dataset_c')
+-- The primary key of a partitioned table must include the partition key, hence (id, ts).
+CREATE TABLE IF NOT EXISTS congestion_readings (
+  id              BIGSERIAL,
+  location_id     TEXT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+  ts              TIMESTAMPTZ NOT NULL,
+  congestion_level INTEGER NOT NULL CHECK (congestion_level BETWEEN 1 AND 4),
+  delay_minutes   NUMERIC(5,2),
+  dataset_label   TEXT DEFAULT 'default',
+  created_at      TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+-- Indexes (created on every partition automatically)
+-- Time windows: BRIN keeps one summary per block range instead of one entry per row
+CREATE INDEX IF NOT EXISTS idx_readings_ts_brin ON congestion_readings USING BRIN (ts);
+-- API filters: dataset_label = ? [AND location_id = ?] AND ts BETWEEN ? AND ?
+CREATE INDEX IF NOT EXISTS idx_readings_dataset_location_ts ON congestion_readings(dataset_label, location_id, ts);
+-- Keyset pagination for /readings: ORDER BY ts DESC, id DESC and WHERE (ts, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_readings_ts_id ON congestion_readings(ts, id);
+
+-- Create the monthly (UTC) partitions covering [p_from, p_to]; existing ones are kept.
+-- Partitions are named congestion_readings_yYYYYmMM. The loader calls this before
+-- every load; an INSERT outside all partitions fails instead of landing somewhere slow.
+CREATE OR REPLACE FUNCTION ensure_congestion_partitions(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  m_start TIMESTAMPTZ := date_trunc('month', p_from, 'UTC');
+  m_end   TIMESTAMPTZ;
+  part    TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE m_start <= p_to LOOP
+    m_end := (m_start AT TIME ZONE 'UTC' + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    part := 'congestion_readings_' || to_char(m_start AT TIME ZONE 'UTC', '"y"YYYY"m"MM');
+    IF to_regclass(part) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF congestion_readings FOR VALUES FROM (%L) TO (%L)',
+        part, m_start, m_end
+      );
+      created := created + 1;
+    END IF;
+    m_start := m_end;
+  END LOOP;
+  RETURN created;
+END;
+$$;
+
+-- Start with the last year and the next three months
+SELECT ensure_congestion_partitions(NOW() - INTERVAL '12 months', NOW() + INTERVAL '3 months');
+
+-- Optional: RLS (Row Level Security) — enable if you want API to use anon key
+-- ALTER TABLE locations ENABLE ROW LEVEL SECURITY;
+-- ALTER TABLE congestion_readings ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,99 @@
+# test_llm_cache.py
+# City Congestion Tracker – single-flight behaviour of LLMCache.get_or_call
+# Pairs with api/llm_cache.py
+#
+# The LLM is replaced by a fake `call` coroutine that counts its calls and how
+# many run at once. Memory tier only, so no database or network is needed.
+# Run from congestion_tracker/: python -m pytest tests
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+from llm_cache import LLMCache  # noqa: E402
+
+
+class FakeLLM:
+    """call() answers after a short delay; the first `failures` calls raise instead."""
+
+    def __init__(self, failures: int = 0, on_failure=None):
+        self.failures = failures
+        self.on_failure = on_failure
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def call(self) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.calls <= self.failures:
+                if self.on_failure is not None:
+                    self.on_failure()
+                raise RuntimeError("upstream error")
+            return "answer"
+        finally:
+            self.in_flight -= 1
+
+
+# 1. Tests #################################
+
+
+def test_concurrent_misses_share_one_call():
+    async def run():
+        cache = LLMCache(max_entries=8, ttl_seconds=60)
+        llm = FakeLLM()
+        results = await asyncio.gather(*(cache.get_or_call("k", llm.call) for _ in range(5)))
+        return cache, llm, results
+
+    cache, llm, results = asyncio.run(run())
+    assert llm.calls == 1
+    assert sorted(status for _, status in results) == ["hit"] * 4 + ["miss"]
+    assert {text for text, _ in results} == {"answer"}
+    assert cache.stats()["coalesced"] == 4
+    assert cache._key_locks == {}
+
+
+def test_failed_call_is_not_cached_and_waiters_stay_single_flight():
+    async def run():
+        cache = LLMCache(max_entries=8, ttl_seconds=60)
+        late = []
+        # A request that arrives just as the first call fails, while the
+        # woken waiter has not taken the lock yet
+        llm = FakeLLM(failures=1, on_failure=lambda: late.append(asyncio.ensure_future(cache.get_or_call("k", llm.call))))
+        first = asyncio.ensure_future(cache.get_or_call("k", llm.call))
+        waiter = asyncio.ensure_future(cache.get_or_call("k", llm.call))
+        with pytest.raises(RuntimeError):
+            await first
+        results = [await waiter, await late[0]]
+        return cache, llm, results
+
+    cache, llm, results = asyncio.run(run())
+    assert llm.max_in_flight == 1
+    assert llm.calls == 2  # the failure, then one retry shared by the other two
+    assert sorted(status for _, status in results) == ["hit", "miss"]
+    assert cache._key_locks == {}
+
+
+def test_error_leaves_no_entry_behind():
+    async def run():
+        cache = LLMCache(max_entries=8, ttl_seconds=60)
+        llm = FakeLLM(failures=1)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_call("k", llm.call)
+        return cache, llm, await cache.get_or_call("k", llm.call)
+
+    cache, llm, result = asyncio.run(run())
+    assert result == ("answer", "miss")
+    assert llm.calls == 2
+    assert cache.stats()["stores"] == 1
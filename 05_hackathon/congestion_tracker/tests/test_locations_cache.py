@@ -0,0 +1,78 @@
+# test_locations_cache.py
+# City Congestion Tracker – LocationsCache reloads and invalidation
+# Pairs with api/locations_cache.py
+#
+# fetch_all is replaced by a fake query that returns the current contents of
+# an in-memory "locations table", so no database is needed.
+# Run from congestion_tracker/: python -m pytest tests
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+import locations_cache  # noqa: E402
+from locations_cache import LocationsCache  # noqa: E402
+
+
+class FakeTable:
+    """fetch_all stand-in: answers with `rows` as they were when the query started."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+        self.started = asyncio.Event()
+
+    async def fetch_all(self, sql, params=None):
+        self.queries += 1
+        snapshot = list(self.rows)
+        self.started.set()
+        await asyncio.sleep(0.01)
+        return snapshot
+
+
+OLD = [{"location_id": "L1", "name": "Main St", "zone": "A"}]
+NEW = [{"location_id": "L1", "name": "Main Street", "zone": "A"}]
+
+
+# 1. Tests #################################
+
+
+def test_rows_are_reused_until_invalidated(monkeypatch):
+    async def run():
+        table = FakeTable(OLD)
+        monkeypatch.setattr(locations_cache, "fetch_all", table.fetch_all)
+        cache = LocationsCache(ttl_seconds=60)
+        first, second = await cache.rows(), await cache.rows()
+        table.rows = NEW
+        cache.invalidate()
+        return table, first, second, await cache.rows()
+
+    table, first, second, third = asyncio.run(run())
+    assert first == second == OLD
+    assert third == NEW
+    assert table.queries == 2
+
+
+def test_invalidation_during_a_load_is_not_lost(monkeypatch):
+    async def run():
+        table = FakeTable(OLD)
+        monkeypatch.setattr(locations_cache, "fetch_all", table.fetch_all)
+        cache = LocationsCache(ttl_seconds=60)
+        loading = asyncio.ensure_future(cache.rows())
+        # The loader rewrites the table and invalidates while the query runs
+        await table.started.wait()
+        table.rows = NEW
+        cache.invalidate()
+        during = await loading
+        return cache, during, await cache.rows()
+
+    cache, during, after = asyncio.run(run())
+    assert during == OLD  # the request that started first still gets an answer
+    assert after == NEW  # but the pre-invalidation rows were not kept
+    assert cache.stats()["loads"] == 2
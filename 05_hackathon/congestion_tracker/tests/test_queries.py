@@ -0,0 +1,44 @@
+# test_queries.py
+# City Congestion Tracker – /summary query planning
+# Pairs with api/queries.py
+#
+# Only builds SQL strings and params; nothing is sent to a database.
+# Run from congestion_tracker/: python -m pytest tests
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+from queries import summary_query  # noqa: E402
+
+
+# 1. Tests #################################
+
+
+def test_empty_timestamps_mean_unbounded():
+    for use_rollups in (True, False):
+        sql, params = summary_query("", "", dataset="dataset_a", use_rollups=use_rollups)
+        assert "ts >=" not in sql and "ts <=" not in sql
+        assert params == ["dataset_a"]
+
+
+def test_unparseable_timestamp_raises():
+    for use_rollups in (True, False):
+        with pytest.raises(ValueError):
+            summary_query("yesterday", None, use_rollups=use_rollups)
+
+
+def test_default_dataset_takes_unlabelled_readings_on_every_segment():
+    # Raw edges, hourly and daily rollups: all must treat NULL labels like the rollups do
+    sql, params = summary_query("2026-03-01T10:20:00Z", "2026-03-04T08:00:00Z", dataset="default")
+    n_segments = sql.count("dataset_label = %s")
+    assert n_segments == 5
+    assert sql.count("(dataset_label = %s OR dataset_label IS NULL)") == n_segments
+    assert params.count("default") == n_segments
@@ -0,0 +1,89 @@
+# test_readings_window.py
+# City Congestion Tracker – incremental refresh of ReadingsWindow
+# Pairs with dashboard/readings_window.py
+#
+# Builds windows from small hand-made frames, the way server.py does from
+# /readings.arrow, so no database or API is needed.
+# Run from congestion_tracker/: python -m pytest tests
+
+# 0. Setup #################################
+
+## 0.1 Load packages ############################
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "dashboard"))
+
+from readings_window import ReadingsWindow  # noqa: E402
+
+KEY = ("http://api/readings.arrow", (("dataset", "dataset_a"),))
+FROM_TS, TO_TS = "2026-02-01T00:00:00Z", "2026-02-02T23:59:59Z"
+
+
+def readings(rows) -> pd.DataFrame:
+    """(id, location_name, ts, congestion_level) tuples as a newest-first readings frame."""
+    frame = pd.DataFrame(rows, columns=["id", "location_name", "ts", "congestion_level"])
+    frame["ts"] = pd.to_datetime(frame["ts"], utc=True)
+    return frame.sort_values(["ts", "id"], ascending=False, ignore_index=True)
+
+
+def loaded_window() -> ReadingsWindow:
+    frame = readings(
+        [
+            (1, "Main St", "2026-02-01T08:00:00Z", 2),
+            (2, "Main St", "2026-02-01T09:00:00Z", 4),
+            (3, "Main St", "2026-02-02T08:00:00Z", 1),
+        ]
+    )
+    return ReadingsWindow.build(KEY, frame, FROM_TS, TO_TS, generation="v:dataset_a=1")
+
+
+# 1. Tests #################################
+
+
+def test_appended_rows_extend_the_window():
+    window = loaded_window()
+    # Appends bump the data version but keep the generation
+    assert window.can_extend(KEY, FROM_TS, TO_TS, "v:dataset_a=1")
+
+    new_rows = readings(
+        [
+            (3, "Main St", "2026-02-02T08:00:00Z", 1),  # already held (after_ts overlap)
+            (4, "Main St", "2026-02-02T09:00:00Z", 3),
+        ]
+    )
+    extended = window.extend(new_rows, FROM_TS, TO_TS)
+    assert extended.frame["id"].tolist() == [4, 3, 2, 1]
+    assert extended.max_id == 4
+    assert extended.generation == "v:dataset_a=1"
+    day_2 = extended.daily.loc[("Main St", pd.Timestamp("2026-02-02").date())]
+    assert (day_2["level_sum"], day_2["n"]) == (4.0, 2)
+    assert extended.mean_level() == 2.5
+
+
+def test_replaced_rows_need_a_full_reload():
+    window = loaded_window()
+    # TRUNCATE + reload: the generation moves and the held rows are stale
+    assert not window.can_extend(KEY, FROM_TS, TO_TS, "v:dataset_a=5")
+
+    reloaded = readings(
+        [
+            (10, "Main St", "2026-02-01T08:00:00Z", 3),
+            (11, "Main St", "2026-02-02T08:00:00Z", 3),
+        ]
+    )
+    rebuilt = ReadingsWindow.build(KEY, reloaded, FROM_TS, TO_TS, generation="v:dataset_a=5")
+    assert rebuilt.frame["id"].tolist() == [11, 10]
+    assert rebuilt.mean_level() == 3.0
+    assert rebuilt.can_extend(KEY, FROM_TS, TO_TS, "v:dataset_a=5")
+
+
+def test_other_query_or_wider_window_cannot_extend():
+    window = loaded_window()
+    other = ("http://api/readings.arrow", (("dataset", "dataset_b"),))
+    assert not window.can_extend(other, FROM_TS, TO_TS, "v:dataset_a=1")
+    assert not window.can_extend(KEY, "2026-01-31T00:00:00Z", TO_TS, "v:dataset_a=1")
+    assert window.can_extend(KEY, "2026-02-02T00:00:00Z", TO_TS, "v:dataset_a=1")